@@ -24,9 +24,14 @@ import uuid
 import os
 import time
 import json
+from contextlib import nullcontext
 from version import BUILD_NUMBER  # Import the BUILD_NUMBER
 from app_utils import log_job_status, discover_and_register_blueprints  # Import the discover_and_register_blueprints function
 from services.gcp_toolkit import trigger_cloud_run_job
+from services.whisper_models import preload_models
+from services import cpu_budget
+from services.font_index import get_font_index
+from config import GUNICORN_PRELOAD, QUEUE_WORKER_THREADS
 
 MAX_QUEUE_LENGTH = int(os.environ.get('MAX_QUEUE_LENGTH', 0))
 
@@ -45,16 +50,18 @@ def create_app():
             run_start_time = time.time()
             pid = os.getpid()  # Get the PID of the actual processing thread
             
-            # Log job status as running
-            log_job_status(job_id, {
-                "job_status": "running",
-                "job_id": job_id,
-                "queue_id": queue_id,
-                "process_id": pid,
-                "response": None
-            })
-            
-            response = task_func()
+            with cpu_budget.allocate(job_id) as allocation:
+                # Log job status as running
+                log_job_status(job_id, {
+                    "job_status": "running",
+                    "job_id": job_id,
+                    "queue_id": queue_id,
+                    "process_id": pid,
+                    "cpu_budget": allocation,
+                    "response": None
+                })
+
+                response = task_func()
             run_time = time.time() - run_start_time
             total_time = time.time() - queue_start_time
 
@@ -80,6 +87,7 @@ def create_app():
                 "job_id": job_id,
                 "queue_id": queue_id,
                 "process_id": pid,
+                "cpu_budget": allocation,
                 "response": response_data
             })
 
@@ -89,8 +97,25 @@ def create_app():
 
             task_queue.task_done()
 
-    # Start the queue processing in a separate thread
-    threading.Thread(target=process_queue, daemon=True).start()
+    # Threads don't survive fork, so with GUNICORN_PRELOAD they are started in each
+    # worker by the post_fork hook in gunicorn.conf.py
+    def start_background_threads():
+        # Start the queue processing in separate threads; more than one lets concurrent
+        # jobs share batched Whisper inference (WHISPER_BATCH_SIZE)
+        for _ in range(max(1, QUEUE_WORKER_THREADS)):
+            threading.Thread(target=process_queue, daemon=True).start()
+
+    app.start_background_threads = start_background_threads
+
+    if GUNICORN_PRELOAD:
+        # Load Whisper models and the font index before the workers fork so they share them
+        preload_models()
+        get_font_index()
+    else:
+        start_background_threads()
+        # Load Whisper models and the font index in the background so the first job doesn't pay for them
+        threading.Thread(target=preload_models, daemon=True).start()
+        threading.Thread(target=get_font_index, daemon=True).start()
 
     # Decorator to add tasks to the queue or bypass it
     def queue_task(bypass_queue=False):
@@ -106,17 +131,19 @@ def create_app():
                     # Get execution name from Google's env var
                     execution_name = os.environ.get("CLOUD_RUN_EXECUTION", "gcp_job")
 
-                    # Log job status as running
-                    log_job_status(job_id, {
-                        "job_status": "running",
-                        "job_id": job_id,
-                        "queue_id": execution_name,
-                        "process_id": pid,
-                        "response": None
-                    })
+                    with cpu_budget.allocate(job_id) as allocation:
+                        # Log job status as running
+                        log_job_status(job_id, {
+                            "job_status": "running",
+                            "job_id": job_id,
+                            "queue_id": execution_name,
+                            "process_id": pid,
+                            "cpu_budget": allocation,
+                            "response": None
+                        })
 
-                    # Execute the function directly (no queue)
-                    response = f(job_id=job_id, data=data, *args, **kwargs)
+                        # Execute the function directly (no queue)
+                        response = f(job_id=job_id, data=data, *args, **kwargs)
                     run_time = time.time() - start_time
 
                     # Build response object
@@ -142,6 +169,7 @@ def create_app():
                         "job_id": job_id,
                         "queue_id": execution_name,
                         "process_id": pid,
+                        "cpu_budget": allocation,
                         "response": response_obj
                     })
 
@@ -230,16 +258,19 @@ def create_app():
 
                 elif bypass_queue or 'webhook_url' not in data:
                     
-                    # Log job status as running immediately (bypassing queue)
-                    log_job_status(job_id, {
-                        "job_status": "running",
-                        "job_id": job_id,
-                        "queue_id": queue_id,
-                        "process_id": pid,
-                        "response": None
-                    })
-                    
-                    response = f(job_id=job_id, data=data, *args, **kwargs)
+                    # Status and metrics endpoints bypass the queue too; they need no CPU budget
+                    with nullcontext() if bypass_queue else cpu_budget.allocate(job_id) as allocation:
+                        # Log job status as running immediately (bypassing queue)
+                        log_job_status(job_id, {
+                            "job_status": "running",
+                            "job_id": job_id,
+                            "queue_id": queue_id,
+                            "process_id": pid,
+                            "cpu_budget": allocation,
+                            "response": None
+                        })
+
+                        response = f(job_id=job_id, data=data, *args, **kwargs)
                     run_time = time.time() - start_time
 
                     response_obj = {
@@ -264,6 +295,7 @@ def create_app():
                         "job_id": job_id,
                         "queue_id": queue_id,
                         "process_id": pid,
+                        "cpu_budget": allocation,
                         "response": response_obj
                     })
                     
@@ -23,6 +23,7 @@ import os
 import json
 import time
 from config import LOCAL_STORAGE_PATH
+from services.partial_results import discard_partials
 
 def validate_payload(schema):
     def decorator(f):
@@ -60,6 +61,10 @@ def log_job_status(job_id, data):
     with open(job_file, 'w') as f:
         json.dump(data, f, indent=2)
 
+    # Once the final response is recorded, the job's partial segments are no longer needed
+    if data.get("job_status") in ("done", "failed"):
+        discard_partials(job_id)
+
 def queue_task_wrapper(bypass_queue=False):
     def decorator(f):
         def wrapper(*args, **kwargs):
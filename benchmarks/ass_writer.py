@@ -0,0 +1,121 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+"""
+Measure peak Python memory and time for writing a long word-level transcript to an
+.ass file: the old in-memory path (join every Dialogue line, filter the whole
+document, write it once) against the streaming writer the caption services use.
+
+The transcript is synthetic (about 150 words per minute, 10 words per segment), and
+one exclude range per 10 minutes is applied so both paths do the filtering work.
+
+Usage (from the repository root):
+    python benchmarks/ass_writer.py [--hours 3] [--styles classic highlight word_by_word]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_transcript(hours, rng):
+    vocabulary = ["the", "video", "shows", "how", "our", "team", "built", "a", "new", "feature", "today"]
+    segments = []
+    t = 0.0
+    end_time = hours * 3600
+    while t < end_time:
+        words = []
+        for _ in range(10):
+            duration = rng.uniform(0.25, 0.55)
+            words.append({'word': rng.choice(vocabulary), 'start': round(t, 3), 'end': round(t + duration, 3)})
+            t += duration + 0.05
+        segments.append({
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'text': ' '.join(w['word'] for w in words),
+            'words': words
+        })
+        t += 0.5
+    return {'segments': segments}
+
+def format_range(seconds):
+    return f"{int(seconds // 3600)}:{int(seconds % 3600 // 60):02}:{seconds % 60:06.3f}"
+
+def in_memory(ass_toolkit, transcript, style, exclude_time_ranges, path):
+    ass_header, dialogue_lines = ass_toolkit.srt_to_ass(transcript, style, {}, {}, (1920, 1080))
+    content = ass_header + "\n".join(list(dialogue_lines)) + "\n"
+    content = ass_toolkit.filter_subtitle_lines(content, exclude_time_ranges, 'ass')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def streaming(ass_toolkit, transcript, style, exclude_time_ranges, path):
+    ass_header, dialogue_lines = ass_toolkit.srt_to_ass(transcript, style, {}, {}, (1920, 1080), exclude_time_ranges)
+    ass_toolkit.write_ass_file(path, ass_header, dialogue_lines)
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming ASS generation on a long transcript")
+    parser.add_argument("--hours", type=float, default=3, help="Transcript length in hours")
+    parser.add_argument("--styles", nargs="+", default=["classic", "karaoke", "highlight", "underline", "word_by_word"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("API_KEY", "benchmark")
+    from services import ass_toolkit
+    logging.disable(logging.INFO)
+
+    transcript = build_transcript(args.hours, random.Random(args.seed))
+    words = sum(len(segment['words']) for segment in transcript['segments'])
+    exclude_time_ranges = [
+        {'start': format_range(start), 'end': format_range(start + 30)}
+        for start in range(300, int(args.hours * 3600), 600)
+    ]
+    print(f"{len(transcript['segments'])} segments, {words} words, {len(exclude_time_ranges)} exclude ranges")
+    print(f"{'style':<14} {'memory s':>9} {'memory MiB':>11} {'stream s':>9} {'stream MiB':>11}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for style in args.styles:
+            memory_path = os.path.join(tmp, f"{style}.memory.ass")
+            stream_path = os.path.join(tmp, f"{style}.stream.ass")
+            memory_time, memory_peak = measure(in_memory, ass_toolkit, transcript, style, exclude_time_ranges, memory_path)
+            stream_time, stream_peak = measure(streaming, ass_toolkit, transcript, style, exclude_time_ranges, stream_path)
+            with open(memory_path, encoding='utf-8') as f:
+                memory_lines = f.read().splitlines()
+            with open(stream_path, encoding='utf-8') as f:
+                stream_lines = f.read().splitlines()
+            if memory_lines != stream_lines:
+                print(f"{style}: streamed output differs from the in-memory output")
+                sys.exit(1)
+            print(f"{style:<14} {memory_time:>9.2f} {memory_peak / 2**20:>11.2f} {stream_time:>9.2f} {stream_peak / 2**20:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+"""
+Compare the old per-rule re.sub loop for caption `replace` rules with the compiled
+single-pass TextReplacer, word by word as the karaoke/highlight/word_by_word styles do.
+
+The timed glossary uses brand-style terms that do not overlap or feed each other, so it
+takes the single-pass path. Before timing, rule sets that do interact (chained rules,
+overlapping finds, empty replacements, re.sub templates) and random rules over a tiny
+alphabet are checked too; those must fall back to applying the rules one by one. The
+script exits non-zero if any output differs from the old loop.
+
+Usage (from the repository root):
+    python benchmarks/caption_replace.py [--rules 100 1000] [--words 10000]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_glossary(rules, rng):
+    glossary = {}
+    while len(glossary) < rules:
+        term = ''.join(rng.choice('bcdfghjklmnpqrstvwxz') for _ in range(rng.randint(5, 9)))
+        glossary[f"{term}{len(glossary)}"] = f"{term.capitalize()}™"
+    return glossary
+
+def build_words(glossary, count, rng):
+    vocabulary = ["the", "a", "new", "launch", "from", "today", "with", "and", "our", "team"]
+    terms = list(glossary)
+    words = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            words.append(rng.choice(terms).upper() if rng.random() < 0.5 else rng.choice(terms))
+        else:
+            words.append(rng.choice(vocabulary))
+    return words
+
+def legacy_replace(text, replace_dict):
+    for old_word, new_word in replace_dict.items():
+        text = re.sub(re.escape(old_word), new_word, text, flags=re.IGNORECASE)
+    return text
+
+# Rule sets whose rules interact, so only sequential application gives the old output
+INTERACTING_RULES = [
+    ({"cat": "dog", "dog": "wolf"}, "The cat chased the dog"),
+    ({"b": "X", "abc": "Y"}, "abc abcabc b"),
+    ({"um": "", "hello": "hi"}, "helumlo hello"),
+    ({"colour": "color", "Color": "Colour"}, "Colour colour"),
+    ({"ai": r"[\g<0>]"}, "openai said ai"),
+]
+
+def check_equivalence(TextReplacer, rng, random_sets=2000):
+    """Return a description of the first rule set where TextReplacer and the old loop differ."""
+    cases = list(INTERACTING_RULES)
+    for _ in range(random_sets):
+        rules = {}
+        for _ in range(rng.randint(1, 4)):
+            rules[''.join(rng.choice("abc") for _ in range(rng.randint(1, 3)))] = ''.join(rng.choice("abcX") for _ in range(rng.randint(0, 3)))
+        cases.append((rules, ''.join(rng.choice("abcAB ") for _ in range(rng.randint(0, 16)))))
+
+    for rules, text in cases:
+        expected = legacy_replace(text, rules)
+        actual = TextReplacer(rules).apply(text)
+        if actual != expected:
+            return f"{rules} on {text!r}: {actual!r} != {expected!r}"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark caption replace rules over a word-level transcript")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000], help="Glossary sizes to test")
+    parser.add_argument("--words", type=int, default=10000, help="Words in the synthetic transcript")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("API_KEY", "benchmark")
+    from services.ass_toolkit import TextReplacer
+
+    rng = random.Random(args.seed)
+    mismatch = check_equivalence(TextReplacer, rng)
+    if mismatch:
+        print(f"Output differs for {mismatch}")
+        sys.exit(1)
+
+    print(f"{'rules':>6} {'legacy s':>10} {'compiled s':>11} {'speedup':>8}")
+    for rules in args.rules:
+        glossary = build_glossary(rules, rng)
+        words = build_words(glossary, args.words, rng)
+
+        start = time.perf_counter()
+        legacy = [legacy_replace(word, glossary) for word in words]
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        replacer = TextReplacer(glossary)
+        compiled = [replacer.apply(word) for word in words]
+        compiled_time = time.perf_counter() - start
+
+        if legacy != compiled:
+            mismatch = next(i for i, (a, b) in enumerate(zip(legacy, compiled)) if a != b)
+            print(f"Output differs for {rules} rules at word {mismatch}: {legacy[mismatch]!r} != {compiled[mismatch]!r}")
+            sys.exit(1)
+        print(f"{rules:>6} {legacy_time:>10.3f} {compiled_time:>11.3f} {legacy_time / compiled_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+CPU Budget Benchmark
+Runs a burst of concurrent jobs twice, once with every job using as many threads as it
+likes (the default) and once with the host's cores split between them as CPU_BUDGET does,
+and reports for each run:
+- Wall time for the whole burst and jobs per minute
+- Mean per-job time
+
+Jobs mimic a busy worker pool: x264 encodes (ffmpeg testsrc2, no input files needed) and,
+with --torch-jobs, Whisper-sized matrix multiplications, each in its own process like
+separate Gunicorn workers.
+
+Usage (from the repository root):
+    python benchmarks/cpu_budget.py [--ffmpeg-jobs 4] [--torch-jobs 2] [--seconds 20] [--cores N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def ffmpeg_job(seconds, threads):
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f"testsrc2=size=1280x720:rate=30:duration={seconds}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-f', 'null', '-'
+    ]
+    if threads is not None:
+        cmd = [cmd[0], '-filter_threads', str(threads)] + cmd[1:-1] + ['-threads', str(threads), cmd[-1]]
+    start = time.time()
+    subprocess.run(cmd, check=True)
+    return time.time() - start
+
+def torch_job(iterations, threads, elapsed):
+    import torch
+    if threads is not None:
+        torch.set_num_threads(threads)
+    # Roughly the shape of a Whisper base encoder layer's projections over a 30s window
+    a = torch.randn(1500, 512)
+    b = torch.randn(512, 2048)
+    start = time.time()
+    for _ in range(iterations):
+        torch.matmul(a, b).relu_()
+    elapsed.value = time.time() - start
+
+def run_burst(ffmpeg_jobs, torch_jobs, seconds, iterations, threads):
+    context = multiprocessing.get_context('spawn')
+    start = time.time()
+    torch_processes = []
+    for _ in range(torch_jobs):
+        elapsed = context.Value('d', 0.0)
+        process = context.Process(target=torch_job, args=(iterations, threads, elapsed))
+        process.start()
+        torch_processes.append((process, elapsed))
+
+    with ThreadPool(max(1, ffmpeg_jobs)) as pool:
+        job_times = pool.starmap(ffmpeg_job, [(seconds, threads)] * ffmpeg_jobs)
+
+    for process, elapsed in torch_processes:
+        process.join()
+        job_times.append(elapsed.value)
+
+    wall = time.time() - start
+    jobs = ffmpeg_jobs + torch_jobs
+    return {
+        "wall_seconds": round(wall, 2),
+        "jobs_per_minute": round(jobs / wall * 60, 2),
+        "mean_job_seconds": round(sum(job_times) / max(len(job_times), 1), 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare throughput with and without a per-job CPU budget")
+    parser.add_argument("--ffmpeg-jobs", type=int, default=4, help="Concurrent x264 encodes")
+    parser.add_argument("--torch-jobs", type=int, default=0, help="Concurrent torch processes")
+    parser.add_argument("--seconds", type=int, default=20, help="Length of each encoded test clip")
+    parser.add_argument("--iterations", type=int, default=2000, help="Matrix multiplications per torch job")
+    parser.add_argument("--cores", type=int, default=0, help="Cores to split (default: detected as CPU_BUDGET does)")
+    args = parser.parse_args()
+    if args.ffmpeg_jobs + args.torch_jobs < 1:
+        parser.error("run at least one job")
+
+    os.environ.setdefault("API_KEY", "benchmark")
+    from services.cpu_budget import host_cores
+
+    cores = args.cores or host_cores()
+    jobs = args.ffmpeg_jobs + args.torch_jobs
+    budget = max(1, cores // max(1, jobs))
+    print(f"{jobs} concurrent jobs on {cores} cores; budgeted run uses {budget} threads per job")
+
+    results = {
+        "unbudgeted": run_burst(args.ffmpeg_jobs, args.torch_jobs, args.seconds, args.iterations, None),
+        "budgeted": run_burst(args.ffmpeg_jobs, args.torch_jobs, args.seconds, args.iterations, budget)
+    }
+
+    print(f"{'mode':<12} {'wall s':>8} {'jobs/min':>10} {'mean job s':>11}")
+    for mode, result in results.items():
+        print(f"{mode:<12} {result['wall_seconds']:>8} {result['jobs_per_minute']:>10} {result['mean_job_seconds']:>11}")
+    speedup = results["unbudgeted"]["wall_seconds"] / results["budgeted"]["wall_seconds"]
+    print(f"Budgeted throughput: {speedup:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+"""
+Regression check and benchmark for the highlight and underline caption styles.
+
+The handlers build every per-word variant of a line by slicing the joined line
+(mark_each_word). This script replays the previous quadratic construction,
+rebuilding the word list for every word index, and exits non-zero unless both
+produce byte-identical Dialogue lines. Segments range up to --max-words words,
+max_words_per_line is 0 and 7, and replace rules that insert spaces and backslash
+tags are applied. Timings for both constructions are printed.
+
+Usage (from the repository root):
+    python benchmarks/highlight_events.py [--segments 2000] [--max-words 60]
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_transcript(segments, max_words, rng):
+    vocabulary = ["we", "shipped", "the", "brand", "new", "captions", "today", "ok", "a", "naïve", "café"]
+    result = []
+    t = 0.0
+    for _ in range(segments):
+        words = []
+        for _ in range(rng.randint(1, max_words)):
+            words.append({'word': rng.choice(vocabulary), 'start': round(t, 2), 'end': round(t + 0.3, 2)})
+            t += 0.35
+        result.append({'start': words[0]['start'], 'end': words[-1]['end'], 'text': '', 'words': words})
+    return {'segments': result}
+
+def reference_variants(line_words, open_tag, close_tag):
+    # The construction the handlers used before: re-join the full word list per index
+    variants = []
+    for idx in range(len(line_words)):
+        marked = []
+        for i, w in enumerate(line_words):
+            marked.append(f"{open_tag}{w}{close_tag}" if i == idx else w)
+        variants.append(' '.join(marked))
+    return variants
+
+def main():
+    parser = argparse.ArgumentParser(description="Check highlight/underline output against the quadratic construction")
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--max-words", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("API_KEY", "benchmark")
+    from services import ass_toolkit
+    logging.disable(logging.INFO)
+
+    transcript = build_transcript(args.segments, args.max_words, random.Random(args.seed))
+    replace_dict = {"brand new": "Brand-New", "ok": "o k", "captions": "{\\b1}captions{\\b0}"}
+    original = ass_toolkit.mark_each_word
+    failures = 0
+    print(f"{'style':<10} {'max words':>9} {'quadratic s':>12} {'sliced s':>9}")
+    for style in ["highlight", "underline"]:
+        for max_words_per_line in [0, 7]:
+            settings = {'max_words_per_line': max_words_per_line}
+            timings = {}
+            outputs = {}
+            for mode in ["quadratic", "sliced"]:
+                if mode == "quadratic":
+                    ass_toolkit.mark_each_word = lambda line, words, open_tag, close_tag: reference_variants(words, open_tag, close_tag)
+                else:
+                    ass_toolkit.mark_each_word = original
+                start = time.perf_counter()
+                _, dialogue_lines = ass_toolkit.srt_to_ass(transcript, style, settings, replace_dict, (1920, 1080))
+                outputs[mode] = list(dialogue_lines)
+                timings[mode] = time.perf_counter() - start
+            ass_toolkit.mark_each_word = original
+            if outputs["quadratic"] != outputs["sliced"]:
+                failures += 1
+                print(f"{style} (max_words_per_line={max_words_per_line}): output differs")
+            print(f"{style:<10} {max_words_per_line:>9} {timings['quadratic']:>12.2f} {timings['sliced']:>9.2f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Multi-Task Transcription Benchmark
+Transcribes and translates each sample twice with openai-whisper, once as two independent
+transcribe() runs and once through transcribe_tasks(), and reports for each way:
+- Wall time
+- Encoder forward passes (the work transcribe_tasks() tries to share)
+and whether both ways produced the same text.
+
+Usage (from the repository root, with API_KEY set and WHISPER_BATCH_SIZE unset so the
+independent runs aren't batched):
+    python benchmarks/transcribe_tasks.py samples/podcast_01.mp3 samples/short_clip.wav [--model base]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TASKS = ("transcribe", "translate")
+
+def count_encoder_calls(model):
+    """Count forward passes of model's audio encoder; returns (counter, hook handle)."""
+    counter = {"calls": 0}
+
+    def hook(module, inputs, output):
+        counter["calls"] += 1
+
+    return counter, model.encoder.register_forward_hook(hook)
+
+def run(engine, model, model_size, audio, shared):
+    counter, handle = count_encoder_calls(model)
+    start = time.time()
+    try:
+        if shared:
+            results = engine.transcribe_tasks(audio, model_size, TASKS)
+        else:
+            results = {task: engine.transcribe(audio, model_size, task=task) for task in TASKS}
+    finally:
+        handle.remove()
+    return time.time() - start, counter["calls"], {task: result["text"] for task, result in results.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the encoder work transcribe_tasks() saves")
+    parser.add_argument("audio", nargs="+", help="Audio files to transcribe and translate")
+    parser.add_argument("--model", default="base")
+    args = parser.parse_args()
+
+    from services.audio_artifact import load_audio
+    from services.transcription_engines import get_engine
+    from services.whisper_models import get_model
+
+    engine = get_engine("openai-whisper")
+    print(f"{'file':<32} {'separate s':>11} {'shared s':>9} {'separate enc':>13} {'shared enc':>11} {'same text':>10}")
+    # The engines hold the model's inference lock themselves; only the hook needs the model
+    model = get_model(args.model)
+    for path in args.audio:
+        audio = load_audio(path)
+        separate_seconds, separate_calls, separate_text = run(engine, model, args.model, audio, shared=False)
+        shared_seconds, shared_calls, shared_text = run(engine, model, args.model, audio, shared=True)
+        print(
+            f"{os.path.basename(path)[:32]:<32} {separate_seconds:>11.2f} {shared_seconds:>9.2f} "
+            f"{separate_calls:>13} {shared_calls:>11} {str(separate_text == shared_text):>10}"
+        )
+
+if __name__ == "__main__":
+    main()
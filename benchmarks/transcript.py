@@ -0,0 +1,128 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+"""
+Compare Whisper's nested transcript dicts with the columnar Transcript on a long
+synthetic word-level transcript:
+
+- memory held by each representation (tracemalloc, after the build finishes)
+- time to build SRT output: srt.Subtitle + timedelta per line through srt.compose,
+  as the transcribe endpoint used to, against Transcript + compose_srt, for one
+  subtitle per segment and for words_per_line grouping; outputs must be identical
+
+Usage (from the repository root):
+    python benchmarks/transcript.py [--hours 3] [--words-per-line 5]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_result(hours, rng):
+    vocabulary = ["so", "the", "next", "step", "is", "to", "render", "our", "captions", "quickly", "and", "then"]
+    segments = []
+    t = 0.0
+    while t < hours * 3600:
+        words = []
+        for _ in range(rng.randint(6, 14)):
+            duration = rng.uniform(0.2, 0.6)
+            words.append({'word': ' ' + rng.choice(vocabulary), 'start': round(t, 2), 'end': round(t + duration, 2), 'probability': rng.random()})
+            t += duration + 0.05
+        segments.append({
+            'id': len(segments), 'seek': 0, 'start': words[0]['start'], 'end': words[-1]['end'],
+            'text': ''.join(w['word'] for w in words), 'tokens': list(range(len(words) + 2)),
+            'temperature': 0.0, 'avg_logprob': -0.2, 'compression_ratio': 1.4, 'no_speech_prob': 0.01,
+            'words': words
+        })
+        t += 0.4
+    return {'text': ''.join(s['text'] for s in segments), 'segments': segments, 'language': 'en'}
+
+def traced(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = func()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, elapsed, held
+
+def legacy_srt(result, words_per_line):
+    import srt
+    subtitles = []
+    if words_per_line:
+        all_words = []
+        word_timings = []
+        for segment in result['segments']:
+            words = segment['text'].strip().split()
+            if words:
+                duration_per_word = (segment['end'] - segment['start']) / len(words)
+                for i, word in enumerate(words):
+                    word_start = segment['start'] + (i * duration_per_word)
+                    all_words.append(word)
+                    word_timings.append((word_start, word_start + duration_per_word))
+        for i in range(0, len(all_words), words_per_line):
+            chunk = all_words[i:i + words_per_line]
+            end = word_timings[min(i + len(chunk) - 1, len(word_timings) - 1)][1]
+            subtitles.append(srt.Subtitle(len(subtitles) + 1, timedelta(seconds=word_timings[i][0]), timedelta(seconds=end), ' '.join(chunk)))
+    else:
+        for segment in result['segments']:
+            subtitles.append(srt.Subtitle(len(subtitles) + 1, timedelta(seconds=segment['start']), timedelta(seconds=segment['end']), segment['text'].strip()))
+    return srt.compose(subtitles)
+
+def columnar_srt(result, words_per_line):
+    from services.transcript import Transcript, compose_srt
+    if words_per_line:
+        return compose_srt(*Transcript.from_segment_text(result).word_lines(words_per_line))
+    transcript = Transcript.from_whisper(result)
+    return compose_srt(transcript.segment_start, transcript.segment_end, [text.strip() for text in transcript.segment_text])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar Transcript against nested Whisper dicts")
+    parser.add_argument("--hours", type=float, default=3, help="Transcript length in hours")
+    parser.add_argument("--words-per-line", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("API_KEY", "benchmark")
+    from services.transcript import Transcript
+
+    serialized = json.dumps(build_result(args.hours, random.Random(args.seed)))
+    result, load_time, dict_bytes = traced(lambda: json.loads(serialized))
+    transcript, build_time, columnar_bytes = traced(lambda: Transcript.from_whisper(result))
+    print(f"{len(transcript)} segments, {transcript.word_count} words")
+    print(f"nested dicts: {dict_bytes / 2**20:.1f} MiB; Transcript: {columnar_bytes / 2**20:.1f} MiB (built in {build_time:.2f}s)")
+
+    print(f"{'srt output':<22} {'srt.compose s':>14} {'compose_srt s':>14}")
+    for words_per_line in [0, args.words_per_line]:
+        legacy, legacy_time, _ = traced(lambda: legacy_srt(result, words_per_line))
+        columnar, columnar_time, _ = traced(lambda: columnar_srt(result, words_per_line))
+        if legacy != columnar:
+            print(f"SRT output differs for words_per_line={words_per_line}")
+            sys.exit(1)
+        label = f"words_per_line={words_per_line}" if words_per_line else "one per segment"
+        print(f"{label:<22} {legacy_time:>14.2f} {columnar_time:>14.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Transcription Engine Benchmark
+Compares the transcription engines on a fixed sample set and reports, per engine:
+- RTF: processing time / audio duration (lower is faster; 0.1 = 10x real time)
+- Peak RSS of the process running the engine
+- WER against reference transcripts
+
+The sample set is a JSON file listing local audio files and their reference text:
+    [{"audio": "samples/podcast_01.mp3", "reference": "welcome back to the show ..."}]
+
+Usage (from the repository root, with API_KEY set):
+    python benchmarks/transcription_engines.py samples.json [--engines openai-whisper faster-whisper] [--model base]
+
+Each engine runs in its own process so RSS figures are not mixed.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def normalize(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+def run_engine(engine_name, model_size, samples, results):
+    from services.transcription_engines import get_engine
+    from services.v1.media.transcribe_chunked import get_media_duration
+
+    engine = get_engine(engine_name)
+    # Load the model outside the timed region
+    load_start = time.time()
+    engine.transcribe(samples[0]["audio"], model_size)
+    load_seconds = time.time() - load_start
+
+    total_audio = total_time = 0.0
+    errors = []
+    for sample in samples:
+        duration = get_media_duration(sample["audio"])
+        start = time.time()
+        result = engine.transcribe(sample["audio"], model_size, word_timestamps=True)
+        elapsed = time.time() - start
+        total_audio += duration
+        total_time += elapsed
+        errors.append(word_error_rate(sample["reference"], result["text"]))
+
+    results[engine_name] = {
+        "rtf": round(total_time / total_audio, 4),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "wer": round(sum(errors) / len(errors), 4),
+        "first_call_seconds": round(load_seconds, 2),
+        "audio_seconds": round(total_audio, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare transcription engines on a fixed sample set")
+    parser.add_argument("samples", help="JSON file with audio paths and reference transcripts")
+    parser.add_argument("--engines", nargs="+", default=["openai-whisper", "faster-whisper"])
+    parser.add_argument("--model", default="base")
+    args = parser.parse_args()
+
+    with open(args.samples) as f:
+        samples = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.samples))
+    for sample in samples:
+        sample["audio"] = os.path.join(base_dir, sample["audio"])
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.dict()
+        for engine_name in args.engines:
+            process = context.Process(target=run_engine, args=(engine_name, args.model, samples, results))
+            process.start()
+            process.join()
+            if engine_name not in results:
+                print(f"{engine_name}: failed (exit code {process.exitcode})")
+        results = dict(results)
+
+    print(f"{'engine':<16} {'RTF':>8} {'peak RSS MB':>12} {'WER':>8} {'first call s':>13}")
+    for engine_name, stats in results.items():
+        print(f"{engine_name:<16} {stats['rtf']:>8} {stats['peak_rss_mb']:>12} {stats['wer']:>8} {stats['first_call_seconds']:>13}")
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,76 @@ if not API_KEY:
 # Storage path setting
 LOCAL_STORAGE_PATH = os.environ.get('LOCAL_STORAGE_PATH', '/tmp')
 
+# Maximum number of concurrent uploads when a job produces several output files
+UPLOAD_CONCURRENCY = int(os.environ.get('UPLOAD_CONCURRENCY', 4))
+
+# Number of parts uploaded in parallel by streaming multipart uploads
+S3_UPLOAD_CONCURRENCY = int(os.environ.get('S3_UPLOAD_CONCURRENCY', 4))
+
+# Pipe ffmpeg output for streamable containers straight into cloud storage instead of a local file
+STREAM_OUTPUT_UPLOAD = os.environ.get('STREAM_OUTPUT_UPLOAD', 'false').lower() == 'true'
+
+# Store uploaded files under their SHA-256 and skip uploads of content that is already stored
+UPLOAD_DEDUP = os.environ.get('UPLOAD_DEDUP', 'false').lower() == 'true'
+
+# Whisper model sizes to load at startup (comma separated, e.g. "base,small"; empty = load on first use)
+WHISPER_PRELOAD_MODELS = [name.strip() for name in os.environ.get('WHISPER_PRELOAD_MODELS', '').split(',') if name.strip()]
+
+# Memory budget in MB for loaded Whisper models of either engine; least recently used models are evicted above it (0 = unlimited)
+WHISPER_MODEL_MEMORY_MB = int(os.environ.get('WHISPER_MODEL_MEMORY_MB', 0))
+
+# Import the app and load Whisper models in the gunicorn master so workers share them copy-on-write
+GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+# Batch up to WHISPER_BATCH_SIZE windows of clips no longer than WHISPER_BATCH_MAX_SECONDS from concurrent jobs (1 = disabled)
+WHISPER_BATCH_SIZE = int(os.environ.get('WHISPER_BATCH_SIZE', 1))
+WHISPER_BATCH_MAX_WAIT_MS = int(os.environ.get('WHISPER_BATCH_MAX_WAIT_MS', 50))
+WHISPER_BATCH_MAX_SECONDS = float(os.environ.get('WHISPER_BATCH_MAX_SECONDS', 60))
+
+# Queued jobs each worker process runs at the same time
+QUEUE_WORKER_THREADS = int(os.environ.get('QUEUE_WORKER_THREADS', 1))
+
+# Minimum seconds between partial transcription webhooks (segments are batched in between)
+PARTIAL_WEBHOOK_INTERVAL = float(os.environ.get('PARTIAL_WEBHOOK_INTERVAL', 10))
+
+# Seconds a /v1/toolkit/job/stream connection stays open; keep it below GUNICORN_TIMEOUT
+JOB_STREAM_MAX_SECONDS = float(os.environ.get('JOB_STREAM_MAX_SECONDS', 240))
+
+# Split the host's cores between concurrently running jobs (torch threads and ffmpeg -threads)
+CPU_BUDGET = os.environ.get('CPU_BUDGET', 'false').lower() == 'true'
+# Cores to split (0 = detect from the cgroup quota / CPU affinity)
+CPU_BUDGET_CORES = int(os.environ.get('CPU_BUDGET_CORES', 0))
+
+# Default transcription engine: openai-whisper or faster-whisper (int8 CTranslate2, faster on CPU)
+TRANSCRIPTION_ENGINE = os.environ.get('TRANSCRIPTION_ENGINE', 'openai-whisper')
+
+# faster-whisper weight precision and CPU threads per model (0 = library default)
+FASTER_WHISPER_COMPUTE_TYPE = os.environ.get('FASTER_WHISPER_COMPUTE_TYPE', 'int8')
+FASTER_WHISPER_THREADS = int(os.environ.get('FASTER_WHISPER_THREADS', 0))
+
+# Cache transcription results on local disk, keyed by media content and options
+TRANSCRIPTION_CACHE = os.environ.get('TRANSCRIPTION_CACHE', 'true').lower() == 'true'
+TRANSCRIPTION_CACHE_MAX_MB = int(os.environ.get('TRANSCRIPTION_CACHE_MAX_MB', 256))
+
+# Disk budget for decoded 16kHz mono PCM shared by transcription, VAD and silence detection
+AUDIO_ARTIFACT_MAX_MB = int(os.environ.get('AUDIO_ARTIFACT_MAX_MB', 2048))
+
+# Run a voice-activity pre-pass by default and send only speech to Whisper
+TRANSCRIBE_VAD = os.environ.get('TRANSCRIBE_VAD', 'false').lower() == 'true'
+
+# How far (dB) above the recording's noise floor a frame must be to count as speech
+VAD_THRESHOLD_MARGIN_DB = float(os.environ.get('VAD_THRESHOLD_MARGIN_DB', 12))
+
+# Media at least this long (seconds) is split at silences and transcribed in parallel processes (0 = disabled)
+TRANSCRIBE_CHUNKED_MIN_DURATION = float(os.environ.get('TRANSCRIBE_CHUNKED_MIN_DURATION', 0))
+
+# Target chunk length in seconds for chunked transcription
+TRANSCRIBE_CHUNK_SECONDS = float(os.environ.get('TRANSCRIBE_CHUNK_SECONDS', 600))
+
+# Torch threads per chunk worker process, and the number of worker processes
+TRANSCRIBE_CHUNK_THREADS = int(os.environ.get('TRANSCRIBE_CHUNK_THREADS', 4))
+TRANSCRIBE_CHUNK_WORKERS = int(os.environ.get('TRANSCRIBE_CHUNK_WORKERS', max(1, (os.cpu_count() or 1) // TRANSCRIBE_CHUNK_THREADS)))
+
 # GCP environment variables
 GCP_SA_CREDENTIALS = os.environ.get('GCP_SA_CREDENTIALS', '')
 GCP_BUCKET_NAME = os.environ.get('GCP_BUCKET_NAME', '')
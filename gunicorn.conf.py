@@ -23,11 +23,16 @@
 #              at startup when running as a GCP Cloud Run Job, and shut down the server
 #              once the job completes or if an error occurs.
 
+import gc
 import os
 import json
 import requests
 import time
 
+# With GUNICORN_PRELOAD=true the app (and its Whisper models) is loaded once in the
+# master and workers share those pages copy-on-write instead of loading their own copy
+preload_app = os.environ.get("GUNICORN_PRELOAD", "false").lower() == "true"
+
 def cloud_run_job_task():
     """Execute a single job request and shut down."""
     path = os.environ.get("GCP_JOB_PATH")
@@ -111,7 +116,20 @@ def cloud_run_job_task():
 
 def when_ready(server):
     """Hook called when Gunicorn server is ready."""
+    if server.cfg.preload_app:
+        # Move everything loaded so far out of the collector's reach, so garbage
+        # collection in the workers doesn't write to (and copy) the shared pages
+        gc.freeze()
+
     if os.environ.get("CLOUD_RUN_JOB"):
         import threading
         thread = threading.Thread(target=cloud_run_job_task)
         thread.start()
+
+
+def post_fork(server, worker):
+    """Hook called in each worker right after it is forked."""
+    if server.cfg.preload_app:
+        # The app was created in the master, where no background threads were started
+        from app import app as flask_app
+        flask_app.start_background_threads()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Measure Gunicorn Worker Memory
+Reports resident (RSS), unique (USS) and proportional (PSS) memory for each
+gunicorn worker, to compare GUNICORN_PRELOAD=true against the default.
+
+USS is the memory that would be freed if the worker exited, so it is the
+per-worker cost when weights are shared copy-on-write. RSS counts shared
+pages in every worker and overstates the total.
+
+Usage (inside the container):
+    python measure_worker_memory.py [master_pid]
+"""
+
+import sys
+import psutil
+
+MB = 1024 * 1024
+
+def find_master():
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        cmdline = ' '.join(proc.info['cmdline'] or [])
+        if 'gunicorn' in cmdline and proc.parent() and 'gunicorn' not in ' '.join(proc.parent().cmdline()):
+            return proc
+    return None
+
+def main():
+    master = psutil.Process(int(sys.argv[1])) if len(sys.argv) > 1 else find_master()
+    if master is None:
+        print("No gunicorn master process found")
+        sys.exit(1)
+
+    print(f"{'pid':>8} {'role':<8} {'rss MB':>10} {'uss MB':>10} {'pss MB':>10}")
+    total_uss = 0
+    for proc in [master] + master.children():
+        mem = proc.memory_full_info()
+        role = 'master' if proc.pid == master.pid else 'worker'
+        if role == 'worker':
+            total_uss += mem.uss
+        print(f"{proc.pid:>8} {role:<8} {mem.rss / MB:>10.1f} {mem.uss / MB:>10.1f} {getattr(mem, 'pss', 0) / MB:>10.1f}")
+
+    print(f"Total worker USS: {total_uss / MB:.1f} MB")
+
+if __name__ == '__main__':
+    main()
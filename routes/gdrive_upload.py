@@ -20,6 +20,7 @@ import os
 import logging
 from flask import Blueprint, request, jsonify
 import threading
+import queue
 import requests
 import uuid
 import json
@@ -57,20 +58,77 @@ class UploadProgress:
 active_uploads = []
 uploads_lock = threading.Lock()
 
+# Number of source chunks downloaded ahead of the chunk being uploaded
+PREFETCH_CHUNKS = 2
+
+# Delegated credentials are built once and refreshed only when the token expires
+_delegated_credentials = None
+_credentials_lock = threading.Lock()
+
 def get_access_token():
     """
     Retrieves an access token for Google APIs using service account credentials.
+    The token is cached and reused until it expires.
     """
-    credentials_info = json.loads(GCP_SA_CREDENTIALS)
-    credentials = Credentials.from_service_account_info(
-        credentials_info,
-        scopes=['https://www.googleapis.com/auth/drive']
-    )
-    delegated_credentials = credentials.with_subject(GDRIVE_USER)
-    if not delegated_credentials.valid or delegated_credentials.expired:
-        delegated_credentials.refresh(Request())
-    access_token = delegated_credentials.token
-    return access_token
+    global _delegated_credentials
+    with _credentials_lock:
+        if _delegated_credentials is None:
+            credentials_info = json.loads(GCP_SA_CREDENTIALS)
+            credentials = Credentials.from_service_account_info(
+                credentials_info,
+                scopes=['https://www.googleapis.com/auth/drive']
+            )
+            _delegated_credentials = credentials.with_subject(GDRIVE_USER)
+        # valid is False once the token is within the library's expiry skew
+        if not _delegated_credentials.valid:
+            _delegated_credentials.refresh(Request())
+        return _delegated_credentials.token
+
+def get_content_length(file_url):
+    """
+    Determines the size of the source file without downloading it.
+    Uses a HEAD request, falling back to a one-byte range request for servers
+    that omit Content-Length on HEAD.
+    """
+    head_response = requests.head(file_url, allow_redirects=True, timeout=30)
+    head_response.raise_for_status()
+    total_size = int(head_response.headers.get('Content-Length', 0))
+    if total_size:
+        return total_size
+
+    with requests.get(file_url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=30) as range_response:
+        range_response.raise_for_status()
+        content_range = range_response.headers.get('Content-Range', '')
+        if '/' in content_range and not content_range.endswith('/*'):
+            return int(content_range.rsplit('/', 1)[1])
+        if range_response.status_code == 200:
+            return int(range_response.headers.get('Content-Length', 0))
+    return 0
+
+def prefetch_chunks(file_url, chunk_size, chunks, stop_event):
+    """
+    Downloads the source in chunks into a bounded queue so the next chunk is
+    fetched while the current one uploads. Puts None at the end of the file, or
+    the exception if the download fails.
+    """
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with requests.get(file_url, stream=True) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk and not put(chunk):
+                    return
+        put(None)
+    except Exception as e:
+        put(e)
 
 def initiate_resumable_upload(filename, folder_id, mime_type='application/octet-stream'):
     """
@@ -100,60 +158,76 @@ def upload_file_in_chunks(file_url, upload_url, total_size, job_id, chunk_size):
     retry_delay = 5  # seconds
 
     progress = UploadProgress(job_id, total_size)
+    start_resource_logging()
 
     # Add progress to active_uploads
     with uploads_lock:
         active_uploads.append(progress)
 
+    # Download the next chunks in the background while the current one uploads
+    chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+    stop_event = threading.Event()
+    prefetcher = threading.Thread(
+        target=prefetch_chunks,
+        args=(file_url, chunk_size, chunks, stop_event),
+        daemon=True
+    )
+    prefetcher.start()
+    # Reuse one connection to the upload session for every chunk
+    session = requests.Session()
+
     try:
-        with requests.get(file_url, stream=True) as r:
-            r.raise_for_status()
-            iterator = r.iter_content(chunk_size=chunk_size)
-            for chunk in iterator:
-                if chunk:
-                    for attempt in range(max_retries):
-                        start = bytes_uploaded
-                        end = bytes_uploaded + len(chunk) - 1
-                        content_range = f'bytes {start}-{end}/{total_size}'
-                        headers = {
-                            'Content-Length': str(len(chunk)),
-                            'Content-Range': content_range,
-                        }
-                        try:
-                            upload_response = requests.put(
-                                upload_url,
-                                headers=headers,
-                                data=chunk
-                            )
-                            if upload_response.status_code in (200, 201):
-                                # Upload complete
-                                logger.info(f"Job {job_id}: Upload complete.")
-                                with progress.lock:
-                                    progress.bytes_uploaded = end + 1
-                                return upload_response.json()['id']
-                            elif upload_response.status_code == 308:
-                                # Resumable upload incomplete
-                                bytes_uploaded = end + 1
-                                with progress.lock:
-                                    progress.bytes_uploaded = bytes_uploaded
-                                break  # Break retry loop and continue with next chunk
-                            else:
-                                # Handle unexpected status codes
-                                logger.error(f"Job {job_id}: Unexpected status code: {upload_response.status_code}")
-                                raise Exception(f"Upload failed with status code {upload_response.status_code}")
-                        except requests.exceptions.RequestException as e:
-                            logger.error(f"Job {job_id}: Network error during upload: {e}")
-                            if attempt < max_retries - 1:
-                                logger.info(f"Job {job_id}: Retrying upload chunk after {retry_delay} seconds...")
-                                time.sleep(retry_delay)
-                                continue
-                            else:
-                                logger.error(f"Job {job_id}: Max retries reached. Upload failed.")
-                                raise
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            for attempt in range(max_retries):
+                start = bytes_uploaded
+                end = bytes_uploaded + len(chunk) - 1
+                content_range = f'bytes {start}-{end}/{total_size}'
+                headers = {
+                    'Content-Length': str(len(chunk)),
+                    'Content-Range': content_range,
+                }
+                try:
+                    upload_response = session.put(
+                        upload_url,
+                        headers=headers,
+                        data=chunk
+                    )
+                    if upload_response.status_code in (200, 201):
+                        # Upload complete
+                        logger.info(f"Job {job_id}: Upload complete.")
+                        with progress.lock:
+                            progress.bytes_uploaded = end + 1
+                        return upload_response.json()['id']
+                    elif upload_response.status_code == 308:
+                        # Resumable upload incomplete
+                        bytes_uploaded = end + 1
+                        with progress.lock:
+                            progress.bytes_uploaded = bytes_uploaded
+                        break  # Break retry loop and continue with next chunk
                     else:
-                        # If we exhausted retries, exit the function
-                        raise Exception("Failed to upload chunk after multiple retries.")
+                        # Handle unexpected status codes
+                        logger.error(f"Job {job_id}: Unexpected status code: {upload_response.status_code}")
+                        raise Exception(f"Upload failed with status code {upload_response.status_code}")
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Job {job_id}: Network error during upload: {e}")
+                    if attempt < max_retries - 1:
+                        logger.info(f"Job {job_id}: Retrying upload chunk after {retry_delay} seconds...")
+                        time.sleep(retry_delay)
+                        continue
+                    else:
+                        logger.error(f"Job {job_id}: Max retries reached. Upload failed.")
+                        raise
+            else:
+                # If we exhausted retries, exit the function
+                raise Exception("Failed to upload chunk after multiple retries.")
     finally:
+        stop_event.set()
+        session.close()
         # Remove progress from active_uploads
         with uploads_lock:
             if progress in active_uploads:
@@ -192,13 +266,7 @@ def gdrive_upload(job_id, data):
 
         # Get the total size of the file
         try:
-            head_response = requests.head(file_url, allow_redirects=True, timeout=30)
-            head_response.raise_for_status()
-            total_size = int(head_response.headers.get('Content-Length', 0))
-            
-            get_response = requests.get(file_url, stream=True, timeout=30)
-            get_response.raise_for_status()
-            total_size = int(get_response.headers.get('Content-Length', 0))
+            total_size = get_content_length(file_url)
             if total_size == 0:
                 raise ValueError("Content-Length header is missing or zero")
         except requests.exceptions.RequestException as e:
@@ -257,9 +325,17 @@ def log_system_resources():
         # Sleep for 1 second before the next update
         time.sleep(1)
 
-# Start the resource logging in a separate thread
-resource_logging_thread = threading.Thread(
-    target=log_system_resources,
-    daemon=True
-)
-resource_logging_thread.start()
\ No newline at end of file
+# The resource logging thread is started with the first upload rather than at import,
+# so it also runs in gunicorn workers forked from a preloaded master
+resource_logging_thread = None
+resource_logging_lock = threading.Lock()
+
+def start_resource_logging():
+    global resource_logging_thread
+    with resource_logging_lock:
+        if resource_logging_thread is None or not resource_logging_thread.is_alive():
+            resource_logging_thread = threading.Thread(
+                target=log_system_resources,
+                daemon=True
+            )
+            resource_logging_thread.start()
@@ -22,7 +22,7 @@ from flask import Blueprint, request, jsonify
 from app_utils import *
 from services.v1.ffmpeg.ffmpeg_compose import process_ffmpeg_compose
 from services.authentication import authenticate
-from services.cloud_storage import upload_file
+from services.cloud_storage import UploadPool
 
 v1_ffmpeg_compose_bp = Blueprint('v1_ffmpeg_compose', __name__)
 logger = logging.getLogger(__name__)
@@ -119,28 +119,29 @@ def ffmpeg_api(job_id, data):
     try:
         output_filenames, metadata = process_ffmpeg_compose(data, job_id)
         
-        # Upload output files to GCP and create result array
-        output_urls = []
-        for i, output_filename in enumerate(output_filenames):
-            if os.path.exists(output_filename):
-                upload_url = upload_file(output_filename)
-                output_info = {"file_url": upload_url}
-                
-                if metadata and i < len(metadata):
-                    output_metadata = metadata[i]
-                    if 'thumbnail' in output_metadata:
-                        thumbnail_path = output_metadata['thumbnail']
-                        if os.path.exists(thumbnail_path):
-                            thumbnail_url = upload_file(thumbnail_path)
-                            del output_metadata['thumbnail']
-                            output_metadata['thumbnail_url'] = thumbnail_url
-                            os.remove(thumbnail_path)  # Clean up local thumbnail file
-                    output_info.update(output_metadata)
-                
+        # Upload output files (and their thumbnails) concurrently
+        with UploadPool() as upload_pool:
+            pending = []
+            for i, output_filename in enumerate(output_filenames):
+                if not os.path.exists(output_filename):
+                    raise Exception(f"Expected output file {output_filename} not found")
+
+                output_metadata = metadata[i] if metadata and i < len(metadata) else {}
+                thumbnail_future = None
+                if 'thumbnail' in output_metadata:
+                    thumbnail_path = output_metadata.pop('thumbnail')
+                    if os.path.exists(thumbnail_path):
+                        thumbnail_future = upload_pool.submit(thumbnail_path)
+
+                pending.append((upload_pool.submit(output_filename), thumbnail_future, output_metadata))
+
+            output_urls = []
+            for upload_future, thumbnail_future, output_metadata in pending:
+                output_info = {"file_url": upload_future.result()}
+                if thumbnail_future is not None:
+                    output_metadata['thumbnail_url'] = thumbnail_future.result()
+                output_info.update(output_metadata)
                 output_urls.append(output_info)
-                os.remove(output_filename)  # Clean up local output file after upload
-            else:
-                raise Exception(f"Expected output file {output_filename} not found")
 
         return output_urls, "/v1/ffmpeg/compose", 200
         
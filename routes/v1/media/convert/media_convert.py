@@ -19,7 +19,7 @@ from app_utils import validate_payload, queue_task_wrapper
 import logging
 from services.v1.media.convert.media_convert import process_media_convert
 from services.authentication import authenticate
-from services.cloud_storage import upload_file
+from services.cloud_storage import upload_file, get_stream_output_options
 import os
 
 v1_media_convert_bp = Blueprint('v1_media_convert', __name__)
@@ -58,7 +58,8 @@ def convert_media_format(job_id, data):
     logger.info(f"Job {job_id}: Received media conversion request for media URL: {media_url} to format: {output_format}")
 
     try:
-        output_file = process_media_convert(
+        stream_upload = get_stream_output_options(output_format) is not None
+        result = process_media_convert(
             media_url, 
             job_id, 
             output_format, 
@@ -67,11 +68,12 @@ def convert_media_format(job_id, data):
             video_crf,
             audio_codec,
             audio_bitrate,
-            webhook_url
+            webhook_url,
+            stream_upload=stream_upload
         )
         logger.info(f"Job {job_id}: Media format conversion completed successfully")
 
-        cloud_url = upload_file(output_file)
+        cloud_url = result if stream_upload else upload_file(result)
         logger.info(f"Job {job_id}: Converted media uploaded to cloud storage: {cloud_url}")
         
         return cloud_url, "/v1/media/convert", 200
@@ -22,7 +22,7 @@ from app_utils import *
 import logging
 from services.v1.media.convert.media_to_mp3 import process_media_to_mp3
 from services.authentication import authenticate
-from services.cloud_storage import upload_file
+from services.cloud_storage import upload_file, get_stream_output_options
 import os
 
 v1_media_convert_mp3_bp = Blueprint('v1_media_convert_mp3', __name__)
@@ -54,10 +54,11 @@ def convert_media_to_mp3(job_id, data):
     logger.info(f"Job {job_id}: Received media-to-mp3 request for media URL: {media_url}")
 
     try:
-        output_file = process_media_to_mp3(media_url, job_id, bitrate, sample_rate)
+        stream_upload = get_stream_output_options('mp3') is not None
+        result = process_media_to_mp3(media_url, job_id, bitrate, sample_rate, stream_upload=stream_upload)
         logger.info(f"Job {job_id}: Media conversion process completed successfully")
 
-        cloud_url = upload_file(output_file)
+        cloud_url = result if stream_upload else upload_file(result)
         logger.info(f"Job {job_id}: Converted media uploaded to cloud storage: {cloud_url}")
 
         return cloud_url, "/v1/media/transform/mp3", 200
@@ -6,7 +6,7 @@ import yt_dlp
 import tempfile
 from werkzeug.utils import secure_filename
 import uuid
-from services.cloud_storage import upload_file
+from services.cloud_storage import UploadPool
 from services.authentication import authenticate
 from services.file_management import download_file
 from urllib.parse import quote, urlparse
@@ -171,18 +171,17 @@ def download_media(job_id, data):
                 if download_options.get('retries'):
                     ydl_opts['retries'] = download_options['retries']
 
-            # Download the media
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Download the media; uploads run concurrently through the pool
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl, UploadPool() as upload_pool:
                 info = ydl.extract_info(media_url, download=data.get('cloud_upload', True))
                 
+                media_upload = None
                 if not data.get('cloud_upload', True):
                     media_url = info['url']
                 else:
                     filename = ydl.prepare_filename(info)
-                    # Upload to cloud storage
-                    media_url = upload_file(filename)
-                    # Clean up the temporary file
-                    os.remove(filename)
+                    # Upload to cloud storage (the temporary file is removed once uploaded)
+                    media_upload = upload_pool.submit(filename)
 
                 # Prepare response
                 response = {
@@ -209,29 +208,32 @@ def download_media(job_id, data):
 
                 # Add thumbnails if available and requested
                 if info.get('thumbnails') and thumbnail_options.get('download', False):
-                    response["thumbnails"] = []
+                    thumbnail_uploads = []
                     for thumbnail in info['thumbnails']:
                         if thumbnail.get('url'):
                             try:
-                                # Download the thumbnail first
+                                # Download the thumbnail first, then upload it in the background
                                 thumbnail_path = download_file(thumbnail['url'], temp_dir)
-                                # Upload to cloud storage
-                                thumbnail_url = upload_file(thumbnail_path)
-                                # Clean up the temporary thumbnail file
-                                os.remove(thumbnail_path)
-                                
-                                response["thumbnails"].append({
-                                    "id": thumbnail.get('id', 'default'),
-                                    "image_url": thumbnail_url,
-                                    "width": thumbnail.get('width'),
-                                    "height": thumbnail.get('height'),
-                                    "original_format": thumbnail.get('ext'),
-                                    "converted": thumbnail.get('converted', False)
-                                })
+                                thumbnail_uploads.append((thumbnail, upload_pool.submit(thumbnail_path)))
                             except Exception as e:
                                 logger.error(f"Error processing thumbnail: {str(e)}")
                                 continue
 
+                    response["thumbnails"] = []
+                    for thumbnail, thumbnail_upload in thumbnail_uploads:
+                        try:
+                            response["thumbnails"].append({
+                                "id": thumbnail.get('id', 'default'),
+                                "image_url": thumbnail_upload.result(),
+                                "width": thumbnail.get('width'),
+                                "height": thumbnail.get('height'),
+                                "original_format": thumbnail.get('ext'),
+                                "converted": thumbnail.get('converted', False)
+                            })
+                        except Exception as e:
+                            logger.error(f"Error processing thumbnail: {str(e)}")
+                            continue
+
                 # Process subtitles if available
                 if 'subtitles' in info and subtitle_options.get('download', False):
                     logger.info(f"Job {job_id}: Found subtitles in info: {info['subtitles']}")
@@ -245,6 +247,7 @@ def download_media(job_id, data):
                         requested_languages = list(info['subtitles'].keys())
                         logger.info(f"Job {job_id}: No languages specified, using all available: {requested_languages}")
                     
+                    subtitle_uploads = []
                     for lang, subtitle_list in info['subtitles'].items():
                         # Skip if language not in requested list
                         if lang not in requested_languages:
@@ -263,15 +266,14 @@ def download_media(job_id, data):
                                 logger.warning(f"Job {job_id}: Requested format {requested_format} not available for {lang}")
                                 continue
                             
-                            # If cloud upload is requested, download and upload the subtitle
+                            # If cloud upload is requested, download the subtitle and upload it in the background
                             if subtitle_cloud_upload:
                                 try:
                                     subtitle_path = download_file(subtitle_data['url'], temp_dir)
-                                    cloud_url = upload_file(subtitle_path)
-                                    subtitle_data['url'] = cloud_url
+                                    subtitle_uploads.append((lang, subtitle_data, upload_pool.submit(subtitle_path)))
                                 except Exception as e:
                                     logger.warning(f"Job {job_id}: Failed to download subtitle for {lang}: {str(e)}")
-                                    continue
+                                continue
                             
                             # Add subtitle data to response using language code as key
                             response["subtitles"][lang] = subtitle_data
@@ -279,8 +281,20 @@ def download_media(job_id, data):
                         except Exception as e:
                             logger.error(f"Job {job_id}: Error processing subtitle: {str(e)}")
                             continue
+
+                    for lang, subtitle_data, subtitle_upload in subtitle_uploads:
+                        try:
+                            subtitle_data['url'] = subtitle_upload.result()
+                        except Exception as e:
+                            logger.warning(f"Job {job_id}: Failed to upload subtitle for {lang}: {str(e)}")
+                            continue
+                        response["subtitles"][lang] = subtitle_data
+                        logger.info(f"Job {job_id}: Successfully processed subtitle for {lang}")
                 else:
                     logger.info(f"Job {job_id}: No subtitles found in info or download not requested")
+
+                if media_upload is not None:
+                    response["media"]["media_url"] = media_upload.result()
                 
                 return response, "/v1/media/download", 200
 
@@ -4,6 +4,7 @@ import logging
 from services.ass_toolkit import generate_ass_captions_v1
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
+from services import job_artifacts
 import os
 import requests
 
@@ -81,6 +82,7 @@ logger = logging.getLogger(__name__)
             }
         },
         "language": {"type": "string"},
+        "engine": {"type": "string", "enum": ["openai-whisper", "faster-whisper"]},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"}
     },
@@ -102,6 +104,7 @@ def generate_ass_v1(job_id, data):
     webhook_url = data.get('webhook_url')
     id = data.get('id')
     language = data.get('language', 'auto')
+    engine = data.get('engine', None)
     canvas_width = data.get('canvas_width')
     canvas_height = data.get('canvas_height')
 
@@ -120,7 +123,8 @@ def generate_ass_v1(job_id, data):
             job_id=job_id,
             language=language,
             PlayResX=canvas_width,
-            PlayResY=canvas_height
+            PlayResY=canvas_height,
+            engine=engine
         )
         if isinstance(output, dict) and 'error' in output:
             if 'available_fonts' in output:
@@ -142,3 +146,6 @@ def generate_ass_v1(job_id, data):
     except Exception as e:
         logger.error(f"Job {job_id}: Error during ASS generation process - {str(e)}", exc_info=True)
         return {"error": str(e)}, "/v1/media/generate/ass", 500
+    finally:
+        # Remove the media downloaded to transcribe and size the captions
+        job_artifacts.release(job_id)
@@ -23,6 +23,7 @@ import os
 from services.v1.media.media_transcribe import process_transcribe_media
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
+from services.partial_results import PartialPublisher
 
 v1_media_transcribe_bp = Blueprint('v1_media_transcribe', __name__)
 logger = logging.getLogger(__name__)
@@ -42,7 +43,17 @@ logger = logging.getLogger(__name__)
         "language": {"type": "string"},
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"},
-        "words_per_line": {"type": "integer", "minimum": 1}
+        "words_per_line": {"type": "integer", "minimum": 1},
+        "engine": {"type": "string", "enum": ["openai-whisper", "faster-whisper"]},
+        "vad": {"type": "boolean"},
+        "tasks": {
+            "type": "array",
+            "items": {"type": "string", "enum": ["transcribe", "translate"]},
+            "minItems": 1,
+            "uniqueItems": True
+        },
+        "partial_results": {"type": "boolean"},
+        "partial_webhook": {"type": "boolean"}
     },
     "required": ["media_url"],
     "additionalProperties": False
@@ -60,49 +71,69 @@ def transcribe(job_id, data):
     webhook_url = data.get('webhook_url')
     id = data.get('id')
     words_per_line = data.get('words_per_line', None)
+    engine = data.get('engine', None)
+    vad = data.get('vad', None)
+    tasks = data.get('tasks', None)
+    partial_results = data.get('partial_results', False)
+    partial_webhook = data.get('partial_webhook', False)
 
     logger.info(f"Job {job_id}: Received transcription request for {media_url}")
 
+    # Only when asked for are segments published to the job record (and optionally the webhook)
+    # as they finish; openai-whisper transcribes window by window to produce them
+    publisher = None
+    if partial_results or partial_webhook:
+        publisher = PartialPublisher(job_id, webhook_url if partial_webhook else None, id)
+
     try:
-        result = process_transcribe_media(media_url, task, include_text, include_srt, include_segments, word_timestamps, response_type, language, job_id, words_per_line)
+        result = process_transcribe_media(media_url, task, include_text, include_srt, include_segments, word_timestamps, response_type, language, job_id, words_per_line, engine, vad, tasks, publisher.publish if publisher else None)
         logger.info(f"Job {job_id}: Transcription process completed successfully")
 
-        # If the result is a file path, upload it using the unified upload_file() method
-        if response_type == "direct":
-           
-            result_json = {
-                "text": result[0],
-                "srt": result[1],
-                "segments": result[2],
-                "text_url": None,
-                "srt_url": None,
-                "segments_url": None,
+        if tasks:
+            # One output object per task, e.g. {"transcribe": {...}, "translate": {...}}
+            response = {
+                run_task: build_task_response(result[0][run_task], result[1][run_task], result[2][run_task], response_type)
+                for run_task in tasks
             }
-
-            return result_json, "/v1/transcribe/media", 200
-
         else:
+            response = build_task_response(result[0], result[1], result[2], response_type)
+        response.update(result[3])
 
-            cloud_urls = {
-                "text": None,
-                "srt": None,
-                "segments": None,
-                "text_url": upload_file(result[0]) if include_text is True else None,
-                "srt_url": upload_file(result[1]) if include_srt is True else None,
-                "segments_url": upload_file(result[2]) if include_segments is True else None,
-            }
-
-            if include_text is True:
-                os.remove(result[0])  # Remove the temporary file after uploading
-            
-            if include_srt is True:
-                os.remove(result[1])
-
-            if include_segments is True:
-                os.remove(result[2])
-            
-            return cloud_urls, "/v1/transcribe/media", 200
+        return response, "/v1/transcribe/media", 200
 
     except Exception as e:
         logger.error(f"Job {job_id}: Error during transcription process - {str(e)}")
         return str(e), "/v1/transcribe/media", 500
+
+    finally:
+        if publisher is not None:
+            publisher.close()
+
+def build_task_response(text, srt, segments, response_type):
+    """Build the response fields for one task, uploading the output files for cloud responses."""
+    # If the result is a file path, upload it using the unified upload_file() method
+    if response_type == "direct":
+        return {
+            "text": text,
+            "srt": srt,
+            "segments": segments,
+            "text_url": None,
+            "srt_url": None,
+            "segments_url": None,
+        }
+
+    cloud_urls = {
+        "text": None,
+        "srt": None,
+        "segments": None,
+        "text_url": upload_file(text) if text is not None else None,
+        "srt_url": upload_file(srt) if srt is not None else None,
+        "segments_url": upload_file(segments) if segments is not None else None,
+    }
+
+    # Remove the temporary files after uploading
+    for path in (text, srt, segments):
+        if path is not None:
+            os.remove(path)
+
+    return cloud_urls
@@ -0,0 +1,43 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import logging
+from flask import Blueprint
+from services.authentication import authenticate
+from services.font_index import refresh_font_index
+from app_utils import queue_task_wrapper
+
+v1_toolkit_fonts_bp = Blueprint('v1_toolkit_fonts', __name__)
+logger = logging.getLogger(__name__)
+
+@v1_toolkit_fonts_bp.route('/v1/toolkit/fonts/refresh', methods=['POST'])
+@authenticate
+@queue_task_wrapper(bypass_queue=True)
+def refresh_fonts(job_id, data):
+    logger.info(f"Job {job_id}: Rebuilding font index")
+    endpoint = "/v1/toolkit/fonts/refresh"
+    try:
+        index = refresh_font_index()
+        return {
+            "font_families": index.family_names(),
+            "count": len(index.families),
+            "build_seconds": index.build_seconds
+        }, endpoint, 200
+    except Exception as e:
+        logger.error(f"Job {job_id}: Error rebuilding font index: {str(e)}")
+        return {"error": f"Failed to rebuild font index: {str(e)}"}, endpoint, 500
@@ -22,6 +22,7 @@ import logging
 from flask import Blueprint, request
 from config import LOCAL_STORAGE_PATH
 from services.authentication import authenticate
+from services.partial_results import read_partials
 from app_utils import queue_task_wrapper, validate_payload
 
 v1_toolkit_job_status_bp = Blueprint('v1_toolkit_job_status', __name__)
@@ -34,6 +35,10 @@ logger = logging.getLogger(__name__)
     "properties": {
         "job_id": {
             "type": "string"
+        },
+        "partial_offset": {
+            "type": "integer",
+            "minimum": 0
         }
     },
     "required": ["job_id"],
@@ -56,6 +61,16 @@ def get_job_status(job_id, data):
         # Read the job status file
         with open(job_file_path, 'r') as file:
             job_status = json.load(file)
+
+        # While a job runs, include the segments it has published since partial_offset, grouped by task
+        if job_status.get("job_status") != "done":
+            batches, partial_offset = read_partials(get_job_id, data.get('partial_offset', 0))
+            partial_segments = {}
+            for batch in batches:
+                partial_segments.setdefault(batch["task"], []).extend(batch["segments"])
+            if partial_segments or partial_offset:
+                job_status["partial_segments"] = partial_segments
+                job_status["partial_offset"] = partial_offset
         
         # Return the job status file content directly
         return job_status, endpoint, 200
@@ -0,0 +1,95 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import logging
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from config import LOCAL_STORAGE_PATH, JOB_STREAM_MAX_SECONDS
+from services.authentication import authenticate
+from services.partial_results import read_partials
+
+v1_toolkit_job_stream_bp = Blueprint('v1_toolkit_job_stream', __name__)
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.5
+KEEPALIVE_SECONDS = 15
+
+def _read_status(job_file):
+    try:
+        with open(job_file, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        # The status file is rewritten in place; try again on the next poll
+        return None
+
+@v1_toolkit_job_stream_bp.route('/v1/toolkit/job/stream', methods=['GET'])
+@authenticate
+def stream_job():
+    get_job_id = request.args.get('job_id')
+    if not get_job_id:
+        return jsonify({"message": "Missing job_id query parameter"}), 400
+
+    # Resume after the last batch received; EventSource sends it back as Last-Event-ID
+    start_offset = request.args.get('offset', request.headers.get('Last-Event-ID', '0'))
+    try:
+        start_offset = int(start_offset)
+    except ValueError:
+        start_offset = -1
+    if start_offset < 0:
+        return jsonify({"message": "offset must be a non-negative integer"}), 400
+
+    job_file = os.path.join(LOCAL_STORAGE_PATH, 'jobs', f"{get_job_id}.json")
+    if not os.path.exists(job_file):
+        return jsonify({"error": "Job not found", "job_id": get_job_id}), 404
+
+    logger.info(f"Streaming partial results for job {get_job_id}")
+
+    def events():
+        offset = start_offset
+        started = last_sent = time.time()
+        while True:
+            # Read the status first: partials are all written before a job is marked done
+            status = _read_status(job_file)
+            batches, offset = read_partials(get_job_id, offset)
+            for index, batch in enumerate(batches):
+                # The last batch carries the offset to resume from
+                event_id = f"id: {offset}\n" if index == len(batches) - 1 else ""
+                yield f"{event_id}event: segments\ndata: {json.dumps(batch)}\n\n"
+                last_sent = time.time()
+
+            if status is not None and status.get("job_status") in ("done", "failed"):
+                yield f"event: done\ndata: {json.dumps(status.get('response'))}\n\n"
+                return
+
+            # An open stream holds a synchronous worker, which Gunicorn kills after its timeout
+            if time.time() - started >= JOB_STREAM_MAX_SECONDS:
+                yield f"event: timeout\ndata: {json.dumps({'offset': offset})}\n\n"
+                return
+
+            if time.time() - last_sent >= KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            time.sleep(POLL_SECONDS)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -22,12 +22,51 @@ import logging
 from services.ass_toolkit import generate_ass_captions_v1
 from services.authentication import authenticate
 from services.cloud_storage import upload_file
+from services.cpu_budget import ffmpeg_output_kwargs
+from services import job_artifacts
 import os
+import ffmpeg
 import requests  # Ensure requests is imported for webhook handling
 
 v1_video_caption_bp = Blueprint('v1_video/caption', __name__)
 logger = logging.getLogger(__name__)
 
+# FFmpeg stderr fragments meaning the input couldn't be opened or read, as opposed to a failed render
+INPUT_READ_ERRORS = (
+    "Error opening input",
+    "Server returned",
+    "Connection refused",
+    "Connection reset",
+    "Connection timed out",
+    "Stream ends prematurely",
+    "Error in the pull function",
+    "Input/output error",
+    "moov atom not found",
+    "Invalid data found when processing input"
+)
+
+def burn_subtitles(video_input, ass_path, output_path):
+    """Render ass_path onto video_input, a local path or a URL FFmpeg reads directly."""
+    ffmpeg.input(video_input).output(
+        output_path,
+        vf=f"subtitles='{ass_path}'",
+        acodec='copy',
+        **ffmpeg_output_kwargs()
+    ).run(overwrite_output=True, capture_stderr=True)
+
+def is_input_read_error(error):
+    """Return True if an ffmpeg.Error was caused by reading the input rather than by rendering."""
+    stderr = error.stderr.decode('utf8', errors='replace') if error.stderr else ""
+    return any(fragment in stderr for fragment in INPUT_READ_ERRORS)
+
+def ffmpeg_error_message(error):
+    """Return the last line FFmpeg wrote to stderr, or the exception text."""
+    if isinstance(error, ffmpeg.Error) and error.stderr:
+        lines = error.stderr.decode('utf8', errors='replace').strip().splitlines()
+        if lines:
+            return lines[-1]
+    return str(error)
+
 @v1_video_caption_bp.route('/v1/video/caption', methods=['POST'])
 @authenticate
 @validate_payload({
@@ -99,7 +138,8 @@ logger = logging.getLogger(__name__)
         },
         "webhook_url": {"type": "string", "format": "uri"},
         "id": {"type": "string"},
-        "language": {"type": "string"}
+        "language": {"type": "string"},
+        "engine": {"type": "string", "enum": ["openai-whisper", "faster-whisper"]}
     },
     "required": ["video_url"],
     "additionalProperties": False
@@ -114,6 +154,7 @@ def caption_video_v1(job_id, data):
     webhook_url = data.get('webhook_url')
     id = data.get('id')
     language = data.get('language', 'auto')
+    engine = data.get('engine', None)
 
     logger.info(f"Job {job_id}: Received v1 captioning request for {video_url}")
     logger.info(f"Job {job_id}: Settings received: {settings}")
@@ -126,7 +167,7 @@ def caption_video_v1(job_id, data):
         # This ensures position and alignment remain independent keys.
         
         # Process video with the enhanced v1 service
-        output = generate_ass_captions_v1(video_url, captions, settings, replace, exclude_time_ranges, job_id, language)
+        output = generate_ass_captions_v1(video_url, captions, settings, replace, exclude_time_ranges, job_id, language, engine=engine)
         
         if isinstance(output, dict) and 'error' in output:
             # Check if this is a font-related error by checking for 'available_fonts' key
@@ -145,29 +186,34 @@ def caption_video_v1(job_id, data):
         output_filename = f"{job_id}_captioned.mp4"
         output_path = os.path.join(os.path.dirname(ass_path), output_filename)
 
-        # Download the video (if not already local)
-        video_path = None
-        try:
-            from services.file_management import download_file
-            from config import LOCAL_STORAGE_PATH
-            video_path = download_file(video_url, LOCAL_STORAGE_PATH)
-            logger.info(f"Job {job_id}: Video downloaded to {video_path}")
-        except Exception as e:
-            logger.error(f"Job {job_id}: Video download error: {str(e)}")
-            return {"error": str(e)}, "/v1/video/caption", 500
-
-        # Render the video with subtitles using FFmpeg
-        try:
-            import ffmpeg
-            ffmpeg.input(video_path).output(
-                output_path,
-                vf=f"subtitles='{ass_path}'",
-                acodec='copy'
-            ).run(overwrite_output=True)
-            logger.info(f"Job {job_id}: FFmpeg processing completed. Output saved to {output_path}")
-        except Exception as e:
-            logger.error(f"Job {job_id}: FFmpeg error: {str(e)}")
-            return {"error": f"FFmpeg error: {str(e)}"}, "/v1/video/caption", 500
+        # Render the video with subtitles using FFmpeg. Reuse the copy generate_ass_captions_v1
+        # downloaded for this job; when captions were supplied there is none, so stream from the URL
+        video_path = job_artifacts.local_copy(job_id, video_url)
+        rendered = False
+        if video_path is None:
+            try:
+                burn_subtitles(video_url, ass_path, output_path)
+                rendered = True
+            except ffmpeg.Error as e:
+                if not is_input_read_error(e):
+                    logger.error(f"Job {job_id}: FFmpeg error: {ffmpeg_error_message(e)}")
+                    return {"error": f"FFmpeg error: {ffmpeg_error_message(e)}"}, "/v1/video/caption", 500
+                # Some sources can't be read over HTTP by FFmpeg (no range requests, moov at the end); download them and render again
+                logger.warning(f"Job {job_id}: Reading the video from the URL failed ({ffmpeg_error_message(e)}), downloading it")
+                try:
+                    video_path = job_artifacts.get_or_download(job_id, video_url)
+                    logger.info(f"Job {job_id}: Video downloaded to {video_path}")
+                except Exception as e:
+                    logger.error(f"Job {job_id}: Video download error: {str(e)}")
+                    return {"error": str(e)}, "/v1/video/caption", 500
+
+        if not rendered:
+            try:
+                burn_subtitles(video_path, ass_path, output_path)
+            except Exception as e:
+                logger.error(f"Job {job_id}: FFmpeg error: {ffmpeg_error_message(e)}")
+                return {"error": f"FFmpeg error: {ffmpeg_error_message(e)}"}, "/v1/video/caption", 500
+        logger.info(f"Job {job_id}: FFmpeg processing completed. Output saved to {output_path}")
 
         # Clean up the ASS file after use
         os.remove(ass_path)
@@ -185,3 +231,6 @@ def caption_video_v1(job_id, data):
     except Exception as e:
         logger.error(f"Job {job_id}: Error during captioning process - {str(e)}", exc_info=True)
         return {"error": str(e)}, "/v1/video/caption", 500
+    finally:
+        # Remove the downloaded source video on every path
+        job_artifacts.release(job_id)
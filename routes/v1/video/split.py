@@ -19,7 +19,9 @@
 from flask import Blueprint
 from app_utils import *
 import logging
+import os
 from services.v1.video.split import split_video
+from services.cloud_storage import UploadPool
 from services.authentication import authenticate
 
 v1_video_split_bp = Blueprint('v1_video_split', __name__)
@@ -71,41 +73,30 @@ def video_split(job_id, data):
     logger.info(f"Job {job_id}: Received video split request for {video_url}")
     
     try:
-        # Process the video file and get list of output files
-        output_files, input_filename = split_video(
-            video_url=video_url,
-            splits=splits,
-            job_id=job_id,
-            video_codec=video_codec,
-            video_preset=video_preset,
-            video_crf=video_crf,
-            audio_codec=audio_codec,
-            audio_bitrate=audio_bitrate
-        )
-        
-        # Upload all output files to cloud storage
-        from services.cloud_storage import upload_file
-        result_files = []
-        
-        for i, output_file in enumerate(output_files):
-            cloud_url = upload_file(output_file)
-            result_files.append({
-                "file_url": cloud_url,
-                "start": splits[i]["start"],
-                "end": splits[i]["end"]
-            })
-            # Remove the local file after upload
-            import os
-            os.remove(output_file)
-            logger.info(f"Job {job_id}: Uploaded and removed split file {i+1}")
-        
+        # Process the video file, uploading each split as soon as it is encoded
+        with UploadPool() as upload_pool:
+            output_files, input_filename = split_video(
+                video_url=video_url,
+                splits=splits,
+                job_id=job_id,
+                video_codec=video_codec,
+                video_preset=video_preset,
+                video_crf=video_crf,
+                audio_codec=audio_codec,
+                audio_bitrate=audio_bitrate,
+                upload_pool=upload_pool
+            )
+
+            # Wait for the remaining uploads; URLs come back in split order
+            cloud_urls = upload_pool.results()
+            logger.info(f"Job {job_id}: Uploaded and removed {len(cloud_urls)} split files")
+
         # Clean up input file
-        import os
         os.remove(input_filename)
         logger.info(f"Job {job_id}: Removed input file")
         
         # Prepare the response with only file URLs
-        response = [{"file_url": item["file_url"]} for item in result_files]
+        response = [{"file_url": cloud_url} for cloud_url in cloud_urls]
         
         logger.info(f"Job {job_id}: Video split operation completed successfully")
         return response, "/v1/video/split", 200
@@ -17,15 +17,22 @@
 
 
 import os
+import time
 import ffmpeg
 import logging
 import subprocess
-import whisper
 from datetime import timedelta
 import srt
 import re
-from services.file_management import download_file
+import bisect
+import itertools
 from services.cloud_storage import upload_file  # Ensure this import is present
+from services.transcription_engines import get_engine
+from services import transcription_cache
+from services import job_artifacts
+from services.audio_artifact import load_audio
+from services.font_index import get_font_index
+from services.transcript import Transcript, format_ass_times
 import requests  # Ensure requests is imported for webhook handling
 from urllib.parse import urlparse
 from config import LOCAL_STORAGE_PATH
@@ -62,16 +69,24 @@ def rgb_to_ass_color(rgb_color):
             return f"&H00{b:02X}{g:02X}{r:02X}"
     return "&H00FFFFFF"
 
-def generate_transcription(video_path, language='auto'):
+def generate_transcription(video_path, language='auto', engine=None):
     try:
-        model = whisper.load_model("base")
         transcription_options = {
             'word_timestamps': True,
             'verbose': True,
         }
         if language != 'auto':
             transcription_options['language'] = language
-        result = model.transcribe(video_path, **transcription_options)
+
+        # Shares entries with /v1/media/transcribe requests made with word_timestamps
+        cache_key = transcription_cache.cache_key(video_path, engine, "base", "transcribe", transcription_options.get('language'), True)
+        cached = transcription_cache.get(cache_key)
+        if cached is not None:
+            return cached["result"]
+
+        start_time = time.time()
+        result = get_engine(engine).transcribe(load_audio(video_path), "base", **transcription_options)
+        transcription_cache.put(cache_key, {"result": result, "metadata": {}}, time.time() - start_time)
         logger.info(f"Transcription generated successfully for video: {video_path}")
         return result
     except Exception as e:
@@ -94,24 +109,25 @@ def get_video_resolution(video_path):
         logger.error(f"Error getting video resolution: {str(e)}. Using default resolution 384x288.")
         return 384, 288
 
-def get_available_fonts():
-    """Get the list of available fonts on the system."""
+def get_remote_video_resolution(video_url):
+    """
+    Read the video resolution straight from the URL with a small probesize, as
+    get_media_metadata does, instead of downloading the file first.
+    Returns None if the URL can't be probed or no video stream shows up in the probe.
+    """
     try:
-        import matplotlib.font_manager as fm
-    except ImportError:
-        logger.error("matplotlib not installed. Install via 'pip install matplotlib'.")
-        return []
-    font_list = fm.findSystemFonts(fontpaths=None, fontext='ttf')
-    font_names = set()
-    for font in font_list:
-        try:
-            font_prop = fm.FontProperties(fname=font)
-            font_name = font_prop.get_name()
-            font_names.add(font_name)
-        except Exception:
-            continue
-    logger.info(f"Available fonts retrieved: {font_names}")
-    return list(font_names)
+        probe = ffmpeg.probe(video_url, probesize='100K', analyzeduration='100K')
+    except Exception as e:
+        logger.warning(f"Remote probe of {video_url} failed: {str(e)}")
+        return None
+    video_streams = [s for s in probe['streams'] if s['codec_type'] == 'video' and 'width' in s and 'height' in s]
+    if not video_streams:
+        logger.warning(f"Remote probe of {video_url} found no video stream dimensions.")
+        return None
+    width = int(video_streams[0]['width'])
+    height = int(video_streams[0]['height'])
+    logger.info(f"Video resolution determined from URL: {width}x{height}")
+    return width, height
 
 def format_ass_time(seconds):
     """Convert float seconds to ASS time format H:MM:SS.cc"""
@@ -121,10 +137,110 @@ def format_ass_time(seconds):
     centiseconds = int(round((seconds - int(seconds)) * 100))
     return f"{hours}:{minutes:02}:{secs:02}.{centiseconds:02}"
 
-def process_subtitle_text(text, replace_dict, all_caps, max_words_per_line):
+def _fold_case(text):
+    """Lower-case text so characters re.IGNORECASE treats as equal compare equal."""
+    return ''.join(c.upper().lower() if len(c.upper()) == 1 else c.lower() for c in text)
+
+class _FindIndex:
+    """Prefixes, suffixes and substrings of folded find strings, for overlap lookups."""
+
+    def __init__(self, finds):
+        self.prefixes, self.suffixes, self.substrings, self.wholes = {}, {}, {}, {}
+        for j, find in enumerate(finds):
+            self.wholes.setdefault(find, set()).add(j)
+            for k in range(1, len(find) + 1):
+                self.prefixes.setdefault(find[:k], set()).add(j)
+                self.suffixes.setdefault(find[-k:], set()).add(j)
+                for start in range(len(find) - k + 1):
+                    self.substrings.setdefault(find[start:start + k], set()).add(j)
+
+    def overlapping(self, text):
+        """Return the finds a match of which could share characters with an occurrence of text."""
+        found = set(self.substrings.get(text, ()))
+        for k in range(1, len(text) + 1):
+            # A find starting inside text and running past its end, or ending inside it
+            found |= self.prefixes.get(text[-k:], set())
+            found |= self.suffixes.get(text[:k], set())
+            for start in range(len(text) - k + 1):
+                found |= self.wholes.get(text[start:start + k], set())
+        return found
+
+def rules_are_independent(rules):
+    """
+    Return True if applying (find, replace) rules in a single pass gives the same text as
+    applying them one after another with re.sub.
+
+    That holds when no two finds can match overlapping text, no later find can match text
+    that includes part of an earlier replacement (or, for an empty replacement, span the
+    gap it closes), and replacements are plain strings rather than re.sub templates.
+    """
+    finds = [_fold_case(old_word) for old_word, _ in rules]
+    if not all(finds) or any('\\' in new_word for _, new_word in rules):
+        return False
+    index = _FindIndex(finds)
+    last_long_find = max((j for j, find in enumerate(finds) if len(find) > 1), default=-1)
+    for i, (_, new_word) in enumerate(rules):
+        if index.overlapping(finds[i]) - {i}:
+            return False
+        replacement = _fold_case(new_word)
+        if replacement:
+            if any(j > i for j in index.overlapping(replacement)):
+                return False
+        elif last_long_find > i:
+            return False
+    return True
+
+class TextReplacer:
+    """
+    Caption find/replace rules, compiled once per request.
+
+    Rules keep their documented meaning: each is applied in order, case-insensitively, to
+    the result of the previous ones, as re.sub(re.escape(find), replace, ...). When the
+    rules can't interact (see rules_are_independent), as with a glossary of distinct terms,
+    they are matched in one left-to-right pass over a single alternation instead, so a
+    large glossary costs one regex scan per word rather than one per rule.
+    """
+
+    def __init__(self, replace_dict):
+        rules = list(replace_dict.items())
+        self._pattern = None
+        self._sequential = None
+        if rules and rules_are_independent(rules):
+            self._replacements = [new_word for _, new_word in rules]
+            self._pattern = re.compile(
+                '|'.join(f"({re.escape(old_word)})" for old_word, _ in rules),
+                re.IGNORECASE
+            )
+        elif rules:
+            self._sequential = [(re.compile(re.escape(old_word), re.IGNORECASE), new_word) for old_word, new_word in rules]
+        # Handlers call apply() per word and transcripts repeat words heavily
+        self._cache = {}
+
+    def _substitute(self, match):
+        return self._replacements[match.lastindex - 1]
+
+    def _apply(self, text):
+        if self._pattern is not None:
+            return self._pattern.sub(self._substitute, text)
+        for pattern, new_word in self._sequential:
+            text = pattern.sub(new_word, text)
+        return text
+
+    def apply(self, text):
+        if self._pattern is None and self._sequential is None:
+            return text
+        result = self._cache.get(text)
+        if result is None:
+            result = self._apply(text)
+            if len(self._cache) < 100000:
+                self._cache[text] = result
+        return result
+
+def process_subtitle_text(text, replacer, all_caps, max_words_per_line):
     """Apply text transformations: replacements, all caps, and optional line splitting."""
-    for old_word, new_word in replace_dict.items():
-        text = re.sub(re.escape(old_word), new_word, text, flags=re.IGNORECASE)
+    if not isinstance(replacer, TextReplacer):
+        replacer = TextReplacer(replacer)
+    text = replacer.apply(text)
     if all_caps:
         text = text.upper()
     if max_words_per_line > 0:
@@ -134,18 +250,15 @@ def process_subtitle_text(text, replace_dict, all_caps, max_words_per_line):
     return text
 
 def srt_to_transcription_result(srt_content):
-    """Convert SRT content into a transcription-like structure for uniform processing."""
-    subtitles = list(srt.parse(srt_content))
-    segments = []
-    for sub in subtitles:
-        segments.append({
-            'start': sub.start.total_seconds(),
-            'end': sub.end.total_seconds(),
-            'text': sub.content.strip(),
-            'words': []  # SRT does not provide word-level timestamps
-        })
+    """Convert SRT content into a Transcript for uniform processing."""
+    starts, ends, texts = [], [], []
+    for sub in srt.parse(srt_content):
+        starts.append(sub.start.total_seconds())
+        ends.append(sub.end.total_seconds())
+        texts.append(sub.content.strip())
     logger.info("Converted SRT content to transcription result.")
-    return {'segments': segments}
+    # SRT does not provide word-level timestamps
+    return Transcript(starts, ends, texts, [], [], [], [], [])
 
 def split_lines(text, max_words_per_line):
     """Split text into multiple lines if max_words_per_line > 0."""
@@ -248,10 +361,10 @@ def create_style_line(style_options, video_resolution):
     Create the style line for ASS subtitles.
     """
     font_family = style_options.get('font_family', 'Arial')
-    available_fonts = get_available_fonts()
-    if font_family not in available_fonts:
+    font_index = get_font_index()
+    if not font_index.has_family(font_family):
         logger.warning(f"Font '{font_family}' not found.")
-        return {'error': f"Font '{font_family}' not available.", 'available_fonts': available_fonts}
+        return {'error': f"Font '{font_family}' not available.", 'available_fonts': font_index.family_names()}
 
     line_color = rgb_to_ass_color(style_options.get('line_color', '#FFFFFF'))
     secondary_color = line_color
@@ -311,7 +424,19 @@ Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour,
 
 ### STYLE HANDLERS ###
 
-def handle_classic(transcription_result, style_options, replace_dict, video_resolution):
+def mark_each_word(line, words, open_tag, close_tag):
+    """
+    Yield line (the words joined by single spaces) once per word, with that word wrapped
+    in open_tag/close_tag. Each variant is sliced from the joined line rather than
+    re-joined word by word, so a line costs O(words) operations instead of O(words²).
+    """
+    offset = 0
+    for word in words:
+        end = offset + len(word)
+        yield f"{line[:offset]}{open_tag}{word}{close_tag}{line[end:]}"
+        offset = end + 1
+
+def handle_classic(transcript, style_options, replacer, video_resolution):
     """
     Classic style handler: Centers the text based on position and alignment.
     """
@@ -333,19 +458,17 @@ def handle_classic(transcription_result, style_options, replace_dict, video_reso
 
     logger.info(f"[Classic] position={position_str}, alignment={alignment_str}, x={final_x}, y={final_y}, an_code={an_code}")
 
-    events = []
-    for segment in transcription_result['segments']:
-        text = segment['text'].strip().replace('\n', ' ')
+    count = 0
+    for start, end, text, _ in transcript.segments():
+        text = text.strip().replace('\n', ' ')
         lines = split_lines(text, max_words_per_line)
-        processed_text = '\\N'.join(process_subtitle_text(line, replace_dict, all_caps, 0) for line in lines)
-        start_time = format_ass_time(segment['start'])
-        end_time = format_ass_time(segment['end'])
+        processed_text = '\\N'.join(process_subtitle_text(line, replacer, all_caps, 0) for line in lines)
         position_tag = f"{{\\an{an_code}\\pos({final_x},{final_y})}}"
-        events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{position_tag}{processed_text}")
-    logger.info(f"Handled {len(events)} dialogues in classic style.")
-    return "\n".join(events)
+        yield 0, start, end, f"{position_tag}{processed_text}"
+        count += 1
+    logger.info(f"Handled {count} dialogues in classic style.")
 
-def handle_karaoke(transcription_result, style_options, replace_dict, video_resolution):
+def handle_karaoke(transcript, style_options, replacer, video_resolution):
     """
     Karaoke style handler: Highlights words as they are spoken.
     """
@@ -368,9 +491,8 @@ def handle_karaoke(transcription_result, style_options, replace_dict, video_reso
 
     logger.info(f"[Karaoke] position={position_str}, alignment={alignment_str}, x={final_x}, y={final_y}, an_code={an_code}")
 
-    events = []
-    for segment in transcription_result['segments']:
-        words = segment.get('words', [])
+    count = 0
+    for _, _, _, words in transcript.segments():
         if not words:
             continue
 
@@ -378,9 +500,9 @@ def handle_karaoke(transcription_result, style_options, replace_dict, video_reso
             lines_content = []
             current_line = []
             current_line_words = 0
-            for w_info in words:
-                w = process_subtitle_text(w_info.get('word', ''), replace_dict, all_caps, 0)
-                duration_cs = int(round((w_info['end'] - w_info['start']) * 100))
+            for word, w_start, w_end in words:
+                w = process_subtitle_text(word, replacer, all_caps, 0)
+                duration_cs = int(round((w_end - w_start) * 100))
                 highlighted_word = f"{{\\k{duration_cs}}}{w} "
                 current_line.append(highlighted_word)
                 current_line_words += 1
@@ -392,22 +514,20 @@ def handle_karaoke(transcription_result, style_options, replace_dict, video_reso
                 lines_content.append(''.join(current_line).strip())
         else:
             line_content = []
-            for w_info in words:
-                w = process_subtitle_text(w_info.get('word', ''), replace_dict, all_caps, 0)
-                duration_cs = int(round((w_info['end'] - w_info['start']) * 100))
+            for word, w_start, w_end in words:
+                w = process_subtitle_text(word, replacer, all_caps, 0)
+                duration_cs = int(round((w_end - w_start) * 100))
                 highlighted_word = f"{{\\k{duration_cs}}}{w} "
                 line_content.append(highlighted_word)
             lines_content = [''.join(line_content).strip()]
 
         dialogue_text = '\\N'.join(lines_content)
-        start_time = format_ass_time(words[0]['start'])
-        end_time = format_ass_time(words[-1]['end'])
         position_tag = f"{{\\an{an_code}\\pos({final_x},{final_y})}}"
-        events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{position_tag}{{\\c{word_color}}}{dialogue_text}")
-    logger.info(f"Handled {len(events)} dialogues in karaoke style.")
-    return "\n".join(events)
+        yield 0, words[0][1], words[-1][2], f"{position_tag}{{\\c{word_color}}}{dialogue_text}"
+        count += 1
+    logger.info(f"Handled {count} dialogues in karaoke style.")
 
-def handle_highlight(transcription_result, style_options, replace_dict, video_resolution):
+def handle_highlight(transcript, style_options, replacer, video_resolution):
     """
     Highlight style handler: Highlights words sequentially.
     """
@@ -429,21 +549,20 @@ def handle_highlight(transcription_result, style_options, replace_dict, video_re
 
     word_color = rgb_to_ass_color(style_options.get('word_color', '#FFFF00'))
     line_color = rgb_to_ass_color(style_options.get('line_color', '#FFFFFF'))
-    events = []
+    count = 0
 
     logger.info(f"[Highlight] position={position_str}, alignment={alignment_str}, x={final_x}, y={final_y}, an_code={an_code}")
 
-    for segment in transcription_result['segments']:
-        words = segment.get('words', [])
+    for _, _, _, words in transcript.segments():
         if not words:
             continue
 
         # Process all words in the segment
         processed_words = []
-        for w_info in words:
-            w = process_subtitle_text(w_info.get('word', ''), replace_dict, all_caps, 0)
+        for word, w_start, w_end in words:
+            w = process_subtitle_text(word, replacer, all_caps, 0)
             if w:
-                processed_words.append((w, w_info['start'], w_info['end']))
+                processed_words.append((w, w_start, w_end))
 
         if not processed_words:
             continue
@@ -460,34 +579,21 @@ def handle_highlight(transcription_result, style_options, replace_dict, video_re
             line_end = line_set[-1][2]
             
             # Create a persistent line that stays visible during the entire segment
-            base_text = ' '.join(word for word, _, _ in line_set)
-            start_time = format_ass_time(line_start)
-            end_time = format_ass_time(line_end)
+            line_words = [word for word, _, _ in line_set]
+            base_text = ' '.join(line_words)
             position_tag = f"{{\\an{an_code}\\pos({final_x},{final_y})}}"
-            events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{position_tag}{{\\c{line_color}}}{base_text}")
+            yield 0, line_start, line_end, f"{position_tag}{{\\c{line_color}}}{base_text}"
+            count += 1
             
             # Add individual highlighting for each word
-            for idx, (word, w_start, w_end) in enumerate(line_set):
-                # Create the highlighted version of this word within the line
-                highlighted_words = []
-                
-                for i, (w, _, _) in enumerate(line_set):
-                    if i == idx:
-                        # This is the current word - highlight it
-                        highlighted_words.append(f"{{\\c{word_color}}}{w}{{\\c{line_color}}}")
-                    else:
-                        # Add the word without highlighting
-                        highlighted_words.append(w)
-                
-                highlighted_text = ' '.join(highlighted_words)
-                word_start_time = format_ass_time(w_start)
-                word_end_time = format_ass_time(w_end)
-                events.append(f"Dialogue: 1,{word_start_time},{word_end_time},Default,,0,0,0,,{position_tag}{{\\c{line_color}}}{highlighted_text}")
-
-    logger.info(f"Handled {len(events)} dialogues in highlight style.")
-    return "\n".join(events)
-
-def handle_underline(transcription_result, style_options, replace_dict, video_resolution):
+            highlighted_lines = mark_each_word(base_text, line_words, f"{{\\c{word_color}}}", f"{{\\c{line_color}}}")
+            for (word, w_start, w_end), highlighted_text in zip(line_set, highlighted_lines):
+                yield 1, w_start, w_end, f"{position_tag}{{\\c{line_color}}}{highlighted_text}"
+                count += 1
+
+    logger.info(f"Handled {count} dialogues in highlight style.")
+
+def handle_underline(transcript, style_options, replacer, video_resolution):
     """
     Underline style handler: Underlines the current word.
     """
@@ -507,19 +613,18 @@ def handle_underline(transcription_result, style_options, replace_dict, video_re
         video_height=video_resolution[1]
     )
     line_color = rgb_to_ass_color(style_options.get('line_color', '#FFFFFF'))
-    events = []
+    count = 0
 
     logger.info(f"[Underline] position={position_str}, alignment={alignment_str}, x={final_x}, y={final_y}, an_code={an_code}")
 
-    for segment in transcription_result['segments']:
-        words = segment.get('words', [])
+    for _, _, _, words in transcript.segments():
         if not words:
             continue
         processed_words = []
-        for w_info in words:
-            w = process_subtitle_text(w_info.get('word', ''), replace_dict, all_caps, 0)
+        for word, w_start, w_end in words:
+            w = process_subtitle_text(word, replacer, all_caps, 0)
             if w:
-                processed_words.append((w, w_info['start'], w_info['end']))
+                processed_words.append((w, w_start, w_end))
 
         if not processed_words:
             continue
@@ -530,22 +635,15 @@ def handle_underline(transcription_result, style_options, replace_dict, video_re
             line_sets = [processed_words]
 
         for line_set in line_sets:
-            for idx, (word, w_start, w_end) in enumerate(line_set):
-                line_words = []
-                for w_idx, (w_text, _, _) in enumerate(line_set):
-                    if w_idx == idx:
-                        line_words.append(f"{{\\u1}}{w_text}{{\\u0}}")
-                    else:
-                        line_words.append(w_text)
-                full_text = ' '.join(line_words)
-                start_time = format_ass_time(w_start)
-                end_time = format_ass_time(w_end)
+            line_words = [word for word, _, _ in line_set]
+            underlined_lines = mark_each_word(' '.join(line_words), line_words, "{\\u1}", "{\\u0}")
+            for (word, w_start, w_end), full_text in zip(line_set, underlined_lines):
                 position_tag = f"{{\\an{an_code}\\pos({final_x},{final_y})}}"
-                events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{position_tag}{{\\c{line_color}}}{full_text}")
-    logger.info(f"Handled {len(events)} dialogues in underline style.")
-    return "\n".join(events)
+                yield 0, w_start, w_end, f"{position_tag}{{\\c{line_color}}}{full_text}"
+                count += 1
+    logger.info(f"Handled {count} dialogues in underline style.")
 
-def handle_word_by_word(transcription_result, style_options, replace_dict, video_resolution):
+def handle_word_by_word(transcript, style_options, replacer, video_resolution):
     """
     Word-by-Word style handler: Displays each word individually.
     """
@@ -565,12 +663,11 @@ def handle_word_by_word(transcription_result, style_options, replace_dict, video
         video_height=video_resolution[1]
     )
     word_color = rgb_to_ass_color(style_options.get('word_color', '#FFFF00'))
-    events = []
+    count = 0
 
     logger.info(f"[Word-by-Word] position={position_str}, alignment={alignment_str}, x={final_x}, y={final_y}, an_code={an_code}")
 
-    for segment in transcription_result['segments']:
-        words = segment.get('words', [])
+    for _, _, _, words in transcript.segments():
         if not words:
             continue
 
@@ -580,17 +677,16 @@ def handle_word_by_word(transcription_result, style_options, replace_dict, video
             grouped_words = [words]
 
         for word_group in grouped_words:
-            for w_info in word_group:
-                w = process_subtitle_text(w_info.get('word', ''), replace_dict, all_caps, 0)
+            for word, w_start, w_end in word_group:
+                w = process_subtitle_text(word, replacer, all_caps, 0)
                 if not w:
                     continue
-                start_time = format_ass_time(w_info['start'])
-                end_time = format_ass_time(w_info['end'])
                 position_tag = f"{{\\an{an_code}\\pos({final_x},{final_y})}}"
-                events.append(f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{position_tag}{{\\c{word_color}}}{w}")
-    logger.info(f"Handled {len(events)} dialogues in word-by-word style.")
-    return "\n".join(events)
+                yield 0, w_start, w_end, f"{position_tag}{{\\c{word_color}}}{w}"
+                count += 1
+    logger.info(f"Handled {count} dialogues in word-by-word style.")
 
+# Each handler is a generator of (layer, start, end, text) events with times in seconds
 STYLE_HANDLERS = {
     'classic': handle_classic,
     'karaoke': handle_karaoke,
@@ -599,9 +695,68 @@ STYLE_HANDLERS = {
     'word_by_word': handle_word_by_word
 }
 
-def srt_to_ass(transcription_result, style_type, settings, replace_dict, video_resolution):
+class ExcludeIndex:
+    """
+    exclude_time_ranges merged and sorted once, answering "does this event overlap
+    any range" with a bisect instead of a scan over every range.
+    """
+
+    def __init__(self, exclude_time_ranges):
+        ranges = sorted(
+            (parse_time_string(rng['start']), parse_time_string(rng['end']))
+            for rng in exclude_time_ranges or []
+        )
+        merged = []
+        for start, end in ranges:
+            # Only merge ranges that overlap: an instant where two ranges touch is not excluded
+            if merged and start < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def overlaps(self, start, end):
+        # The first range ending after the event starts is the only one that can overlap it
+        i = bisect.bisect_right(self._ends, start)
+        return i < len(self._starts) and self._starts[i] < end
+
+def render_dialogue_lines(events, exclude_time_ranges=None, batch_size=4096):
+    """
+    Format style handler events as ASS Dialogue lines.
+    Events overlapping exclude_time_ranges are dropped on their numeric times, before formatting,
+    and the remaining times are formatted batch_size events at a time.
+    """
+    exclude_index = ExcludeIndex(exclude_time_ranges)
+    events = iter(events)
+    while True:
+        batch = list(itertools.islice(events, batch_size))
+        if not batch:
+            return
+        if exclude_index:
+            batch = [event for event in batch if not exclude_index.overlaps(event[1], event[2])]
+            if not batch:
+                continue
+        layers, starts, ends, texts = zip(*batch)
+        for layer, start_time, end_time, text in zip(layers, format_ass_times(starts), format_ass_times(ends), texts):
+            yield f"Dialogue: {layer},{start_time},{end_time},Default,,0,0,0,,{text}"
+
+def write_ass_file(ass_path, ass_header, dialogue_lines):
+    """Write the ASS header and Dialogue lines to ass_path incrementally."""
+    with open(ass_path, 'w', encoding='utf-8') as f:
+        f.write(ass_header)
+        for line in dialogue_lines:
+            f.write(line)
+            f.write("\n")
+
+def srt_to_ass(transcription_result, style_type, settings, replace_dict, video_resolution, exclude_time_ranges=None):
     """
-    Convert transcription result to ASS based on the specified style.
+    Convert a transcription result (a Transcript or a transcribe() dict) to ASS based on the specified style.
+    Returns the ASS header and a generator of Dialogue lines, so long transcripts
+    can be written out without building the whole document in memory.
     """
     default_style_settings = {
         'line_color': '#FFFFFF',
@@ -639,15 +794,18 @@ def srt_to_ass(transcription_result, style_type, settings, replace_dict, video_r
         logger.warning(f"Unknown style '{style_type}', defaulting to 'classic'.")
         handler = handle_classic
 
-    dialogue_lines = handler(transcription_result, style_options, replace_dict, video_resolution)
-    logger.info("Converted transcription result to ASS format.")
-    return ass_header + dialogue_lines + "\n"
+    # Compile the replace rules once for every word of the transcript
+    replacer = TextReplacer(replace_dict)
+    if not isinstance(transcription_result, Transcript):
+        transcription_result = Transcript.from_whisper(transcription_result)
+    events = handler(transcription_result, style_options, replacer, video_resolution)
+    return ass_header, render_dialogue_lines(events, exclude_time_ranges)
 
-def process_subtitle_events(transcription_result, style_type, settings, replace_dict, video_resolution):
+def process_subtitle_events(transcription_result, style_type, settings, replace_dict, video_resolution, exclude_time_ranges=None):
     """
     Process transcription results into ASS subtitle format.
     """
-    return srt_to_ass(transcription_result, style_type, settings, replace_dict, video_resolution)
+    return srt_to_ass(transcription_result, style_type, settings, replace_dict, video_resolution, exclude_time_ranges)
 
 def parse_time_string(time_str):
     """Parse a time string in hh:mm:ss.ms or mm:ss.ms or ss.ms format to seconds (float)."""
@@ -679,45 +837,27 @@ def filter_subtitle_lines(sub_content, exclude_time_ranges, subtitle_type):
             return int(h) * 3600 + int(m) * 60 + int(s) + int(cs) / 100
         except Exception:
             return 0
-    def parse_time_range(rng):
-        start = parse_time_string(rng['start'])
-        end = parse_time_string(rng['end'])
-        return {'start': start, 'end': end}
-    parsed_ranges = [parse_time_range(rng) for rng in exclude_time_ranges]
-    if not exclude_time_ranges:
+    exclude_index = ExcludeIndex(exclude_time_ranges)
+    if not exclude_index:
         return sub_content
     if subtitle_type == 'ass':
-        lines = sub_content.splitlines()
         filtered_lines = []
-        for line in lines:
+        for line in sub_content.splitlines():
             if line.startswith("Dialogue:"):
-                parts = line.split(",", 10)
+                parts = line.split(",", 3)
                 if len(parts) > 3:
                     start = parse_ass_time(parts[1])
                     end = parse_ass_time(parts[2])
-                    overlap = False
-                    for rng in parsed_ranges:
-                        if start < rng['end'] and end > rng['start']:
-                            overlap = True
-                            break
-                    if overlap:
+                    if exclude_index.overlaps(start, end):
                         continue
             filtered_lines.append(line)
         return "\n".join(filtered_lines)
     elif subtitle_type == 'srt':
-        subtitles = list(srt.parse(sub_content))
-        filtered = []
-        for sub in subtitles:
-            start = sub.start.total_seconds()
-            end = sub.end.total_seconds()
-            overlap = False
-            for rng in parsed_ranges:
-                if start < rng['end'] and end > rng['start']:
-                    overlap = True
-                    break
-            if not overlap:
-                filtered.append(sub)
-        return srt.compose(filtered)
+        # srt.parse is lazy, so blocks are filtered as they are parsed
+        return srt.compose(
+            sub for sub in srt.parse(sub_content)
+            if not exclude_index.overlaps(sub.start.total_seconds(), sub.end.total_seconds())
+        )
     else:
         return sub_content
 
@@ -737,7 +877,7 @@ def normalize_exclude_time_ranges(exclude_time_ranges):
         norm.append({"start": start, "end": end})
     return norm
 
-def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_time_ranges, job_id, language='auto', PlayResX=None, PlayResY=None):
+def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_time_ranges, job_id, language='auto', PlayResX=None, PlayResY=None, engine=None):
     """
     Captioning process with transcription fallback and multiple styles.
     Integrates with the updated logic for positioning and alignment.
@@ -774,11 +914,11 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
 
         # Check font availability
         font_family = style_options.get('font_family', 'Arial')
-        available_fonts = get_available_fonts()
-        if font_family not in available_fonts:
+        font_index = get_font_index()
+        if not font_index.has_family(font_family):
             logger.warning(f"Job {job_id}: Font '{font_family}' not found.")
             # Return font error with available_fonts
-            return {"error": f"Font '{font_family}' not available.", "available_fonts": available_fonts}
+            return {"error": f"Font '{font_family}' not available.", "available_fonts": font_index.family_names()}
 
         logger.info(f"Job {job_id}: Font '{font_family}' is available.")
 
@@ -796,20 +936,29 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
         else:
             captions_content = None
 
-        # Download the video
-        try:
-            video_path = download_file(video_url, LOCAL_STORAGE_PATH)
-            logger.info(f"Job {job_id}: Video downloaded to {video_path}")
-        except Exception as e:
-            logger.error(f"Job {job_id}: Video download error: {str(e)}")
-            # For non-font errors, do NOT include available_fonts
-            return {"error": str(e)}
-
-        # Get video resolution, unless provided
+        # Only transcription needs the whole video. With captions supplied, the resolution is
+        # probed from the URL and the video is left for the render step to fetch, if it needs it
+        video_path = None
+        video_resolution = None
         if PlayResX is not None and PlayResY is not None:
             video_resolution = (PlayResX, PlayResY)
             logger.info(f"Job {job_id}: Using provided PlayResX/PlayResY = {PlayResX}x{PlayResY}")
-        else:
+        elif captions_content:
+            video_resolution = get_remote_video_resolution(video_url)
+            if video_resolution:
+                logger.info(f"Job {job_id}: Video resolution probed from URL = {video_resolution[0]}x{video_resolution[1]}")
+
+        if not captions_content or video_resolution is None:
+            # Download the video; callers that render it afterwards get the same copy from job_artifacts
+            try:
+                video_path = job_artifacts.get_or_download(job_id, video_url)
+                logger.info(f"Job {job_id}: Video downloaded to {video_path}")
+            except Exception as e:
+                logger.error(f"Job {job_id}: Video download error: {str(e)}")
+                # For non-font errors, do NOT include available_fonts
+                return {"error": str(e)}
+
+        if video_resolution is None:
             video_resolution = get_video_resolution(video_path)
             logger.info(f"Job {job_id}: Video resolution detected = {video_resolution[0]}x{video_resolution[1]}")
 
@@ -835,14 +984,15 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
                     return {"error": error_message}
                 transcription_result = srt_to_transcription_result(captions_content)
                 # Generate ASS based on chosen style
-                subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution)
+                subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution, exclude_time_ranges)
                 subtitle_type = 'ass'
         else:
             # No captions provided, generate transcription
             logger.info(f"Job {job_id}: No captions provided, generating transcription.")
-            transcription_result = generate_transcription(video_path, language=language)
+            # Keep only the columnar form; the nested Whisper dict is dropped here
+            transcription_result = Transcript.from_whisper(generate_transcription(video_path, language=language, engine=engine))
             # Generate ASS based on chosen style
-            subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution)
+            subtitle_content = process_subtitle_events(transcription_result, style_type, style_options, replace_dict, video_resolution, exclude_time_ranges)
             subtitle_type = 'ass'
 
         # Check for subtitle processing errors
@@ -854,8 +1004,8 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
             else:
                 return {"error": subtitle_content['error']}
 
-        # After subtitle_content is generated and before saving to file:
-        if exclude_time_ranges:
+        # Generated captions were already filtered on their event times; provided ASS is filtered by line
+        if exclude_time_ranges and isinstance(subtitle_content, str):
             subtitle_content = filter_subtitle_lines(subtitle_content, exclude_time_ranges, subtitle_type)
             if subtitle_type == 'ass':
                 logger.info(f"Job {job_id}: Filtered ASS Dialogue lines due to exclude_time_ranges.")
@@ -866,8 +1016,13 @@ def generate_ass_captions_v1(video_url, captions, settings, replace, exclude_tim
         subtitle_filename = f"{job_id}.{subtitle_type}"
         subtitle_path = os.path.join(LOCAL_STORAGE_PATH, subtitle_filename)
         try:
-            with open(subtitle_path, 'w', encoding='utf-8') as f:
-                f.write(subtitle_content)
+            if isinstance(subtitle_content, str):
+                with open(subtitle_path, 'w', encoding='utf-8') as f:
+                    f.write(subtitle_content)
+            else:
+                # Stream the generated Dialogue lines straight to the file
+                ass_header, dialogue_lines = subtitle_content
+                write_ass_file(subtitle_path, ass_header, dialogue_lines)
             logger.info(f"Job {job_id}: Subtitle file saved to {subtitle_path}")
         except Exception as e:
             logger.error(f"Job {job_id}: Failed to save subtitle file: {str(e)}")
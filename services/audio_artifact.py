@@ -0,0 +1,110 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+import subprocess
+import threading
+import numpy as np
+from services.cloud_storage import hash_file
+from config import LOCAL_STORAGE_PATH, AUDIO_ARTIFACT_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+ARTIFACT_DIR = os.path.join(LOCAL_STORAGE_PATH, 'audio_artifacts')
+_registry_lock = threading.Lock()
+# One lock per artifact so concurrent jobs on the same media decode it once
+_decode_locks = {}
+
+def artifact_path_for(media_path):
+    """Return where the decoded PCM for media_path lives, keyed by the media's content hash."""
+    return os.path.join(ARTIFACT_DIR, f"{hash_file(media_path)}.f32")
+
+def decode_audio(media_path):
+    """
+    Decode media_path once to raw float32 16kHz mono PCM (the format Whisper works in)
+    and return the artifact path. Later calls for identical media reuse the file.
+    """
+    path = artifact_path_for(media_path)
+    with _registry_lock:
+        decode_lock = _decode_locks.setdefault(path, threading.Lock())
+
+    with decode_lock:
+        if os.path.exists(path):
+            # Refresh the modification time so eviction treats the artifact as recently used
+            os.utime(path)
+            return path
+
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        cmd = [
+            'ffmpeg', '-nostdin', '-y', '-i', media_path, '-vn',
+            '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 'f32le', tmp_path
+        ]
+        logger.info(f"Decoding audio artifact for {media_path}")
+        result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Exception(f"FFmpeg audio decode failed: {result.stderr[-500:]}")
+        os.replace(tmp_path, path)
+
+    _evict(keep=path)
+    return path
+
+def open_audio(artifact_path):
+    """Memory-map a decoded artifact as a read-only float32 array."""
+    if os.path.getsize(artifact_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(artifact_path, dtype=np.float32, mode='r')
+
+def load_audio(media_path):
+    """Decode media_path if needed and return its 16kHz mono samples, memory-mapped."""
+    return open_audio(decode_audio(media_path))
+
+def cached_audio(media_path):
+    """Return the samples of media_path if it has already been decoded, or None; never decodes."""
+    path = artifact_path_for(media_path)
+    try:
+        os.utime(path)
+        return open_audio(path)
+    except FileNotFoundError:
+        return None
+
+def _evict(keep):
+    budget = AUDIO_ARTIFACT_MAX_MB * 1024 * 1024
+    with _registry_lock:
+        entries = []
+        for entry in os.scandir(ARTIFACT_DIR):
+            if entry.name.endswith('.f32'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= budget:
+                break
+            if path == keep:
+                continue
+            try:
+                # Open memory maps keep working after the file is unlinked
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -19,6 +19,7 @@
 import os
 import subprocess
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_args
 
 STORAGE_PATH = "/tmp/"
 
@@ -75,7 +76,7 @@ def process_audio_mixing(video_url, audio_url, video_vol, audio_vol, output_leng
     cmd.append(output_path)
 
     # Run FFmpeg command
-    subprocess.run(cmd, check=True)
+    subprocess.run(ffmpeg_args(cmd), check=True)
 
     # Clean up input files
     os.remove(video_path)
@@ -20,8 +20,9 @@ import os
 import ffmpeg
 import logging
 import requests
-import subprocess
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_output_kwargs
+from services.font_index import get_font_index
 
 # Set the default local storage directory
 STORAGE_PATH = "/tmp/"
@@ -33,48 +34,9 @@ logger = logging.getLogger(__name__)
 # Define the path to the fonts directory
 FONTS_DIR = '/usr/share/fonts/custom'
 
-# Create the FONT_PATHS dictionary by reading the fonts directory
-FONT_PATHS = {}
-for font_file in os.listdir(FONTS_DIR):
-    if font_file.endswith('.ttf') or font_file.endswith('.TTF'):
-        font_name = os.path.splitext(font_file)[0]
-        FONT_PATHS[font_name] = os.path.join(FONTS_DIR, font_file)
-# logger.info(f"Available fonts: {FONT_PATHS}")
-
-# Create a list of acceptable font names
-ACCEPTABLE_FONTS = list(FONT_PATHS.keys())
-#logger.info(f"Acceptable font names: {ACCEPTABLE_FONTS}")
-
-# Match font files with fontconfig names
-def match_fonts():
-    try:
-        result = subprocess.run(['fc-list', ':family'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            fontconfig_fonts = result.stdout.split('\n')
-            fontconfig_fonts = list(set(fontconfig_fonts))  # Remove duplicates
-            matched_fonts = {}
-            for font_file in FONT_PATHS.keys():
-                for fontconfig_font in fontconfig_fonts:
-                    if font_file.lower() in fontconfig_font.lower():
-                        matched_fonts[font_file] = fontconfig_font.strip()
-
-            # Parse and output the matched font names
-            unique_font_names = set()
-            for font in matched_fonts.values():
-                font_name = font.split(':')[1].strip()
-                unique_font_names.add(font_name)
-            
-            # Remove duplicates from font_name and sort them alphabetically
-            unique_font_names = sorted(list(set(unique_font_names)))
-            
-            # for font_name in unique_font_names:
-            #     print(font_name)
-        else:
-            logger.error(f"Error matching fonts: {result.stderr}")
-    except Exception as e:
-        logger.error(f"Exception while matching fonts: {str(e)}")
-
-match_fonts()
+def get_font_paths():
+    """Map font names (file names without extension) to the .ttf files in FONTS_DIR, from the shared font index."""
+    return get_font_index().font_files(FONTS_DIR)
 
 def generate_style_line(options):
     """Generate ASS style line from options."""
@@ -155,11 +117,12 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 
         # Ensure font_name is converted to the full font path
         font_name = options.get('font_name', 'Arial')
-        if font_name in FONT_PATHS:
-            selected_font = FONT_PATHS[font_name]
+        font_paths = get_font_paths()
+        if font_name in font_paths:
+            selected_font = font_paths[font_name]
             logger.info(f"Job {job_id}: Font path set to {selected_font}")
         else:
-            selected_font = FONT_PATHS.get('Arial')
+            selected_font = font_paths.get('Arial')
             logger.warning(f"Job {job_id}: Font {font_name} not found. Using default font Arial.")
 
         # For ASS subtitles, we should avoid overriding styles
@@ -208,7 +171,8 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             ffmpeg.input(video_path).output(
                 output_path,
                 vf=subtitle_filter,
-                acodec='copy'
+                acodec='copy',
+                **ffmpeg_output_kwargs()
             ).run()
             logger.info(f"Job {job_id}: FFmpeg processing completed, output file at {output_path}")
         except ffmpeg.Error as e:
@@ -17,11 +17,18 @@
 
 
 import os
+import json
+import hashlib
 import logging
+import subprocess
+import threading
 from abc import ABC, abstractmethod
-from services.gcp_toolkit import upload_to_gcs
-from services.s3_toolkit import upload_to_s3
-from config import validate_env_vars
+from concurrent.futures import ThreadPoolExecutor
+from services.gcp_toolkit import upload_to_gcs, upload_stream_to_gcs, find_gcs_object
+from services.s3_toolkit import upload_to_s3, upload_stream_to_s3, find_s3_object
+from services import metrics
+from services.cpu_budget import ffmpeg_args
+from config import validate_env_vars, UPLOAD_CONCURRENCY, STREAM_OUTPUT_UPLOAD, UPLOAD_DEDUP, LOCAL_STORAGE_PATH
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -40,15 +47,35 @@ def parse_s3_url(s3_url):
 
 class CloudStorageProvider(ABC):
     @abstractmethod
-    def upload_file(self, file_path: str) -> str:
+    def upload_file(self, file_path: str, object_name: str = None) -> str:
         pass
 
+    @abstractmethod
+    def upload_stream(self, stream, object_name: str) -> str:
+        pass
+
+    @abstractmethod
+    def find_object(self, object_name: str):
+        """Return the URL of an existing object, or None if it does not exist."""
+        pass
+
+    @property
+    def location(self) -> str:
+        """Identifies the bucket uploads land in, so dedup index entries are not shared across buckets."""
+        return f"{type(self).__name__}:{self.bucket_name}"
+
 class GCPStorageProvider(CloudStorageProvider):
     def __init__(self):
         self.bucket_name = os.getenv('GCP_BUCKET_NAME')
 
-    def upload_file(self, file_path: str) -> str:
-        return upload_to_gcs(file_path, self.bucket_name)
+    def upload_file(self, file_path: str, object_name: str = None) -> str:
+        return upload_to_gcs(file_path, self.bucket_name, object_name)
+
+    def upload_stream(self, stream, object_name: str) -> str:
+        return upload_stream_to_gcs(stream, object_name, self.bucket_name)
+
+    def find_object(self, object_name: str):
+        return find_gcs_object(object_name, self.bucket_name)
 
 class S3CompatibleProvider(CloudStorageProvider):
     def __init__(self):
@@ -83,8 +110,18 @@ class S3CompatibleProvider(CloudStorageProvider):
             except Exception as e:
                 logger.warning(f"Failed to parse Digital Ocean URL: {e}. Using provided values.")
 
-    def upload_file(self, file_path: str) -> str:
-        return upload_to_s3(file_path, self.endpoint_url, self.access_key, self.secret_key, self.bucket_name, self.region)
+    def upload_file(self, file_path: str, object_name: str = None) -> str:
+        return upload_to_s3(file_path, self.endpoint_url, self.access_key, self.secret_key, self.bucket_name, self.region, object_name)
+
+    def upload_stream(self, stream, object_name: str) -> str:
+        return upload_stream_to_s3(stream, object_name, self.endpoint_url, self.access_key, self.secret_key, self.bucket_name, self.region)
+
+    def find_object(self, object_name: str):
+        return find_s3_object(object_name, self.endpoint_url, self.access_key, self.secret_key, self.bucket_name, self.region)
+
+    @property
+    def location(self) -> str:
+        return f"{self.endpoint_url}:{self.bucket_name}"
 
 def get_storage_provider() -> CloudStorageProvider:
     """Get the appropriate cloud storage provider based on environment variables.
@@ -126,14 +163,222 @@ def get_storage_provider() -> CloudStorageProvider:
 
     raise ValueError(f"No cloud storage settings provided.")
 
+# Content-hash deduplication: outputs are stored as <sha256><ext> so identical files map to one object
+HASH_CHUNK_SIZE = 1024 * 1024
+UPLOAD_INDEX_PATH = os.path.join(LOCAL_STORAGE_PATH, 'upload_index.json')
+_upload_index_lock = threading.Lock()
+_upload_index = None
+
+def hash_file(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _load_upload_index() -> dict:
+    try:
+        with open(UPLOAD_INDEX_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _lookup_upload_index(key: str):
+    global _upload_index
+    with _upload_index_lock:
+        if _upload_index is None:
+            _upload_index = _load_upload_index()
+        return _upload_index.get(key)
+
+def _record_upload_index(key: str, url: str):
+    global _upload_index
+    with _upload_index_lock:
+        # Merge with the file on disk so entries written by other workers are kept
+        _upload_index = _load_upload_index()
+        _upload_index[key] = url
+        tmp_path = f"{UPLOAD_INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(_upload_index, f)
+        os.replace(tmp_path, UPLOAD_INDEX_PATH)
+
+def _upload_deduplicated(provider: CloudStorageProvider, file_path: str) -> str:
+    """Upload file_path under its content hash, skipping the upload when the object already exists."""
+    object_name = hash_file(file_path) + os.path.splitext(file_path)[1].lower()
+    index_key = f"{provider.location}/{object_name}"
+    size = os.path.getsize(file_path)
+
+    url = _lookup_upload_index(index_key)
+    if url is None:
+        url = provider.find_object(object_name)
+        if url is not None:
+            _record_upload_index(index_key, url)
+
+    if url is not None:
+        logger.info(f"Identical object {object_name} already stored, skipping upload of {file_path}")
+        metrics.increment('upload_dedup_hits')
+        metrics.increment('upload_dedup_bytes_saved', size)
+        return url
+
+    url = provider.upload_file(file_path, object_name)
+    _record_upload_index(index_key, url)
+    metrics.increment('upload_dedup_misses')
+    return url
+
 def upload_file(file_path: str) -> str:
     provider = get_storage_provider()
     try:
         logger.info(f"Uploading file to cloud storage: {file_path}")
-        url = provider.upload_file(file_path)
+        if UPLOAD_DEDUP:
+            url = _upload_deduplicated(provider, file_path)
+        else:
+            url = provider.upload_file(file_path)
         logger.info(f"File uploaded successfully: {url}")
         return url
     except Exception as e:
         logger.error(f"Error uploading file to cloud storage: {e}")
         raise
-    
\ No newline at end of file
+
+# Containers ffmpeg can write to a non-seekable pipe, with the output options they need
+STREAMABLE_OUTPUT_FORMATS = {
+    'mp3': {'format': 'mp3'},
+    'webm': {'format': 'webm'},
+    'ts': {'format': 'mpegts'},
+    'mpegts': {'format': 'mpegts'},
+    'mp4': {'format': 'mp4', 'movflags': 'frag_keyframe+empty_moov+default_base_moof'},
+}
+
+def get_stream_output_options(output_format):
+    """
+    Return the ffmpeg output options for writing output_format to pipe:1, or None if the
+    output should be rendered to a local file (streaming disabled or format not streamable).
+    """
+    if not STREAM_OUTPUT_UPLOAD or not output_format:
+        return None
+    options = STREAMABLE_OUTPUT_FORMATS.get(output_format.lower())
+    return dict(options) if options else None
+
+class FFmpegOutputStream:
+    """
+    Read-only file-like view of an ffmpeg process writing its output to pipe:1.
+
+    Reaching EOF waits for ffmpeg and raises if it failed, so a truncated output is
+    never committed as a finished upload.
+    """
+
+    def __init__(self, cmd):
+        cmd = ffmpeg_args(cmd)
+        logger.info(f"Running FFmpeg command with piped output: {' '.join(cmd)}")
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._position = 0
+        self._stderr = []
+        # Drain stderr continuously so ffmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self._stderr.append(line)
+
+    def read(self, size=-1):
+        data = self.process.stdout.read(size)
+        if not data:
+            self._wait_for_exit()
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        count = self.process.stdout.readinto(buffer)
+        if not count:
+            self._wait_for_exit()
+        self._position += count
+        return count
+
+    def tell(self):
+        return self._position
+
+    def _wait_for_exit(self):
+        returncode = self.process.wait()
+        self._stderr_thread.join()
+        if returncode != 0:
+            stderr = b''.join(self._stderr).decode('utf-8', errors='replace')
+            raise Exception(f"FFmpeg command failed: {stderr}")
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+def upload_stream(stream, object_name: str) -> str:
+    provider = get_storage_provider()
+    try:
+        logger.info(f"Streaming upload to cloud storage: {object_name}")
+        url = provider.upload_stream(stream, object_name)
+        logger.info(f"Stream uploaded successfully: {url}")
+        return url
+    except Exception as e:
+        logger.error(f"Error streaming upload to cloud storage: {e}")
+        raise
+
+def upload_ffmpeg_output(cmd, object_name: str) -> str:
+    """
+    Run an ffmpeg command whose output is pipe:1 and upload its output while it encodes.
+
+    Nothing is written to LOCAL_STORAGE_PATH and the upload finishes shortly after the
+    encode does. Use get_stream_output_options() to build the output options.
+    """
+    stream = FFmpegOutputStream(cmd)
+    try:
+        return upload_stream(stream, object_name)
+    finally:
+        stream.close()
+
+def _upload_and_remove(file_path: str, remove_after: bool) -> str:
+    url = upload_file(file_path)
+    if remove_after and os.path.exists(file_path):
+        os.remove(file_path)
+    return url
+
+class UploadPool:
+    """
+    Upload job outputs concurrently while the job keeps producing more of them.
+
+    Files are uploaded as soon as they are submitted, at most UPLOAD_CONCURRENCY
+    at a time, and results() returns the URLs in submission order.
+
+    Usage:
+        with UploadPool() as pool:
+            for path in produce_outputs():
+                pool.submit(path)
+            urls = pool.results()
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max(1, max_workers or UPLOAD_CONCURRENCY)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upload")
+        self._futures = []
+
+    def submit(self, file_path: str, remove_after: bool = True):
+        """Queue a local file for upload and return its Future (resolves to the cloud URL)."""
+        logger.info(f"Queueing upload for {file_path}")
+        future = self._executor.submit(_upload_and_remove, file_path, remove_after)
+        self._futures.append(future)
+        return future
+
+    def results(self) -> list:
+        """Wait for every queued upload and return the URLs in submission order."""
+        return [future.result() for future in self._futures]
+
+    def shutdown(self, cancel_pending: bool = False):
+        if cancel_pending:
+            for future in self._futures:
+                future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # On error, drop uploads that have not started yet but let running ones finish
+        self.shutdown(cancel_pending=exc_type is not None)
+        return False
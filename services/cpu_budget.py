@@ -0,0 +1,167 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from config import LOCAL_STORAGE_PATH, CPU_BUDGET, CPU_BUDGET_CORES
+
+logger = logging.getLogger(__name__)
+
+# One empty file per running job, named <pid>_<job_id>, so every Gunicorn worker sees the same count
+SLOTS_DIR = os.path.join(LOCAL_STORAGE_PATH, 'cpu_slots')
+
+_lock = threading.Lock()
+# Threads allocated to the jobs running in this process
+_process_jobs = {}
+_current = threading.local()
+
+def host_cores():
+    """CPU cores this process may use: CPU_BUDGET_CORES, else the cgroup quota or affinity mask."""
+    if CPU_BUDGET_CORES > 0:
+        return CPU_BUDGET_CORES
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        # cgroup v2 CPU limit, e.g. "200000 100000" for 2 cores or "max 100000" for none
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def active_jobs():
+    """Number of jobs currently holding a CPU budget across all worker processes on this host."""
+    try:
+        names = os.listdir(SLOTS_DIR)
+    except FileNotFoundError:
+        return 0
+    count = 0
+    for name in names:
+        pid = name.split('_', 1)[0]
+        if pid.isdigit() and _pid_alive(int(pid)):
+            count += 1
+        else:
+            # Left behind by a worker that was killed mid-job
+            try:
+                os.remove(os.path.join(SLOTS_DIR, name))
+            except OSError:
+                pass
+    return count
+
+def _apply_torch_threads():
+    # torch's intra-op pool is per process, so it is sized for all of this process's jobs
+    import torch
+    if _process_jobs:
+        torch.set_num_threads(min(host_cores(), sum(_process_jobs.values())))
+
+@contextmanager
+def allocate(job_id):
+    """
+    Hold a share of the host's cores for the duration of one job.
+
+    Yields the allocation (cores, concurrent_jobs, threads) recorded in the job status, or
+    None when CPU_BUDGET is disabled. The share is fixed when the job starts; jobs that
+    start later split what's left between them.
+    """
+    if not CPU_BUDGET:
+        yield None
+        return
+
+    os.makedirs(SLOTS_DIR, exist_ok=True)
+    slot = os.path.join(SLOTS_DIR, f"{os.getpid()}_{job_id}")
+    open(slot, 'w').close()
+    try:
+        cores = host_cores()
+        concurrent_jobs = max(1, active_jobs())
+        allocation = {
+            "cores": cores,
+            "concurrent_jobs": concurrent_jobs,
+            "threads": max(1, cores // concurrent_jobs)
+        }
+        with _lock:
+            _process_jobs[job_id] = allocation["threads"]
+            _apply_torch_threads()
+        _current.allocation = allocation
+        logger.info(f"Job {job_id}: allocated {allocation['threads']} of {cores} cores ({concurrent_jobs} concurrent jobs)")
+        yield allocation
+    finally:
+        _current.allocation = None
+        with _lock:
+            _process_jobs.pop(job_id, None)
+            _apply_torch_threads()
+        try:
+            os.remove(slot)
+        except OSError:
+            pass
+
+def job_threads():
+    """
+    Threads the calling job may use, or None when CPU_BUDGET is disabled.
+
+    Outside a job's own thread (e.g. a helper thread pool) the share is computed from the
+    current number of running jobs.
+    """
+    if not CPU_BUDGET:
+        return None
+    allocation = getattr(_current, 'allocation', None)
+    if allocation is not None:
+        return allocation["threads"]
+    return max(1, host_cores() // max(1, active_jobs()))
+
+def ffmpeg_args(cmd, output_indices=None):
+    """
+    Return an ffmpeg argument list limited to the job's thread budget.
+
+    Adds -filter_threads/-filter_complex_threads after the executable and -threads (which also
+    sets libx264's thread count) before each output path. output_indices are the positions of
+    the output paths in cmd; by default the output is the last argument. Commands that already
+    set -threads are returned unchanged.
+    """
+    threads = job_threads()
+    if threads is None or '-threads' in cmd:
+        return cmd
+    threads = str(threads)
+    if output_indices is None:
+        output_indices = [len(cmd) - 1]
+    args = [cmd[0], '-filter_threads', threads, '-filter_complex_threads', threads]
+    previous = 1
+    for index in sorted(output_indices):
+        # -threads is an output option, so each output needs its own
+        args += cmd[previous:index] + ['-threads', threads]
+        previous = index
+    return args + cmd[previous:]
+
+def ffmpeg_output_kwargs():
+    """Output options for ffmpeg-python's .output() that apply the job's thread budget."""
+    threads = job_threads()
+    return {} if threads is None else {"threads": threads}
@@ -19,11 +19,21 @@
 import os
 import subprocess
 import json
+import time
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_args
 
 STORAGE_PATH = "/tmp/"
+KEYFRAME_POLL_INTERVAL = 0.5  # seconds between checks for newly written keyframes
 
-def process_keyframe_extraction(video_url, job_id):
+def _list_keyframes(job_id):
+    return sorted(
+        os.path.join(STORAGE_PATH, filename)
+        for filename in os.listdir(STORAGE_PATH)
+        if filename.startswith(f"{job_id}_") and filename.endswith(".jpg")
+    )
+
+def process_keyframe_extraction(video_url, job_id, upload_pool=None):
     video_path = download_file(video_url, STORAGE_PATH)
 
     # Extract keyframes
@@ -35,19 +45,35 @@ def process_keyframe_extraction(video_url, job_id):
         '-vsync', 'vfr',
         output_pattern
     ]
+    cmd = ffmpeg_args(cmd)
 
     print(f"Images: {cmd}")
 
-    subprocess.run(cmd, check=True)
-
-    # Upload keyframes to GCS and get URLs
     output_filenames = []
-    for filename in sorted(os.listdir(STORAGE_PATH)):
-        if filename.startswith(f"{job_id}_") and filename.endswith(".jpg"):
-            file_path = os.path.join(STORAGE_PATH, filename)
+
+    if upload_pool is None:
+        subprocess.run(cmd, check=True)
+        output_filenames = _list_keyframes(job_id)
+    else:
+        # ffmpeg writes keyframes in order, so every image except the newest one is
+        # complete and can be uploaded while extraction continues
+        process = subprocess.Popen(cmd)
+        while process.poll() is None:
+            completed = _list_keyframes(job_id)[:-1]
+            for file_path in completed[len(output_filenames):]:
+                output_filenames.append(file_path)
+                upload_pool.submit(file_path)
+            time.sleep(KEYFRAME_POLL_INTERVAL)
+
+        if process.returncode != 0:
+            os.remove(video_path)
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+        for file_path in _list_keyframes(job_id)[len(output_filenames):]:
             output_filenames.append(file_path)
+            upload_pool.submit(file_path)
 
     # Clean up input file
     os.remove(video_path)
 
-    return output_filenames
\ No newline at end of file
+    return output_filenames
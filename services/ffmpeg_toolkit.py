@@ -20,6 +20,7 @@ import os
 import ffmpeg
 import requests
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_output_kwargs
 
 # Set the default local storage directory
 STORAGE_PATH = "/tmp/"
@@ -35,7 +36,7 @@ def process_conversion(media_url, job_id, bitrate='128k', webhook_url=None):
         (
             ffmpeg
             .input(input_filename)
-            .output(output_path, acodec='libmp3lame', audio_bitrate=bitrate)
+            .output(output_path, acodec='libmp3lame', audio_bitrate=bitrate, **ffmpeg_output_kwargs())
             .overwrite_output()
             .run(capture_stdout=True, capture_stderr=True)
         )
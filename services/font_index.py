@@ -0,0 +1,165 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from config import LOCAL_STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = os.path.join(LOCAL_STORAGE_PATH, 'font_index.json')
+
+# Where fonts are installed (the Dockerfile copies ./fonts to /usr/share/fonts/custom)
+FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts')
+]
+
+_lock = threading.Lock()
+_index = None
+# Modification time of INDEX_PATH when _index was read or written
+_index_mtime = None
+
+def directory_key(font_dirs=FONT_DIRS):
+    """
+    Fingerprint the font directories by the modification times of every directory under them.
+
+    Adding or removing a font changes the mtime of the directory holding it, so this changes
+    whenever the set of installed fonts does, without opening any font files.
+    """
+    entries = []
+    for font_dir in font_dirs:
+        for root, _, _ in os.walk(font_dir):
+            try:
+                entries.append(f"{root}:{os.stat(root).st_mtime_ns}")
+            except OSError:
+                continue
+    return hashlib.sha256("\n".join(sorted(entries)).encode()).hexdigest()
+
+def _scan():
+    """Read the family name of every TrueType font, the expensive part the index exists to avoid."""
+    try:
+        import matplotlib.font_manager as fm
+    except ImportError:
+        logger.error("matplotlib not installed. Install via 'pip install matplotlib'.")
+        return {}
+    families = {}
+    for font in fm.findSystemFonts(fontpaths=None, fontext='ttf'):
+        try:
+            font_name = fm.FontProperties(fname=font).get_name()
+        except Exception:
+            continue
+        families.setdefault(font_name, []).append(font)
+    return families
+
+class FontIndex:
+    """Font family names and the files providing them."""
+
+    def __init__(self, key, families, build_seconds=0.0):
+        self.key = key
+        self.families = families
+        self.build_seconds = build_seconds
+
+    def has_family(self, name):
+        return name in self.families
+
+    def family_names(self):
+        return sorted(self.families)
+
+    def font_files(self, directory):
+        """Map file names without extension to paths for the .ttf files directly inside directory."""
+        files = {}
+        for paths in self.families.values():
+            for path in paths:
+                if os.path.dirname(path) == directory.rstrip('/') and path.lower().endswith('.ttf'):
+                    files[os.path.splitext(os.path.basename(path))[0]] = path
+        return files
+
+def _index_file_mtime():
+    try:
+        return os.stat(INDEX_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def _load(key=None):
+    """Read the persisted index; with a key, only if it was built for those font directories."""
+    try:
+        with open(INDEX_PATH, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if key is not None and data.get("key") != key:
+        return None
+    return FontIndex(key, data["families"], data.get("build_seconds", 0.0))
+
+def _build(key):
+    start_time = time.time()
+    index = FontIndex(key, _scan())
+    index.build_seconds = round(time.time() - start_time, 3)
+    logger.info(f"Indexed {len(index.families)} font families in {index.build_seconds}s")
+
+    try:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        # Write then rename so other workers never read a half-written index
+        tmp_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"key": key, "families": index.families, "build_seconds": index.build_seconds}, f)
+        os.replace(tmp_path, INDEX_PATH)
+    except OSError as e:
+        logger.warning(f"Could not persist font index: {e}")
+    return index
+
+def get_font_index():
+    """
+    Return the font index, loading it from disk or building it on first use in this process.
+
+    The persisted index is reused while the font directories are unchanged, so worker restarts
+    don't rescan. Call refresh_font_index() after installing fonts into a running container;
+    other workers pick the rebuilt index up from disk on their next lookup.
+    """
+    global _index, _index_mtime
+    mtime = _index_file_mtime()
+    if _index is not None and mtime == _index_mtime:
+        return _index
+    with _lock:
+        if _index is None or mtime != _index_mtime:
+            # Another worker rewrote the index file (e.g. a refresh); take its copy as is
+            index = _load() if _index is not None and mtime is not None else None
+            if index is None:
+                key = directory_key()
+                index = _load(key) or _build(key)
+            _index, _index_mtime = index, _index_file_mtime()
+        return _index
+
+def refresh_font_index():
+    """Rebuild the index from the font files, regardless of the persisted copy."""
+    global _index, _index_mtime
+    with _lock:
+        _index = _build(directory_key())
+        _index_mtime = _index_file_mtime()
+        return _index
+
+def get_available_fonts():
+    """Return the family names of the installed fonts."""
+    return get_font_index().family_names()
@@ -31,6 +31,7 @@ logger = logging.getLogger(__name__)
 # GCS environment variables
 GCP_BUCKET_NAME = os.getenv('GCP_BUCKET_NAME')
 STORAGE_PATH = "/tmp/"
+GCS_STREAM_CHUNK_SIZE = 8 * 1024 * 1024  # Must be a multiple of 256KB
 gcs_client = None
 
 def initialize_gcp_client():
@@ -57,14 +58,22 @@ def initialize_gcp_client():
 # Initialize the GCS client
 gcs_client = initialize_gcp_client()
 
-def upload_to_gcs(file_path, bucket_name=GCP_BUCKET_NAME):
+def find_gcs_object(object_name, bucket_name=GCP_BUCKET_NAME):
+    """Return the public URL of object_name if it already exists in the bucket, otherwise None."""
+    if not gcs_client:
+        raise ValueError("GCS client is not initialized. Skipping object lookup.")
+
+    blob = gcs_client.bucket(bucket_name).blob(object_name)
+    return blob.public_url if blob.exists() else None
+
+def upload_to_gcs(file_path, bucket_name=GCP_BUCKET_NAME, object_name=None):
     if not gcs_client:
         raise ValueError("GCS client is not initialized. Skipping file upload.")
 
     try:
         logger.info(f"Uploading file to Google Cloud Storage: {file_path}")
         bucket = gcs_client.bucket(bucket_name)
-        blob = bucket.blob(os.path.basename(file_path))
+        blob = bucket.blob(object_name or os.path.basename(file_path))
         blob.upload_from_filename(file_path)
         logger.info(f"File uploaded successfully to GCS: {blob.public_url}")
         return blob.public_url
@@ -72,6 +81,23 @@ def upload_to_gcs(file_path, bucket_name=GCP_BUCKET_NAME):
         logger.error(f"Error uploading file to GCS: {e}")
         raise
 
+def upload_stream_to_gcs(stream, object_name, bucket_name=GCP_BUCKET_NAME):
+    """Upload a file-like stream to GCS with a chunked resumable upload (no local file)."""
+    if not gcs_client:
+        raise ValueError("GCS client is not initialized. Skipping file upload.")
+
+    try:
+        logger.info(f"Streaming upload to Google Cloud Storage: {object_name}")
+        bucket = gcs_client.bucket(bucket_name)
+        blob = bucket.blob(object_name)
+        blob.chunk_size = GCS_STREAM_CHUNK_SIZE
+        blob.upload_from_file(stream)
+        logger.info(f"Stream uploaded successfully to GCS: {blob.public_url}")
+        return blob.public_url
+    except Exception as e:
+        logger.error(f"Error streaming file to GCS: {e}")
+        raise
+
 
 def trigger_cloud_run_job(job_name, location="us-central1", overrides=None):
     # Retrieve service account credentials
@@ -0,0 +1,63 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+import threading
+from services.file_management import download_file
+from config import LOCAL_STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+# job_id -> {url: local path} for files downloaded on behalf of a job
+_artifacts = {}
+_lock = threading.Lock()
+
+def local_copy(job_id, url):
+    """Return the job's downloaded copy of url, or None if it hasn't been downloaded."""
+    with _lock:
+        path = _artifacts.get(job_id, {}).get(url)
+    return path if path and os.path.exists(path) else None
+
+def get_or_download(job_id, url, storage_path=LOCAL_STORAGE_PATH):
+    """
+    Return the local copy of url for this job, downloading it the first time.
+    Every step of a job that needs the same source gets the same file.
+    """
+    path = local_copy(job_id, url)
+    if path:
+        logger.info(f"Job {job_id}: Reusing downloaded {url} at {path}")
+        return path
+
+    path = download_file(url, storage_path)
+    with _lock:
+        _artifacts.setdefault(job_id, {})[url] = path
+    return path
+
+def release(job_id):
+    """Delete every file downloaded for this job."""
+    with _lock:
+        paths = list(_artifacts.pop(job_id, {}).values())
+    for path in paths:
+        try:
+            os.remove(path)
+            logger.info(f"Job {job_id}: Removed downloaded file {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Job {job_id}: Failed to remove downloaded file {path}: {e}")
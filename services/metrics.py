@@ -0,0 +1,42 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import time
+import threading
+
+# Process-wide counters for work the toolkit avoided or performed. Each gunicorn worker
+# keeps its own set; the metrics endpoint reports the worker that served the request.
+_lock = threading.Lock()
+_counters = {}
+_started_at = time.time()
+
+def increment(name, value=1):
+    """Add value to the named counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def snapshot():
+    """Return a copy of all counters with the reporting process details."""
+    with _lock:
+        counters = dict(_counters)
+    return {
+        "pid": os.getpid(),
+        "uptime": round(time.time() - _started_at, 3),
+        "counters": counters
+    }
@@ -0,0 +1,131 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from services.webhook import send_webhook
+from config import LOCAL_STORAGE_PATH, PARTIAL_WEBHOOK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(LOCAL_STORAGE_PATH, 'jobs')
+
+# Segment fields worth streaming; token ids and decoder statistics stay in the final response
+PARTIAL_FIELDS = ("id", "start", "end", "text", "words")
+
+def partial_path(job_id):
+    """Return the append-only file partial segments of job_id are written to."""
+    return os.path.join(JOBS_DIR, f"{job_id}.partial.jsonl")
+
+def discard_partials(job_id):
+    """Delete the partial file of a finished job; its final response contains every segment."""
+    try:
+        os.remove(partial_path(job_id))
+    except FileNotFoundError:
+        pass
+
+def read_partials(job_id, offset=0):
+    """
+    Return (batches, offset) for partial batches appended after byte offset.
+
+    Each batch is a dict with task and segments. A line still being written is left for the next call.
+    """
+    path = partial_path(job_id)
+    if not os.path.exists(path):
+        return [], offset
+    batches = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            batches.append(json.loads(line))
+            offset += len(line)
+    return batches, offset
+
+class PartialPublisher:
+    """
+    Publishes segments of a running job as they are produced.
+
+    Every batch is appended to the job's partial file (read by the job status and stream
+    endpoints). With a webhook_url, batches are also collected and POSTed at most every
+    PARTIAL_WEBHOOK_INTERVAL seconds from a background thread, so a slow webhook never
+    holds up transcription.
+    """
+
+    def __init__(self, job_id, webhook_url=None, request_id=None):
+        self.job_id = job_id
+        self.webhook_url = webhook_url
+        self.request_id = request_id
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_sent = time.time()
+        self._webhooks = None
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        if webhook_url:
+            self._webhooks = queue.Queue()
+            self._sender = threading.Thread(target=self._send_webhooks, daemon=True)
+            self._sender.start()
+
+    def publish(self, task, segments):
+        """Record newly finished segments for task. Safe to call from several threads."""
+        segments = [{key: segment[key] for key in PARTIAL_FIELDS if key in segment} for segment in segments]
+        if not segments:
+            return
+        line = json.dumps({"task": task, "segments": segments}) + "\n"
+        with self._lock:
+            # One write per line keeps concurrent readers from seeing a torn batch
+            with open(partial_path(self.job_id), 'a') as f:
+                f.write(line)
+            if self._webhooks is not None:
+                # Hold a detached copy; callers keep working on their segment dicts
+                self._pending.setdefault(task, []).extend(json.loads(line)["segments"])
+                if time.time() - self._last_sent >= PARTIAL_WEBHOOK_INTERVAL:
+                    self._flush()
+
+    def close(self):
+        """Send any batch still pending and wait for the webhook thread to finish."""
+        if self._webhooks is None:
+            return
+        with self._lock:
+            self._flush()
+        self._webhooks.put(None)
+        self._sender.join()
+
+    def _flush(self):
+        for task, segments in self._pending.items():
+            self._webhooks.put({
+                "id": self.request_id,
+                "job_id": self.job_id,
+                "message": "partial",
+                "task": task,
+                "segments": segments
+            })
+        self._pending = {}
+        self._last_sent = time.time()
+
+    def _send_webhooks(self):
+        while True:
+            payload = self._webhooks.get()
+            if payload is None:
+                return
+            send_webhook(self.webhook_url, payload)
@@ -16,14 +16,237 @@
 
 
 
+import io
 import os
+import queue
 import boto3
 import logging
+import threading
+from botocore.exceptions import ClientError
 from urllib.parse import urlparse, quote
+from config import S3_UPLOAD_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
-def upload_to_s3(file_path, s3_url, access_key, secret_key, bucket_name, region):
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for all but the last part
+MULTIPART_DEFAULT_PART_SIZE = 8 * 1024 * 1024  # Used when the stream length is unknown
+MULTIPART_MAX_PARTS = 10000
+R2_REGIONS = ['auto', 'wnam', 'enam', 'weur', 'eeur', 'apac']
+
+def is_r2_endpoint(s3_url, region):
+    """R2 detection: check endpoint URL OR region code (R2 uses: auto, wnam, enam, weur, eeur, apac)"""
+    return ('r2.cloudflarestorage.com' in (s3_url or '').lower() or
+            bool(region and region.lower() in R2_REGIONS))
+
+def choose_part_size(content_length=None):
+    """
+    Pick a multipart part size that keeps the upload under MULTIPART_MAX_PARTS parts.
+
+    Parts are rounded up to whole MB and never smaller than the S3 minimum.
+    """
+    if not content_length:
+        return MULTIPART_DEFAULT_PART_SIZE
+    # Leave headroom for bodies that grow when transfer compression is undone
+    target_parts = MULTIPART_MAX_PARTS - 500
+    mb = 1024 * 1024
+    part_size = -(-content_length // target_parts)
+    part_size = -(-part_size // mb) * mb
+    return max(MULTIPART_MIN_PART_SIZE, part_size)
+
+class PartBody(io.RawIOBase):
+    """Seekable read-only file object over a memoryview, so parts are uploaded without copies."""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        remaining = len(self._view) - self._position
+        count = min(len(b), remaining)
+        if count <= 0:
+            return 0
+        b[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        self._position = max(0, self._position)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+def read_into(stream, view):
+    """Fill view from stream, looping over short reads (pipes, sockets). Returns the byte count."""
+    filled = 0
+    readinto = getattr(stream, 'readinto', None)
+    while filled < len(view):
+        if readinto is not None:
+            count = readinto(view[filled:])
+        else:
+            chunk = stream.read(len(view) - filled)
+            count = len(chunk)
+            view[filled:filled + count] = chunk
+        if not count:
+            break
+        filled += count
+    return filled
+
+def multipart_upload_stream(client, stream, bucket_name, key, part_size=None, concurrency=None, **create_args):
+    """
+    Upload everything readable from a file-like stream as an S3 multipart upload.
+
+    The stream only needs a read(n) (or readinto) method, so HTTP response bodies and
+    process pipes can be uploaded without touching local disk. Reading and uploading
+    overlap: the caller's thread fills part buffers while `concurrency` workers run
+    upload_part. Buffers come from a fixed ring of concurrency + 1 and are reused, so
+    memory stays bounded at roughly (concurrency + 1) * part_size. The upload is
+    aborted if reading or uploading fails, so no partial object is ever completed.
+
+    Returns:
+        int: Number of bytes uploaded
+    """
+    part_size = max(MULTIPART_MIN_PART_SIZE, part_size or MULTIPART_DEFAULT_PART_SIZE)
+    concurrency = max(1, concurrency or S3_UPLOAD_CONCURRENCY)
+
+    multipart_upload = client.create_multipart_upload(Bucket=bucket_name, Key=key, **create_args)
+    upload_id = multipart_upload['UploadId']
+
+    free_buffers = queue.Queue()
+    for _ in range(concurrency + 1):
+        free_buffers.put(bytearray(part_size))
+    pending_parts = queue.Queue()
+    etags = {}
+    errors = []
+
+    def upload_worker():
+        while True:
+            item = pending_parts.get()
+            if item is None:
+                return
+            part_number, buffer, length = item
+            try:
+                # Once any part failed, drain the queue without uploading
+                if not errors:
+                    logger.info(f"Uploading part {part_number} ({length} bytes)")
+                    part = client.upload_part(
+                        Bucket=bucket_name,
+                        Key=key,
+                        PartNumber=part_number,
+                        UploadId=upload_id,
+                        Body=PartBody(memoryview(buffer)[:length])
+                    )
+                    etags[part_number] = part['ETag']
+            except Exception as e:
+                errors.append(e)
+            finally:
+                free_buffers.put(buffer)
+
+    workers = [threading.Thread(target=upload_worker, daemon=True) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+
+    total_bytes = 0
+    part_number = 0
+    try:
+        try:
+            while not errors:
+                # Blocks until a worker hands a buffer back, which bounds read-ahead
+                buffer = free_buffers.get()
+                length = read_into(stream, memoryview(buffer))
+                # Always send at least one part so empty streams still produce an object
+                if not length and part_number:
+                    break
+
+                part_number += 1
+                if part_number > MULTIPART_MAX_PARTS:
+                    raise ValueError(f"Stream exceeds {MULTIPART_MAX_PARTS} parts of {part_size} bytes")
+                pending_parts.put((part_number, buffer, length))
+                total_bytes += length
+
+                if length < part_size:
+                    break
+        finally:
+            for _ in workers:
+                pending_parts.put(None)
+            for worker in workers:
+                worker.join()
+
+        if errors:
+            raise errors[0]
+
+        logger.info(f"Completing multipart upload with {part_number} parts")
+        client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': number, 'ETag': etags[number]} for number in sorted(etags)
+            ]}
+        )
+        return total_bytes
+    except Exception:
+        logger.error(f"Aborting multipart upload for {key}")
+        client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
+
+def upload_stream_to_s3(stream, object_name, s3_url, access_key, secret_key, bucket_name, region):
+    """Upload a file-like stream to S3 under object_name without a local file."""
+    session = boto3.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region
+    )
+
+    client = session.client('s3', endpoint_url=s3_url)
+
+    try:
+        # R2 doesn't support object ACLs, so we skip the ACL parameter
+        create_args = {} if is_r2_endpoint(s3_url, region) else {'ACL': 'public-read'}
+        uploaded_bytes = multipart_upload_stream(client, stream, bucket_name, object_name, **create_args)
+        logger.info(f"Streamed {uploaded_bytes} bytes to bucket {bucket_name}: {object_name}")
+
+        encoded_filename = quote(object_name)
+        return f"{s3_url}/{bucket_name}/{encoded_filename}"
+    except Exception as e:
+        logger.error(f"Error streaming file to S3: {e}")
+        raise
+
+def find_s3_object(object_name, s3_url, access_key, secret_key, bucket_name, region):
+    """Return the URL of object_name if it already exists in the bucket, otherwise None."""
+    session = boto3.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region
+    )
+
+    client = session.client('s3', endpoint_url=s3_url)
+
+    try:
+        client.head_object(Bucket=bucket_name, Key=object_name)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+    return f"{s3_url}/{bucket_name}/{quote(object_name)}"
+
+def upload_to_s3(file_path, s3_url, access_key, secret_key, bucket_name, region, object_name=None):
     # Parse the S3 URL into bucket, region, and endpoint
     #bucket_name, region, endpoint_url = parse_s3_url(s3_url)
 
@@ -38,24 +261,22 @@ def upload_to_s3(file_path, s3_url, access_key, secret_key, bucket_name, region)
     try:
         # Detect if this is a Cloudflare R2 endpoint
         # R2 doesn't support object ACLs, so we skip the ACL parameter
-        # R2 detection: check endpoint URL OR region code (R2 uses: auto, wnam, enam, weur, eeur, apac)
-        r2_regions = ['auto', 'wnam', 'enam', 'weur', 'eeur', 'apac']
-        is_r2 = ('r2.cloudflarestorage.com' in s3_url.lower() or
-                 (region and region.lower() in r2_regions))
+        is_r2 = is_r2_endpoint(s3_url, region)
+        object_name = object_name or os.path.basename(file_path)
 
         # Upload the file to the specified S3 bucket
         with open(file_path, 'rb') as data:
             if is_r2:
                 # R2: Upload without ACL (bucket-level permissions should be set in R2 dashboard)
-                client.upload_fileobj(data, bucket_name, os.path.basename(file_path))
+                client.upload_fileobj(data, bucket_name, object_name)
                 logger.info(f"Uploaded to R2 bucket (no ACL): {bucket_name}")
             else:
                 # MinIO/S3: Upload with public-read ACL
-                client.upload_fileobj(data, bucket_name, os.path.basename(file_path), ExtraArgs={'ACL': 'public-read'})
+                client.upload_fileobj(data, bucket_name, object_name, ExtraArgs={'ACL': 'public-read'})
                 logger.info(f"Uploaded to S3/MinIO bucket with public-read ACL: {bucket_name}")
 
         # URL encode the filename for the URL
-        encoded_filename = quote(os.path.basename(file_path))
+        encoded_filename = quote(object_name)
         file_url = f"{s3_url}/{bucket_name}/{encoded_filename}"
         return file_url
     except Exception as e:
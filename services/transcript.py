@@ -0,0 +1,205 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import logging
+import numpy as np
+from srt import make_legal_content
+
+logger = logging.getLogger(__name__)
+
+class Transcript:
+    """
+    A transcript held as columns instead of Whisper's nested segment and word dicts.
+
+    Segment and word times are float64 arrays. word_segment maps each word to its
+    segment, and word text is stored once per distinct word in `vocabulary`, indexed
+    by word_ids. Only start/end/text/word fields survive the conversion; token ids,
+    probabilities and other per-segment Whisper fields are dropped.
+    """
+
+    def __init__(self, segment_start, segment_end, segment_text, word_start, word_end, word_segment, word_ids, vocabulary, text=None, language=None):
+        self.segment_start = np.asarray(segment_start, dtype=np.float64)
+        self.segment_end = np.asarray(segment_end, dtype=np.float64)
+        self.segment_text = list(segment_text)
+        self.word_start = np.asarray(word_start, dtype=np.float64)
+        self.word_end = np.asarray(word_end, dtype=np.float64)
+        self.word_segment = np.asarray(word_segment, dtype=np.int32)
+        self.word_ids = np.asarray(word_ids, dtype=np.int32)
+        self.vocabulary = list(vocabulary)
+        self.text = text if text is not None else ''.join(self.segment_text)
+        self.language = language
+        # word_offsets[i]:word_offsets[i + 1] are the words of segment i
+        self.word_offsets = np.searchsorted(self.word_segment, np.arange(len(self.segment_text) + 1))
+
+    def __len__(self):
+        return len(self.segment_text)
+
+    @property
+    def word_count(self):
+        return len(self.word_ids)
+
+    @classmethod
+    def from_whisper(cls, result):
+        """Build a Transcript from a transcribe() result, using each segment's 'words' if present."""
+        segment_start, segment_end, segment_text = [], [], []
+        word_start, word_end, word_segment, word_ids = [], [], [], []
+        interned = {}
+        for index, segment in enumerate(result['segments']):
+            segment_start.append(segment['start'])
+            segment_end.append(segment['end'])
+            segment_text.append(segment['text'])
+            for word in segment.get('words') or []:
+                word_start.append(word['start'])
+                word_end.append(word['end'])
+                word_segment.append(index)
+                word_ids.append(interned.setdefault(word.get('word', ''), len(interned)))
+        return cls(segment_start, segment_end, segment_text, word_start, word_end, word_segment, word_ids,
+                   list(interned), text=result.get('text'), language=result.get('language'))
+
+    @classmethod
+    def from_segment_text(cls, result):
+        """
+        Build a Transcript whose words are each segment's text split on whitespace,
+        spread evenly over the segment. This is how SRT output with words_per_line
+        times words when the transcription has no word timestamps.
+        """
+        segment_start, segment_end, segment_text = [], [], []
+        word_ids, counts = [], []
+        interned = {}
+        for segment in result['segments']:
+            segment_start.append(segment['start'])
+            segment_end.append(segment['end'])
+            segment_text.append(segment['text'])
+            words = segment['text'].strip().split()
+            counts.append(len(words))
+            word_ids.extend(interned.setdefault(word, len(interned)) for word in words)
+        segment_start = np.asarray(segment_start, dtype=np.float64)
+        segment_end = np.asarray(segment_end, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.int64)
+        word_segment = np.repeat(np.arange(len(counts)), counts)
+        # Position of each word within its segment
+        position = np.arange(len(word_segment)) - np.repeat(np.cumsum(counts) - counts, counts)
+        duration = (segment_end - segment_start)[word_segment] / counts[word_segment]
+        word_start = segment_start[word_segment] + position * duration
+        return cls(segment_start, segment_end, segment_text, word_start, word_start + duration, word_segment,
+                   word_ids, list(interned), text=result.get('text'), language=result.get('language'))
+
+    def to_whisper(self):
+        """Convert back to the transcribe() result shape: {'text', 'segments': [...], 'language'}."""
+        words = self.words()
+        word_start = self.word_start.tolist()
+        word_end = self.word_end.tolist()
+        offsets = self.word_offsets.tolist()
+        segments = []
+        for i, (start, end, text) in enumerate(zip(self.segment_start.tolist(), self.segment_end.tolist(), self.segment_text)):
+            segment = {'id': i, 'start': start, 'end': end, 'text': text}
+            lo, hi = offsets[i], offsets[i + 1]
+            if hi > lo:
+                segment['words'] = [
+                    {'word': words[j], 'start': word_start[j], 'end': word_end[j]}
+                    for j in range(lo, hi)
+                ]
+            segments.append(segment)
+        return {'text': self.text, 'segments': segments, 'language': self.language}
+
+    def words(self, lo=0, hi=None):
+        """Return the text of words lo:hi."""
+        vocabulary = self.vocabulary
+        return [vocabulary[i] for i in self.word_ids[lo:hi].tolist()]
+
+    def segments(self):
+        """Yield (start, end, text, words) per segment, words being (word, start, end) tuples."""
+        offsets = self.word_offsets.tolist()
+        for i, (start, end, text) in enumerate(zip(self.segment_start.tolist(), self.segment_end.tolist(), self.segment_text)):
+            # Materialise one segment's words at a time so streaming callers stay small
+            lo, hi = offsets[i], offsets[i + 1]
+            words = list(zip(self.words(lo, hi), self.word_start[lo:hi].tolist(), self.word_end[lo:hi].tolist())) if hi > lo else []
+            yield start, end, text, words
+
+    def slice_segments(self, lo, hi):
+        """Return a Transcript of segments lo:hi and their words."""
+        word_lo, word_hi = self.word_offsets[lo], self.word_offsets[hi]
+        return Transcript(
+            self.segment_start[lo:hi], self.segment_end[lo:hi], self.segment_text[lo:hi],
+            self.word_start[word_lo:word_hi], self.word_end[word_lo:word_hi],
+            self.word_segment[word_lo:word_hi] - lo, self.word_ids[word_lo:word_hi], self.vocabulary,
+            language=self.language
+        )
+
+    def slice_time(self, start, end):
+        """Return a Transcript of the segments overlapping [start, end) seconds."""
+        keep = np.flatnonzero((self.segment_start < end) & (self.segment_end > start))
+        if not len(keep):
+            return self.slice_segments(0, 0)
+        return self.slice_segments(int(keep[0]), int(keep[-1]) + 1)
+
+    def word_lines(self, words_per_line):
+        """
+        Group all words, across segments, into lines of words_per_line.
+        Returns (start, end, text) columns for the lines.
+        """
+        starts = np.arange(0, self.word_count, words_per_line)
+        ends = np.minimum(starts + words_per_line, self.word_count) - 1
+        words = self.words()
+        texts = [' '.join(words[i:i + words_per_line]) for i in starts.tolist()]
+        return self.word_start[starts], self.word_end[ends], texts
+
+def format_ass_times(seconds):
+    """Format an array of seconds as ASS H:MM:SS.cc strings, matching format_ass_time."""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    hours = (seconds // 3600).astype(np.int64).tolist()
+    minutes = ((seconds % 3600) // 60).astype(np.int64).tolist()
+    secs = (seconds % 60).astype(np.int64).tolist()
+    centiseconds = np.round((seconds - np.trunc(seconds)) * 100).astype(np.int64).tolist()
+    return [f"{h}:{m:02}:{s:02}.{cs:02}" for h, m, s, cs in zip(hours, minutes, secs, centiseconds)]
+
+def to_microseconds(seconds):
+    """Round seconds to integer microseconds the way datetime.timedelta(seconds=...) does."""
+    fraction, whole = np.modf(np.asarray(seconds, dtype=np.float64))
+    return whole.astype(np.int64) * 1000000 + np.round(fraction * 1e6).astype(np.int64)
+
+def format_srt_times(microseconds):
+    """Format non-negative microsecond counts as SRT HH:MM:SS,mmm strings."""
+    microseconds = np.asarray(microseconds, dtype=np.int64)
+    total_seconds = microseconds // 1000000
+    hours = (total_seconds // 3600).tolist()
+    minutes = (total_seconds % 3600 // 60).tolist()
+    secs = (total_seconds % 60).tolist()
+    millis = (microseconds % 1000000 // 1000).tolist()
+    return [f"{h:02}:{m:02}:{s:02},{ms:03}" for h, m, s, ms in zip(hours, minutes, secs, millis)]
+
+def compose_srt(starts, ends, texts):
+    """
+    Render subtitles given as start/end seconds and text columns to SRT.
+
+    Produces the same output as srt.compose over srt.Subtitle(i, timedelta(seconds=start),
+    timedelta(seconds=end), text) objects: blocks sorted by time and renumbered from 1,
+    with empty, negative or zero-length subtitles skipped. Times are converted and
+    formatted in bulk rather than through a timedelta per subtitle.
+    """
+    start_us = to_microseconds(starts)
+    end_us = to_microseconds(ends)
+    order = np.lexsort((np.arange(len(start_us)), end_us, start_us))
+    valid = (start_us >= 0) & (start_us < end_us)
+    order = [i for i in order[valid[order]].tolist() if texts[i].strip()]
+    start_times = format_srt_times(start_us[order])
+    end_times = format_srt_times(end_us[order])
+    return ''.join(
+        f"{n}\n{start_time} --> {end_time}\n{make_legal_content(texts[i])}\n\n"
+        for n, (i, start_time, end_time) in enumerate(zip(order, start_times, end_times), start=1)
+    )
@@ -17,11 +17,10 @@
 
 
 import os
-import whisper
-import srt
-from datetime import timedelta
 from whisper.utils import WriteSRT, WriteVTT
 from services.file_management import download_file
+from services.whisper_models import use_model
+from services.transcript import Transcript, compose_srt
 import logging
 import uuid
 
@@ -39,27 +38,20 @@ def process_transcription(media_url, output_type, max_chars=56, language=None,):
     logger.info(f"Downloaded media to local file: {input_filename}")
 
     try:
-        model = whisper.load_model("base")
-        logger.info("Loaded Whisper model")
-
         # result = model.transcribe(input_filename)
         # logger.info("Transcription completed")
 
         if output_type == 'transcript':
-            result = model.transcribe(input_filename, language=language)
+            with use_model("base") as model:
+                result = model.transcribe(input_filename, language=language)
             output = result['text']
             logger.info("Generated transcript output")
         elif output_type in ['srt', 'vtt']:
 
-            result = model.transcribe(input_filename)
-            srt_subtitles = []
-            for i, segment in enumerate(result['segments'], start=1):
-                start = timedelta(seconds=segment['start'])
-                end = timedelta(seconds=segment['end'])
-                text = segment['text'].strip()
-                srt_subtitles.append(srt.Subtitle(i, start, end, text))
-            
-            output_content = srt.compose(srt_subtitles)
+            with use_model("base") as model:
+                result = model.transcribe(input_filename)
+            transcript = Transcript.from_whisper(result)
+            output_content = compose_srt(transcript.segment_start, transcript.segment_end, [text.strip() for text in transcript.segment_text])
             
             # Write the output to a file
             output_filename = os.path.join(STORAGE_PATH, f"{uuid.uuid4()}.{output_type}")
@@ -70,12 +62,13 @@ def process_transcription(media_url, output_type, max_chars=56, language=None,):
             logger.info(f"Generated {output_type.upper()} output: {output}")
 
         elif output_type == 'ass':
-            result = model.transcribe(
-                input_filename,
-                word_timestamps=True,
-                task='transcribe',
-                verbose=False
-            )
+            with use_model("base") as model:
+                result = model.transcribe(
+                    input_filename,
+                    word_timestamps=True,
+                    task='transcribe',
+                    verbose=False
+                )
             logger.info("Transcription completed with word-level timestamps")
             # Generate ASS subtitle content
             ass_content = generate_ass_subtitle(result, max_chars)
@@ -0,0 +1,110 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from services import metrics
+from services.cloud_storage import hash_file
+from config import LOCAL_STORAGE_PATH, TRANSCRIPTION_CACHE, TRANSCRIPTION_CACHE_MAX_MB, TRANSCRIPTION_ENGINE
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(LOCAL_STORAGE_PATH, 'transcription_cache')
+_evict_lock = threading.Lock()
+
+def cache_key(media_path, engine=None, model="base", task="transcribe", language=None, word_timestamps=False, mode="full"):
+    """
+    Build the cache key for transcribing media_path with the given options.
+    Identical media bytes with identical options map to the same key, whatever URL they came from.
+    """
+    options = {
+        "engine": engine or TRANSCRIPTION_ENGINE,
+        "model": model,
+        "task": task,
+        "language": language or None,
+        "word_timestamps": bool(word_timestamps),
+        "mode": mode
+    }
+    fingerprint = hash_file(media_path) + json.dumps(options, sort_keys=True)
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json.gz")
+
+def get(key):
+    """Return the cached value for key, or None."""
+    if not TRANSCRIPTION_CACHE:
+        return None
+
+    path = _entry_path(key)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        metrics.increment('transcription_cache_misses')
+        return None
+
+    # Refresh the modification time so eviction treats the entry as recently used
+    os.utime(path)
+    metrics.increment('transcription_cache_hits')
+    metrics.increment('transcription_cache_seconds_saved', entry.get("compute_seconds", 0))
+    logger.info(f"Transcription cache hit: {key}")
+    return entry["value"]
+
+def put(key, value, compute_seconds=0):
+    """Store value under key and evict the least recently used entries above TRANSCRIPTION_CACHE_MAX_MB."""
+    if not TRANSCRIPTION_CACHE:
+        return
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump({"compute_seconds": round(compute_seconds, 3), "value": value}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not write transcription cache entry {key}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    _evict()
+
+def _evict():
+    budget = TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(CACHE_DIR):
+            if entry.name.endswith('.json.gz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,280 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+from abc import ABC, abstractmethod
+import torch
+import whisper
+from whisper.decoding import decode
+from services.whisper_models import get_model, use_model
+from services import whisper_batcher
+from config import TRANSCRIPTION_ENGINE, FASTER_WHISPER_COMPUTE_TYPE, FASTER_WHISPER_THREADS
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Mel windows whose encoder output multi-task transcription keeps (about 3MB each for base)
+ENCODER_CACHE_WINDOWS = 4
+
+class TranscriptionEngine(ABC):
+    """A speech-to-text backend returning results shaped like openai-whisper's transcribe()."""
+
+    # True when passing on_segments changes how the audio is decoded (not just when it's reported)
+    streaming_changes_results = False
+
+    @abstractmethod
+    def transcribe(self, audio, model_size: str = "base", on_segments=None, **options) -> dict:
+        """
+        Transcribe a media path or 16kHz mono float32 array.
+
+        Supported options: task, language, word_timestamps, verbose.
+        Returns a dict with text, segments (with words when word_timestamps is set) and language.
+        When given, on_segments(segments) is called with each run of finished segments, in order,
+        while transcription is still running. It must not modify them.
+        """
+        pass
+
+    def transcribe_tasks(self, audio, model_size: str = "base", tasks=("transcribe",), on_segments=None, **options) -> dict:
+        """
+        Run several tasks (e.g. transcribe and translate) over the same audio.
+
+        Returns a dict mapping each task to its transcribe() result. Engines that can share
+        work between tasks override this; the default simply runs each task in turn.
+        on_segments, when given, is called as on_segments(task, segments).
+        """
+        return {
+            task: self.transcribe(
+                audio,
+                model_size,
+                on_segments=(lambda segments, task=task: on_segments(task, segments)) if on_segments else None,
+                **dict(options, task=task)
+            )
+            for task in tasks
+        }
+
+    @abstractmethod
+    def detect_language(self, audio, model_size: str = "base") -> str:
+        """Return the language code spoken in the first 30 seconds of a 16kHz mono float32 array."""
+        pass
+
+class OpenAIWhisperEngine(TranscriptionEngine):
+    """The reference openai-whisper implementation (fp32 torch)."""
+
+    streaming_changes_results = True
+
+    def transcribe(self, audio, model_size="base", on_segments=None, **options):
+        # Short clips from concurrent jobs are decoded together in one batch
+        if whisper_batcher.accepts(audio, options):
+            return whisper_batcher.transcribe(audio, model_size, on_segments=on_segments, **options)
+        with use_model(model_size) as model:
+            if on_segments is None:
+                return model.transcribe(audio, **options)
+            return self._transcribe_windows(model, audio, options, on_segments=on_segments)
+
+    def transcribe_tasks(self, audio, model_size="base", tasks=("transcribe",), on_segments=None, **options):
+        tasks = list(tasks)
+        if len(tasks) == 1:
+            # transcribe() hands short clips to the batcher, otherwise runs whisper unhooked
+            return super().transcribe_tasks(audio, model_size, tasks, on_segments=on_segments, **options)
+
+        # Every task runs whisper's own transcribe() loop, so each result is exactly what a
+        # standalone request for that task returns. The tasks move through the audio at
+        # different offsets, so the encoder output of only the last few windows is kept: it
+        # serves temperature fallback retries, and windows both tasks decode at the same
+        # offset (the first one, and every window of a clip shorter than the cache).
+        encoder_cache = _EncoderCache()
+        results = {}
+        with use_model(model_size) as model:
+            for task in tasks:
+                task_options = dict(options, task=task)
+                if on_segments is None:
+                    results[task] = self._run_transcribe(model, audio, task_options, encoder_cache)
+                else:
+                    results[task] = self._transcribe_windows(
+                        model,
+                        audio,
+                        task_options,
+                        encoder_cache=encoder_cache,
+                        on_segments=lambda segments, task=task: on_segments(task, segments)
+                    )
+        logger.info(f"Reused the encoder output of {encoder_cache.hits} of {encoder_cache.hits + encoder_cache.misses} windows")
+        return results
+
+    def _run_transcribe(self, model, audio, options, encoder_cache):
+        """Run model.transcribe() with encoder output looked up in encoder_cache."""
+        def hooked_decode(mel, decode_options):
+            return decode(model, encoder_cache.encode(model, mel), decode_options)
+
+        model.decode = hooked_decode
+        try:
+            return model.transcribe(audio, **options)
+        finally:
+            del model.decode
+
+    def _transcribe_windows(self, model, audio, options, encoder_cache=None, on_segments=None):
+        """
+        Transcribe one split_windows() window at a time, reporting each window's segments.
+
+        transcribe() has no progress callback, so partial results come from running it per
+        window: each call is prompted with the previous window's text and pinned to the
+        language detected in the first window. Wording can differ slightly from a single
+        whole-file run.
+        """
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        options = dict(options)
+        segments = []
+        prompt = None
+        for start, end in whisper_batcher.split_windows(audio):
+            window_options = dict(options, initial_prompt=prompt)
+            if encoder_cache is None:
+                result = model.transcribe(audio[start:end], **window_options)
+            else:
+                result = self._run_transcribe(model, audio[start:end], window_options, encoder_cache)
+            if options.get("language") is None:
+                options["language"] = result["language"]
+            prompt = result["text"].strip() or None
+            whisper_batcher.append_window_segments(segments, result["segments"], start)
+            if result["segments"]:
+                on_segments(result["segments"])
+
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": options.get("language")
+        }
+
+    def detect_language(self, audio, model_size="base"):
+        with use_model(model_size) as model:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+            _, probs = model.detect_language(mel)
+        return max(probs, key=probs.get)
+
+class _EncoderCache:
+    """The encoder output of the most recently used mel windows, matched exactly (no hashing)."""
+
+    def __init__(self, size=ENCODER_CACHE_WINDOWS):
+        self.size = size
+        self.entries = []  # (mel_segment, features), least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, model, mel_segment):
+        for index, (mel, features) in enumerate(self.entries):
+            if torch.equal(mel, mel_segment):
+                self.entries.append(self.entries.pop(index))
+                self.hits += 1
+                return features
+        with torch.no_grad():
+            features = model.embed_audio(mel_segment.unsqueeze(0))[0]
+        self.entries.append((mel_segment, features))
+        del self.entries[:-self.size]
+        self.misses += 1
+        return features
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """CTranslate2 backend with int8 quantised weights, much cheaper on CPU."""
+
+    def __init__(self):
+        self.cpu_threads = FASTER_WHISPER_THREADS
+
+    def _load(self, model_name):
+        try:
+            from faster_whisper import WhisperModel
+            from faster_whisper.utils import download_model
+        except ImportError:
+            raise ValueError("The faster-whisper engine requires the faster-whisper package")
+        model_size = model_name.split(":", 1)[1]
+        logger.info(f"Loading faster-whisper {model_size} model ({FASTER_WHISPER_COMPUTE_TYPE})")
+        model_path = model_size if os.path.isdir(model_size) else download_model(model_size)
+        model = WhisperModel(
+            model_path,
+            device="cpu",
+            compute_type=FASTER_WHISPER_COMPUTE_TYPE,
+            cpu_threads=self.cpu_threads
+        )
+        # CTranslate2 doesn't report its memory use; the converted weights on disk are the
+        # closest measure of what an int8 model holds in memory
+        size_bytes = sum(
+            os.path.getsize(os.path.join(model_path, name))
+            for name in os.listdir(model_path)
+            if os.path.isfile(os.path.join(model_path, name))
+        )
+        return model, size_bytes
+
+    def _get_model(self, model_size):
+        # Held in the shared registry so WHISPER_MODEL_MEMORY_MB counts these weights too
+        return get_model(f"faster-whisper:{model_size}", loader=self._load)
+
+    def transcribe(self, audio, model_size="base", on_segments=None, **options):
+        model = self._get_model(model_size)
+        segments, info = model.transcribe(
+            audio,
+            task=options.get("task", "transcribe"),
+            language=options.get("language"),
+            word_timestamps=options.get("word_timestamps", False)
+        )
+
+        # Convert to openai-whisper's result layout so callers don't care which engine ran
+        result_segments = []
+        for segment in segments:
+            result_segment = {
+                "id": len(result_segments),
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob
+            }
+            if segment.words is not None:
+                result_segment["words"] = [
+                    {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+                    for word in segment.words
+                ]
+            result_segments.append(result_segment)
+            if on_segments is not None:
+                on_segments([result_segment])
+
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+            "language": info.language
+        }
+
+    def detect_language(self, audio, model_size="base"):
+        # transcribe() detects the language eagerly; the segment generator is never consumed
+        _, info = self._get_model(model_size).transcribe(audio[:30 * SAMPLE_RATE])
+        return info.language
+
+ENGINES = {
+    "openai-whisper": OpenAIWhisperEngine(),
+    "faster-whisper": FasterWhisperEngine()
+}
+
+def get_engine(name=None) -> TranscriptionEngine:
+    """Return the named engine, or the TRANSCRIPTION_ENGINE default."""
+    name = name or TRANSCRIPTION_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown transcription engine: {name}")
+    return ENGINES[name]
@@ -21,6 +21,7 @@ import subprocess
 import json
 import re
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_args
 from config import LOCAL_STORAGE_PATH
 
 def get_extension_from_format(format_name):
@@ -137,6 +138,7 @@ def process_ffmpeg_compose(data, job_id):
         command.extend(["-filter_complex", filter_complex])
     
     # Add outputs
+    output_indices = []
     for i, output in enumerate(data["outputs"]):
         format_name = None
         for option in output["options"]:
@@ -152,11 +154,12 @@ def process_ffmpeg_compose(data, job_id):
             command.append(option["option"])
             if "argument" in option and option["argument"] is not None:
                 command.append(str(option["argument"]))
+        output_indices.append(len(command))
         command.append(output_filename)
     
     # Execute FFmpeg command
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
+        subprocess.run(ffmpeg_args(command, output_indices), check=True, capture_output=True, text=True)
     except subprocess.CalledProcessError as e:
         raise Exception(f"FFmpeg command failed: {e.stderr}")
     
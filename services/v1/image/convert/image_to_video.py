@@ -20,6 +20,7 @@ import os
 import subprocess
 import logging
 from services.file_management import download_file
+from services.cpu_budget import ffmpeg_args
 from PIL import Image
 from config import LOCAL_STORAGE_PATH
 logger = logging.getLogger(__name__)
@@ -64,7 +65,7 @@ def process_image_to_video(image_url, length, frame_rate, zoom_speed, job_id, we
         logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
 
         # Run FFmpeg command
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
         if result.returncode != 0:
             logger.error(f"FFmpeg command failed. Error: {result.stderr}")
             raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
@@ -19,13 +19,15 @@ import ffmpeg
 import subprocess
 import logging
 from services.file_management import download_file
+from services.cloud_storage import get_stream_output_options, upload_ffmpeg_output
+from services.cpu_budget import ffmpeg_output_kwargs
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def process_media_convert(media_url, job_id, output_format='mp4', video_codec='libx264', video_preset='medium', video_crf=23, audio_codec='aac', audio_bitrate='128k', webhook_url=None):
+def process_media_convert(media_url, job_id, output_format='mp4', video_codec='libx264', video_preset='medium', video_crf=23, audio_codec='aac', audio_bitrate='128k', webhook_url=None, stream_upload=False):
     """
     Convert media to specified format with customizable encoding settings.
     
@@ -39,9 +41,11 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
         audio_codec (str): Audio codec to use (default: 'aac')
         audio_bitrate (str): Audio bitrate (default: '128k')
         webhook_url (str, optional): URL to send completion webhook
+        stream_upload (bool): Pipe the encoder output straight into cloud storage
+            instead of writing a local file (streamable formats only)
         
     Returns:
-        str: Path to the converted output file
+        str: Path to the converted output file, or its cloud URL when stream_upload is True
     """
     input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
     output_filename = f"{job_id}.{output_format}"
@@ -50,7 +54,7 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
     try:
         # Set up the ffmpeg conversion
         stream = ffmpeg.input(input_filename)
-        output_options = {}
+        output_options = ffmpeg_output_kwargs()
         
         # Add format if specified
         if output_format:
@@ -94,6 +98,16 @@ def process_media_convert(media_url, job_id, output_format='mp4', video_codec='l
             if audio_codec != 'copy':
                 output_options['b:a'] = audio_bitrate
         
+        if stream_upload:
+            output_options.update(get_stream_output_options(output_format))
+            cmd = ffmpeg.output(stream, 'pipe:1', **output_options).compile()
+            try:
+                cloud_url = upload_ffmpeg_output(cmd, output_filename)
+            finally:
+                os.remove(input_filename)
+            logger.info(f"Media conversion streamed to cloud storage: {cloud_url} in format {output_format}")
+            return cloud_url
+
         # Configure output
         stream = ffmpeg.output(stream, output_path, **output_options)
         
@@ -20,10 +20,17 @@ import os
 import ffmpeg
 import requests
 from services.file_management import download_file
+from services.cloud_storage import get_stream_output_options, upload_ffmpeg_output
+from services.cpu_budget import ffmpeg_output_kwargs
 from config import LOCAL_STORAGE_PATH
 
-def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None):
-    """Convert media to MP3 format with specified bitrate and sample rate."""
+def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None, stream_upload=False):
+    """
+    Convert media to MP3 format with specified bitrate and sample rate.
+
+    Returns the local output path, or the cloud URL when stream_upload is True (the
+    encoder output is piped straight into cloud storage without a local file).
+    """
     input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
     output_filename = f"{job_id}.mp3"
     output_path = os.path.join(LOCAL_STORAGE_PATH, output_filename)
@@ -31,11 +38,21 @@ def process_media_to_mp3(media_url, job_id, bitrate='128k', sample_rate=None):
     try:
         # Build the ffmpeg command
         stream = ffmpeg.input(input_filename)
-        output_options = {'acodec': 'libmp3lame', 'audio_bitrate': bitrate}
+        output_options = {'acodec': 'libmp3lame', 'audio_bitrate': bitrate, **ffmpeg_output_kwargs()}
         
         # Only set sample rate if provided
         if sample_rate is not None:
             output_options['ar'] = sample_rate
+
+        if stream_upload:
+            output_options.update(get_stream_output_options('mp3'))
+            cmd = stream.output('pipe:1', **output_options).compile()
+            try:
+                cloud_url = upload_ffmpeg_output(cmd, output_filename)
+            finally:
+                os.remove(input_filename)
+            print(f"Streamed conversion successful: {cloud_url} with bitrate {bitrate}")
+            return cloud_url
             
         # Convert media file to MP3 with specified options
         (
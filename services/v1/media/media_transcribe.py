@@ -17,21 +17,37 @@
 
 
 import os
-import whisper
-import srt
-from datetime import timedelta
+import copy
+import time
 from whisper.utils import WriteSRT, WriteVTT
 from services.file_management import download_file
+from services.transcription_engines import get_engine
 import logging
-from config import LOCAL_STORAGE_PATH
+from services.v1.media.transcribe_chunked import get_media_duration, transcribe_long_media
+from services.v1.media.vad import gate_audio
+from services import transcription_cache
+from services.audio_artifact import load_audio
+from services.transcript import Transcript, compose_srt
+from config import LOCAL_STORAGE_PATH, TRANSCRIBE_CHUNKED_MIN_DURATION, TRANSCRIBE_VAD
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def process_transcribe_media(media_url, task, include_text, include_srt, include_segments, word_timestamps, response_type, language, job_id, words_per_line=None):
-    """Transcribe or translate media and return the transcript/translation, SRT or VTT file path."""
-    logger.info(f"Starting {task} for media URL: {media_url}")
+def process_transcribe_media(media_url, task, include_text, include_srt, include_segments, word_timestamps, response_type, language, job_id, words_per_line=None, engine=None, vad=None, tasks=None, on_segments=None):
+    """
+    Transcribe or translate media and return the transcript/translation, SRT or VTT file path.
+    The fourth returned value is a dict of processing metadata (e.g. VAD statistics).
+
+    When tasks lists several tasks (e.g. ["transcribe", "translate"]) the media is decoded and
+    encoded once, and the first three returned values are dicts keyed by task.
+
+    on_segments(task, segments), when given, is called with segments in media time as they
+    are finished, before the full result is available.
+    """
+    run_tasks = tasks or [task]
+    task_label = "/".join(run_tasks)
+    logger.info(f"Starting {task_label} for media URL: {media_url}")
     input_filename = download_file(media_url, os.path.join(LOCAL_STORAGE_PATH, f"{job_id}_input"))
     logger.info(f"Downloaded media to local file: {input_filename}")
 
@@ -39,12 +55,9 @@ def process_transcribe_media(media_url, task, include_text, include_srt, include
         # Load a larger model for better translation quality
         #model_size = "large" if task == "translate" else "base"
         model_size = "base"
-        model = whisper.load_model(model_size)
-        logger.info(f"Loaded Whisper {model_size} model")
 
         # Configure transcription/translation options
         options = {
-            "task": task,
             "word_timestamps": word_timestamps,
             "verbose": False
         }
@@ -53,105 +66,146 @@ def process_transcribe_media(media_url, task, include_text, include_srt, include
         if language:
             options["language"] = language
 
-        result = model.transcribe(input_filename, **options)
-        
-        # For translation task, the result['text'] will be in English
-        text = None
-        srt_text = None
-        segments_json = None
-
-        logger.info(f"Generated {task} output")
-
-        if include_text is True:
-            text = result['text']
-
-        if include_srt is True:
-            srt_subtitles = []
-            subtitle_index = 1
-            
-            if words_per_line and words_per_line > 0:
-                # Collect all words and their timings
-                all_words = []
-                word_timings = []
-                
-                for segment in result['segments']:
-                    words = segment['text'].strip().split()
-                    segment_start = segment['start']
-                    segment_end = segment['end']
-                    
-                    # Calculate timing for each word
-                    if words:
-                        duration_per_word = (segment_end - segment_start) / len(words)
-                        for i, word in enumerate(words):
-                            word_start = segment_start + (i * duration_per_word)
-                            word_end = word_start + duration_per_word
-                            all_words.append(word)
-                            word_timings.append((word_start, word_end))
-                
-                # Process words in chunks of words_per_line
-                current_word = 0
-                while current_word < len(all_words):
-                    # Get the next chunk of words
-                    chunk = all_words[current_word:current_word + words_per_line]
-                    
-                    # Calculate timing for this chunk
-                    chunk_start = word_timings[current_word][0]
-                    chunk_end = word_timings[min(current_word + len(chunk) - 1, len(word_timings) - 1)][1]
-                    
-                    # Create the subtitle
-                    srt_subtitles.append(srt.Subtitle(
-                        subtitle_index,
-                        timedelta(seconds=chunk_start),
-                        timedelta(seconds=chunk_end),
-                        ' '.join(chunk)
-                    ))
-                    subtitle_index += 1
-                    current_word += words_per_line
+        metadata = {}
+        use_vad = TRANSCRIBE_VAD if vad is None else vad
+
+        duration = get_media_duration(input_filename) if TRANSCRIBE_CHUNKED_MIN_DURATION > 0 else None
+        if duration is not None and duration >= TRANSCRIBE_CHUNKED_MIN_DURATION:
+            mode = "chunked"
+        else:
+            mode = "vad" if use_vad else "full"
+
+        # Engines that stream partial segments by decoding window by window can word things
+        # differently from a whole-file run, so those results are cached separately
+        cache_mode = mode
+        if on_segments is not None and mode != "chunked" and get_engine(engine).streaming_changes_results:
+            cache_mode = f"{mode}-streamed"
+
+        # Identical media with identical options is served from the cache without inference
+        results = {}
+        cache_keys = {}
+        for run_task in run_tasks:
+            cache_keys[run_task] = transcription_cache.cache_key(input_filename, engine, model_size, run_task, language, word_timestamps, cache_mode)
+            cached = transcription_cache.get(cache_keys[run_task])
+            if cached is not None:
+                results[run_task] = cached["result"]
+                metadata.update(cached["metadata"])
+                if on_segments is not None:
+                    on_segments(run_task, cached["result"]["segments"])
+
+        missing = [run_task for run_task in run_tasks if run_task not in results]
+        if missing:
+            start_time = time.time()
+            if mode == "chunked":
+                # Long media: transcribe silence-delimited chunks in parallel processes
+                computed = {
+                    run_task: transcribe_long_media(
+                        input_filename,
+                        model_size,
+                        dict(options, task=run_task),
+                        engine,
+                        on_segments=(lambda segments, run_task=run_task: on_segments(run_task, segments)) if on_segments else None
+                    )
+                    for run_task in missing
+                }
+            elif mode == "vad":
+                # Only send detected speech through the model, then map times back
+                gated = gate_audio(load_audio(input_filename))
+                if len(gated.audio) > 0:
+                    report = None
+                    if on_segments is not None:
+                        # Partial segments are remapped on copies; the final result is remapped below
+                        def report(run_task, segments):
+                            on_segments(run_task, gated.remap_result({"segments": copy.deepcopy(segments)})["segments"])
+                    computed = get_engine(engine).transcribe_tasks(gated.audio, model_size, missing, on_segments=report, **options)
+                    computed = {run_task: gated.remap_result(result) for run_task, result in computed.items()}
+                else:
+                    computed = {run_task: {"text": "", "segments": [], "language": language} for run_task in missing}
+                metadata["vad"] = gated.stats()
             else:
-                # Original behavior - one subtitle per segment
-                for segment in result['segments']:
-                    start = timedelta(seconds=segment['start'])
-                    end = timedelta(seconds=segment['end'])
-                    segment_text = segment['text'].strip()
-                    srt_subtitles.append(srt.Subtitle(subtitle_index, start, end, segment_text))
-                    subtitle_index += 1
-            
-            srt_text = srt.compose(srt_subtitles)
-
-        if include_segments is True:
-            segments_json = result['segments']
+                computed = get_engine(engine).transcribe_tasks(load_audio(input_filename), model_size, missing, on_segments=on_segments, **options)
+
+            compute_seconds = (time.time() - start_time) / len(missing)
+            for run_task, result in computed.items():
+                transcription_cache.put(cache_keys[run_task], {"result": result, "metadata": metadata}, compute_seconds)
+                results[run_task] = result
+
+        # For translation task, the result['text'] will be in English
+        outputs = {}
+        for run_task in run_tasks:
+            outputs[run_task] = build_outputs(results[run_task], include_text, include_srt, include_segments, words_per_line)
+            logger.info(f"Generated {run_task} output")
 
         os.remove(input_filename)
         logger.info(f"Removed local file: {input_filename}")
-        logger.info(f"{task.capitalize()} successful, output type: {response_type}")
+        logger.info(f"{task_label.capitalize()} successful, output type: {response_type}")
 
-        if response_type == "direct":
-            return text, srt_text, segments_json
-        else:
-            
-            if include_text is True:
-                text_filename = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}.txt")
-                with open(text_filename, 'w') as f:
-                    f.write(text)
-            else:
-                text_file = None
-            
-            if include_srt is True:
-                srt_filename = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}.srt")
-                with open(srt_filename, 'w') as f:
-                    f.write(srt_text)
-            else:
-                srt_filename = None
+        if response_type != "direct":
+            for run_task in run_tasks:
+                # Keep the single-task file names unchanged, suffix them per task otherwise
+                prefix = f"{job_id}_{run_task}" if tasks else job_id
+                outputs[run_task] = write_outputs(prefix, *outputs[run_task])
 
-            if include_segments is True:
-                segments_filename = os.path.join(LOCAL_STORAGE_PATH, f"{job_id}.json")
-                with open(segments_filename, 'w') as f:
-                    f.write(str(segments_json))
-            else:
-                segments_filename = None
+        if not tasks:
+            return (*outputs[task], metadata)
 
-            return text_filename, srt_filename, segments_filename 
+        return (
+            {run_task: outputs[run_task][0] for run_task in run_tasks},
+            {run_task: outputs[run_task][1] for run_task in run_tasks},
+            {run_task: outputs[run_task][2] for run_task in run_tasks},
+            metadata
+        )
 
     except Exception as e:
-        logger.error(f"{task.capitalize()} failed: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"{task_label.capitalize()} failed: {str(e)}")
+        raise
+
+def build_outputs(result, include_text, include_srt, include_segments, words_per_line=None):
+    """Return the (text, srt_text, segments_json) outputs requested for a transcribe() result."""
+    text = None
+    srt_text = None
+    segments_json = None
+
+    if include_text is True:
+        text = result['text']
+
+    if include_srt is True:
+        if words_per_line and words_per_line > 0:
+            # Split each segment's text into words spread evenly over the segment,
+            # then group words across segments into subtitles of words_per_line
+            transcript = Transcript.from_segment_text(result)
+            srt_text = compose_srt(*transcript.word_lines(words_per_line))
+        else:
+            # Original behavior - one subtitle per segment
+            transcript = Transcript.from_whisper(result)
+            srt_text = compose_srt(transcript.segment_start, transcript.segment_end, [text.strip() for text in transcript.segment_text])
+
+    if include_segments is True:
+        segments_json = result['segments']
+
+    return text, srt_text, segments_json
+
+def write_outputs(prefix, text, srt_text, segments_json):
+    """Write the requested outputs to LOCAL_STORAGE_PATH and return their paths (None when not requested)."""
+    if text is not None:
+        text_filename = os.path.join(LOCAL_STORAGE_PATH, f"{prefix}.txt")
+        with open(text_filename, 'w') as f:
+            f.write(text)
+    else:
+        text_filename = None
+    
+    if srt_text is not None:
+        srt_filename = os.path.join(LOCAL_STORAGE_PATH, f"{prefix}.srt")
+        with open(srt_filename, 'w') as f:
+            f.write(srt_text)
+    else:
+        srt_filename = None
+
+    if segments_json is not None:
+        segments_filename = os.path.join(LOCAL_STORAGE_PATH, f"{prefix}.json")
+        with open(segments_filename, 'w') as f:
+            f.write(str(segments_json))
+    else:
+        segments_filename = None
+
+    return text_filename, srt_filename, segments_filename
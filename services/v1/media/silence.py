@@ -17,11 +17,14 @@
 
 
 import os
+import re
 import json
-import subprocess
 import logging
-import re
+import subprocess
+import ffmpeg
+import numpy as np
 from services.file_management import download_file
+from services.audio_artifact import cached_audio, SAMPLE_RATE
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
@@ -49,14 +52,8 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
     logger.info(f"Downloaded media to local file: {input_filename}")
     
     try:
-        # For reliable silence detection with time constraints, we need a different approach
-        # We'll use FFmpeg without any time constraints and process the results later
-        cmd = ['ffmpeg', '-i', input_filename]
-        
-        # We won't use audio trim filters as they're causing issues with silence detection
-        # Instead, we'll filter the results after the analysis is complete
-        segment_filter = ""
-        
+        # For reliable silence detection with time constraints, we analyze the whole file
+        # and filter the results after the analysis is complete
         # Save the start and end times for post-processing
         start_seconds = 0
         end_seconds = float('inf')
@@ -79,55 +76,19 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
             except ValueError:
                 logger.warning(f"Could not parse end time '{end_time}', using infinity")
             
-        # Add audio processing options
-        cmd.extend(['-af'])
-        
-        # Build the filter string
-        filter_string = ""
-        
-        # First add the segment filter if needed
-        filter_string += segment_filter
-        
-        # Then add mono conversion if needed
-        if mono:
-            filter_string += "pan=mono|c0=0.5*c0+0.5*c1,"
-            
-        # Add the silencedetect filter
-        filter_string += f"silencedetect=noise={noise_threshold}:d={min_duration}"
-        cmd.append(filter_string)
-        
-        # Output to null, we only want the filter output
-        cmd.extend(['-f', 'null', '-'])
-        
-        logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-        
-        # Run the FFmpeg command and capture stderr for silence detection output
-        result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+        # Media that is already 16kHz mono decodes to exactly the shared PCM, so if another job
+        # (e.g. a transcription) has decoded it, run the same rule on that instead of FFmpeg
+        audio = cached_audio(input_filename) if is_pcm_format(input_filename) else None
+        if audio is not None:
+            logger.info("Detecting silence on the shared decoded audio")
+            silences = detect_silence_pcm(audio, noise_threshold, min_duration)
+        else:
+            silences = run_silencedetect(input_filename, noise_threshold, min_duration, mono)
         
         # Parse the silence detection output
         silence_intervals = []
         
-        # Regular expressions to match the silence detection output
-        silence_start_pattern = r'silence_start: (\d+\.?\d*)'
-        silence_end_pattern = r'silence_end: (\d+\.?\d*) \| silence_duration: (\d+\.?\d*)'
-        
-        # Find all silence start times
-        silence_starts = re.findall(silence_start_pattern, result.stderr)
-        
-        # Find all silence end times and durations
-        silence_ends_durations = re.findall(silence_end_pattern, result.stderr)
-        
-        # Combine the results into a list of silence intervals
-        for i, (end, duration) in enumerate(silence_ends_durations):
-            # For the first silence period, the start time might not be detected correctly
-            # if the media starts with silence
-            start = silence_starts[i] if i < len(silence_starts) else "0.0"
-            
-            # Convert to float 
-            start_time_float = float(start) 
-            end_time_float = float(end)
-            duration_float = float(duration)
-            
+        for start_time_float, end_time_float, duration_float in silences:
             # Filter the results based on the specified time range
             # Only include silence periods that overlap with our requested range
             
@@ -164,6 +125,129 @@ def detect_silence(media_url, start_time=None, end_time=None, noise_threshold="-
             os.remove(input_filename)
         raise
 
+def is_pcm_format(input_filename):
+    """Return True if the first audio stream is already 16kHz mono, the shared PCM format."""
+    try:
+        streams = ffmpeg.probe(input_filename, select_streams='a:0')['streams']
+    except ffmpeg.Error:
+        return False
+    return bool(streams) and int(streams[0].get('channels', 0)) == 1 and int(streams[0].get('sample_rate', 0)) == SAMPLE_RATE
+
+def run_silencedetect(input_filename, noise_threshold="-30dB", min_duration=0.5, mono=False):
+    """
+    Run FFmpeg's silencedetect filter over a local media file.
+    
+    Args:
+        input_filename (str): Path to the local media file
+        noise_threshold (str, optional): Noise tolerance threshold, default "-30dB"
+        min_duration (float, optional): Minimum silence duration to detect in seconds
+        mono (bool, optional): Whether to convert stereo to mono before analysis
+        
+    Returns:
+        list: (start, end, duration) tuples in seconds, in order
+    """
+    cmd = ['ffmpeg', '-i', input_filename, '-vn']
+    
+    # Add audio processing options
+    cmd.extend(['-af'])
+    
+    # Build the filter string
+    filter_string = ""
+    
+    # Then add mono conversion if needed
+    if mono:
+        filter_string += "pan=mono|c0=0.5*c0+0.5*c1,"
+        
+    # Add the silencedetect filter
+    filter_string += f"silencedetect=noise={noise_threshold}:d={min_duration}"
+    cmd.append(filter_string)
+    
+    # Output to null, we only want the filter output
+    cmd.extend(['-f', 'null', '-'])
+    
+    logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
+    
+    # Run the FFmpeg command and capture stderr for silence detection output
+    result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+    
+    # Regular expressions to match the silence detection output
+    silence_start_pattern = r'silence_start: (-?\d+\.?\d*)'
+    silence_end_pattern = r'silence_end: (\d+\.?\d*) \| silence_duration: (\d+\.?\d*)'
+    
+    # Find all silence start times
+    silence_starts = re.findall(silence_start_pattern, result.stderr)
+    
+    # Find all silence end times and durations
+    silence_ends_durations = re.findall(silence_end_pattern, result.stderr)
+    
+    silences = []
+    for i, (end, duration) in enumerate(silence_ends_durations):
+        # For the first silence period, the start time might not be detected correctly
+        # if the media starts with silence
+        start = silence_starts[i] if i < len(silence_starts) else "0.0"
+        silences.append((max(float(start), 0.0), float(end), float(duration)))
+    
+    return silences
+
+def parse_noise_threshold(noise_threshold):
+    """Convert a silencedetect noise value ("-30dB" or an amplitude ratio like "0.001") to an amplitude."""
+    value = str(noise_threshold).strip()
+    if value.lower().endswith('db'):
+        return 10 ** (float(value[:-2]) / 20)
+    return float(value)
+
+def detect_silence_pcm(audio, noise_threshold="-30dB", min_duration=0.5, block_seconds=60):
+    """
+    Find silences in decoded mono PCM with the same rule as FFmpeg's silencedetect:
+    a silence is a run of at least min_duration seconds where every sample is below
+    the noise threshold. Works through the audio in blocks so memory-mapped input is
+    never fully loaded.
+    
+    Args:
+        audio (numpy.ndarray): 16kHz mono float32 samples
+        noise_threshold (str, optional): Noise tolerance threshold, default "-30dB"
+        min_duration (float, optional): Minimum silence duration to detect in seconds
+        
+    Returns:
+        list: (start, end, duration) tuples in seconds, in order
+    """
+    threshold = parse_noise_threshold(noise_threshold)
+    min_samples = int(min_duration * SAMPLE_RATE)
+    block_size = int(block_seconds * SAMPLE_RATE)
+    silences = []
+    pending_start = None  # Start of a silent run that reached the end of the previous block
+
+    def add(start, end):
+        if end - start >= min_samples:
+            silences.append((start / SAMPLE_RATE, end / SAMPLE_RATE, (end - start) / SAMPLE_RATE))
+
+    for block_start in range(0, len(audio), block_size):
+        silent = np.abs(audio[block_start:block_start + block_size]) < threshold
+        changes = np.diff(np.concatenate(([0], silent.view(np.int8), [0])))
+        starts = np.flatnonzero(changes == 1)
+        ends = np.flatnonzero(changes == -1)
+
+        if pending_start is not None:
+            if len(starts) and starts[0] == 0:
+                # The run continues into this block
+                starts[0] = pending_start - block_start
+            else:
+                add(pending_start, block_start)
+            pending_start = None
+
+        if len(ends) and ends[-1] == len(silent) and block_start + len(silent) < len(audio):
+            pending_start = block_start + int(starts[-1])
+            starts, ends = starts[:-1], ends[:-1]
+
+        long_runs = (ends - starts) >= min_samples
+        for start, end in zip(starts[long_runs], ends[long_runs]):
+            add(block_start + int(start), block_start + int(end))
+
+    if pending_start is not None:
+        add(pending_start, len(audio))
+
+    return silences
+
 def format_time(seconds):
     """
     Format time in seconds to HH:MM:SS.mmm format
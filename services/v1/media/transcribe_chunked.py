@@ -0,0 +1,187 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import logging
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+from services.v1.media.silence import detect_silence_pcm
+from services.transcription_engines import get_engine, ENGINES
+from services.audio_artifact import decode_audio, open_audio, SAMPLE_RATE
+from services.cpu_budget import job_threads
+from config import TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_WORKERS, TRANSCRIBE_CHUNK_THREADS
+
+logger = logging.getLogger(__name__)
+
+# How far either side of a target cut point to look for a silence to cut in
+CUT_SEARCH_WINDOW = 30.0
+# Overlap added around hard cuts (no silence nearby) so no word is lost at the edge
+HARD_CUT_OVERLAP = 1.0
+# Whisper's seek positions are in mel frames of 10ms
+FRAMES_PER_SECOND = 100
+
+def get_media_duration(input_filename):
+    """Return the media duration in seconds using ffprobe."""
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', input_filename]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+def plan_chunks(duration, silences, chunk_seconds=TRANSCRIBE_CHUNK_SECONDS):
+    """
+    Split [0, duration] into chunks of roughly chunk_seconds, cutting in the middle of
+    the silence closest to each target boundary.
+
+    Returns:
+        list: dicts with the audio range to decode (start, end) and the range whose
+              words the chunk owns (own_start, own_end)
+    """
+    midpoints = [(start + end) / 2 for start, end, _ in silences]
+    cuts = []
+    position = 0.0
+    while duration - position > chunk_seconds * 1.5:
+        target = position + chunk_seconds
+        candidates = [m for m in midpoints if abs(m - target) <= CUT_SEARCH_WINDOW and m > position]
+        if candidates:
+            cuts.append((min(candidates, key=lambda m: abs(m - target)), False))
+        else:
+            cuts.append((target, True))
+        position = cuts[-1][0]
+
+    boundaries = [(0.0, False)] + cuts + [(duration, False)]
+    chunks = []
+    for (own_start, hard_start), (own_end, hard_end) in zip(boundaries, boundaries[1:]):
+        chunks.append({
+            "start": max(own_start - HARD_CUT_OVERLAP, 0.0) if hard_start else own_start,
+            "end": min(own_end + HARD_CUT_OVERLAP, duration) if hard_end else own_end,
+            "own_start": own_start,
+            "own_end": own_end
+        })
+    return chunks
+
+def audio_range(audio, start, end):
+    """Copy [start, end) seconds out of a memory-mapped artifact into a regular array."""
+    return np.array(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])
+
+def _init_chunk_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+    ENGINES["faster-whisper"].cpu_threads = threads
+
+def _transcribe_chunk(artifact_path, chunk, model_size, options, engine):
+    # Workers map the decoded artifact themselves and only touch their own range
+    audio = audio_range(open_audio(artifact_path), chunk["start"], chunk["end"])
+    return get_engine(engine).transcribe(audio, model_size, **options)
+
+def _midpoint(item):
+    return (item["start"] + item["end"]) / 2
+
+def merge_chunk_results(chunks, results):
+    """
+    Shift each chunk's segments and words to media time and stitch them together.
+    A segment belongs to the chunk whose owned range contains its midpoint; words
+    are filtered the same way, so overlapping hard cuts don't duplicate words.
+    """
+    segments = []
+    for chunk, result in zip(chunks, results):
+        offset = chunk["start"]
+        for segment in result["segments"]:
+            segment = dict(segment)
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(segment["end"] + offset, 3)
+            if "words" in segment:
+                words = []
+                for word in segment["words"]:
+                    word = dict(word, start=round(word["start"] + offset, 3), end=round(word["end"] + offset, 3))
+                    if chunk["own_start"] <= _midpoint(word) < chunk["own_end"]:
+                        words.append(word)
+                if not words:
+                    continue
+                if len(words) != len(segment["words"]):
+                    # Words on the far side of a hard cut belong to the neighbouring chunk
+                    segment["text"] = "".join(word["word"] for word in words)
+                segment["words"] = words
+                segment["start"] = words[0]["start"]
+                segment["end"] = words[-1]["end"]
+            elif not chunk["own_start"] <= _midpoint(segment) < chunk["own_end"]:
+                continue
+
+            # Keep timestamps monotonic where chunks meet
+            if segments and segment["start"] < segments[-1]["end"]:
+                segment["start"] = segments[-1]["end"]
+                if segment.get("words") and segment["words"][0]["start"] < segment["start"]:
+                    segment["words"][0]["start"] = segment["start"]
+            segment["end"] = max(segment["end"], segment["start"])
+
+            segment["id"] = len(segments)
+            segment["seek"] = segment["seek"] + int(offset * FRAMES_PER_SECOND)
+            segments.append(segment)
+
+    return segments
+
+def transcribe_long_media(input_filename, model_size, options, engine=None, on_segments=None):
+    """
+    Transcribe long media by splitting it at silences and transcribing the chunks in
+    parallel worker processes. Returns a dict shaped like model.transcribe's result.
+    on_segments, when given, receives each chunk's merged segments once it and every
+    earlier chunk have finished.
+    """
+    artifact_path = decode_audio(input_filename)
+    audio = open_audio(artifact_path)
+    duration = len(audio) / SAMPLE_RATE
+    silences = detect_silence_pcm(audio, noise_threshold="-35dB", min_duration=0.3)
+    chunks = plan_chunks(duration, silences)
+
+    options = dict(options)
+    if not options.get("language"):
+        # Detect once so every chunk is transcribed in the same language
+        options["language"] = get_engine(engine).detect_language(audio_range(audio, 0, 30), model_size)
+
+    workers = min(len(chunks), TRANSCRIBE_CHUNK_WORKERS)
+    threads = job_threads()
+    if threads is not None:
+        # Stay within this job's share of the cores when other jobs are running
+        workers = max(1, min(workers, threads // TRANSCRIBE_CHUNK_THREADS))
+    logger.info(f"Transcribing {duration:.0f}s of media as {len(chunks)} chunks on {workers} processes with {TRANSCRIBE_CHUNK_THREADS} threads each")
+
+    # spawn rather than fork: torch thread pools and locks held by other threads are not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_chunk_worker,
+        initargs=(TRANSCRIBE_CHUNK_THREADS,)
+    ) as executor:
+        futures = [executor.submit(_transcribe_chunk, artifact_path, chunk, model_size, options, engine) for chunk in chunks]
+        results = []
+        reported = 0
+        for future in futures:
+            results.append(future.result())
+            if on_segments is not None:
+                # Merging a prefix of the chunks gives a prefix of the final segments
+                merged = merge_chunk_results(chunks[:len(results)], results)
+                if len(merged) > reported:
+                    on_segments(merged[reported:])
+                    reported = len(merged)
+
+    segments = merge_chunk_results(chunks, results)
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": options["language"]
+    }
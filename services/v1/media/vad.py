@@ -0,0 +1,145 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import bisect
+import logging
+import numpy as np
+from config import VAD_THRESHOLD_MARGIN_DB
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+# Quietest level ever treated as speech, and loudest level ever treated as background
+MIN_SPEECH_DB = -50.0
+MAX_NOISE_FLOOR_DB = -30.0
+# Speech shorter than this is dropped, and pauses shorter than this are kept inside a region
+MIN_SPEECH_SECONDS = 0.25
+MIN_SILENCE_SECONDS = 0.6
+# Audio kept either side of each region so word onsets and tails aren't clipped
+PAD_SECONDS = 0.2
+# Silence inserted between concatenated regions so Whisper sees a pause there
+JOIN_GAP_SECONDS = 0.3
+
+def detect_speech_regions(audio, margin_db=VAD_THRESHOLD_MARGIN_DB):
+    """
+    Find speech in 16kHz mono float32 audio from frame energy.
+
+    The threshold adapts to the recording: margin_db above the noise floor (the 10th
+    percentile of frame energy), clamped between MIN_SPEECH_DB and MAX_NOISE_FLOOR_DB.
+
+    Returns:
+        list: (start, end) sample indices of speech regions, in order
+    """
+    frame_length = int(SAMPLE_RATE * FRAME_SECONDS)
+    frame_count = len(audio) // frame_length
+    if frame_count == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:frame_count * frame_length].reshape(frame_count, frame_length)
+    energy_db = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-10)
+    noise_floor = min(np.percentile(energy_db, 10), MAX_NOISE_FLOOR_DB)
+    threshold = max(noise_floor + margin_db, MIN_SPEECH_DB)
+    voiced = energy_db > threshold
+
+    # Turn voiced frames into (first_frame, last_frame + 1) runs
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    runs = list(zip(edges[::2], edges[1::2]))
+
+    # Bridge short pauses, then drop blips too short to be speech
+    min_silence_frames = int(MIN_SILENCE_SECONDS / FRAME_SECONDS)
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_silence_frames:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    min_speech_frames = int(MIN_SPEECH_SECONDS / FRAME_SECONDS)
+    merged = [(start, end) for start, end in merged if end - start >= min_speech_frames]
+
+    pad = int(PAD_SECONDS * SAMPLE_RATE)
+    regions = []
+    for start, end in merged:
+        start = max(start * frame_length - pad, 0)
+        end = min(end * frame_length + pad, len(audio))
+        start, end = int(start), int(end)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+class GatedAudio:
+    """Speech regions joined into one array, with the mapping back to the original timeline."""
+
+    def __init__(self, audio, regions):
+        gap = np.zeros(int(JOIN_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+        pieces = []
+        # Parallel lists: where each region starts in the gated audio and in the original
+        self.gated_starts = []
+        self.original_starts = []
+        self.lengths = []
+        position = 0
+        for start, end in regions:
+            if pieces:
+                pieces.append(gap)
+                position += len(gap)
+            self.gated_starts.append(position / SAMPLE_RATE)
+            self.original_starts.append(start / SAMPLE_RATE)
+            self.lengths.append((end - start) / SAMPLE_RATE)
+            pieces.append(audio[start:end])
+            position += end - start
+
+        self.audio = np.concatenate(pieces).astype(np.float32) if pieces else np.zeros(0, dtype=np.float32)
+        self.original_seconds = len(audio) / SAMPLE_RATE
+        self.speech_seconds = float(sum(self.lengths))
+
+    def to_original(self, seconds):
+        """Map a time in the gated audio back to the original media."""
+        if not self.gated_starts:
+            return seconds
+        index = max(bisect.bisect_right(self.gated_starts, seconds) - 1, 0)
+        # Times inside a join gap are clamped to the end of the preceding region
+        offset = min(max(seconds - self.gated_starts[index], 0.0), self.lengths[index])
+        return round(self.original_starts[index] + offset, 3)
+
+    def remap_result(self, result):
+        """Rewrite segment and word timestamps of a transcription result in place."""
+        for segment in result["segments"]:
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"])
+            for word in segment.get("words", []):
+                word["start"] = self.to_original(word["start"])
+                word["end"] = self.to_original(word["end"])
+        return result
+
+    def stats(self):
+        skipped = max(self.original_seconds - self.speech_seconds, 0.0)
+        return {
+            "duration": round(self.original_seconds, 3),
+            "speech_duration": round(self.speech_seconds, 3),
+            "skipped_duration": round(skipped, 3),
+            "skipped_fraction": round(skipped / self.original_seconds, 4) if self.original_seconds else 0.0,
+            "regions": len(self.lengths)
+        }
+
+def gate_audio(audio):
+    """Run the VAD over audio and return the speech-only GatedAudio."""
+    gated = GatedAudio(audio, detect_speech_regions(audio))
+    logger.info(f"VAD kept {gated.speech_seconds:.1f}s of {gated.original_seconds:.1f}s in {len(gated.lengths)} regions")
+    return gated
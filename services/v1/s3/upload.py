@@ -23,9 +23,16 @@ import requests
 from urllib.parse import urlparse, unquote, quote
 import uuid
 import re
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from services.s3_toolkit import multipart_upload_stream, choose_part_size
+from config import S3_UPLOAD_CONCURRENCY
 
 logger = logging.getLogger(__name__)
 
+MAX_COPY_OBJECT_SIZE = 5 * 1024 * 1024 * 1024  # CopyObject limit; larger objects need UploadPartCopy
+COPY_PART_SIZE = 512 * 1024 * 1024
+
 def get_s3_client():
     """Create and return an S3 client using environment variables."""
     endpoint_url = os.getenv('S3_ENDPOINT_URL')
@@ -52,6 +59,101 @@ def get_filename_from_url(url):
     
     return filename
 
+def parse_same_endpoint_url(file_url, endpoint_url):
+    """
+    If file_url points at an object on our own S3 endpoint, return (bucket, key).
+
+    Handles path-style (https://endpoint/bucket/key) and virtual-hosted-style
+    (https://bucket.endpoint/key) URLs. Query strings such as presigned-URL
+    signatures are ignored because the copy runs with our own credentials.
+
+    Returns:
+        tuple or None: (bucket, key), or None if the URL is not on this endpoint
+    """
+    if not endpoint_url:
+        return None
+
+    source = urlparse(file_url)
+    endpoint = urlparse(endpoint_url)
+    source_host = (source.netloc or '').lower()
+    endpoint_host = (endpoint.netloc or '').lower()
+    if not source_host or not endpoint_host:
+        return None
+
+    path = unquote(source.path).lstrip('/')
+    if source_host == endpoint_host:
+        bucket, _, key = path.partition('/')
+    elif source_host.endswith('.' + endpoint_host):
+        bucket, key = source_host[:-len(endpoint_host) - 1], path
+    else:
+        return None
+
+    if not bucket or not key:
+        return None
+    return bucket, key
+
+def caller_can_read(file_url, download_headers=None):
+    """
+    Return True if file_url can be read as given, with only the caller's own headers.
+
+    The server-side copy runs with our credentials, so it is only used for objects the
+    caller could have downloaded anyway. A one-byte ranged GET is used rather than HEAD
+    because presigned URLs are usually signed for GET only.
+    """
+    headers = dict(download_headers or {}, Range='bytes=0-0')
+    try:
+        with requests.get(file_url, headers=headers, stream=True, timeout=30) as response:
+            return response.status_code in (200, 206)
+    except requests.RequestException as e:
+        logger.warning(f"Could not check read access to {file_url}: {e}")
+        return False
+
+def server_side_copy(s3_client, source_bucket, source_key, bucket_name, key, acl):
+    """
+    Copy an object inside the storage provider so the bytes never leave it.
+
+    Uses CopyObject up to 5GB and a parallel UploadPartCopy multipart upload above that.
+    """
+    copy_source = {'Bucket': source_bucket, 'Key': source_key}
+    size = s3_client.head_object(Bucket=source_bucket, Key=source_key)['ContentLength']
+
+    if size <= MAX_COPY_OBJECT_SIZE:
+        logger.info(f"Copying {source_bucket}/{source_key} to {bucket_name}/{key} with CopyObject")
+        s3_client.copy_object(CopySource=copy_source, Bucket=bucket_name, Key=key, ACL=acl)
+        return size
+
+    part_size = max(COPY_PART_SIZE, choose_part_size(size))
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    logger.info(f"Copying {source_bucket}/{source_key} to {bucket_name}/{key} with {len(ranges)} UploadPartCopy parts")
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=key, ACL=acl)['UploadId']
+    try:
+        def copy_part(part_number, byte_range):
+            part = s3_client.upload_part_copy(
+                Bucket=bucket_name,
+                Key=key,
+                PartNumber=part_number,
+                UploadId=upload_id,
+                CopySource=copy_source,
+                CopySourceRange=f"bytes={byte_range[0]}-{byte_range[1]}"
+            )
+            return {'PartNumber': part_number, 'ETag': part['CopyPartResult']['ETag']}
+
+        with ThreadPoolExecutor(max_workers=max(1, S3_UPLOAD_CONCURRENCY)) as executor:
+            parts = list(executor.map(copy_part, range(1, len(ranges) + 1), ranges))
+
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+        return size
+    except Exception:
+        logger.error(f"Aborting multipart copy for {key}")
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
+
 def stream_upload_to_s3(file_url, custom_filename=None, make_public=False, download_headers=None):
     """
     Stream a file from a URL directly to S3 without saving to disk.
@@ -79,75 +181,44 @@ def stream_upload_to_s3(file_url, custom_filename=None, make_public=False, downl
         else:
             filename = get_filename_from_url(file_url)
         
-        # Start a multipart upload
-        logger.info(f"Starting multipart upload for {filename} to bucket {bucket_name}")
         acl = 'public-read' if make_public else 'private'
         
-        multipart_upload = s3_client.create_multipart_upload(
-            Bucket=bucket_name,
-            Key=filename,
-            ACL=acl
-        )
-        
-        upload_id = multipart_upload['UploadId']
-        
-        # Stream the file from URL
-        response = requests.get(file_url, stream=True, headers=download_headers)
-        response.raise_for_status()
-        
-        # Process in chunks using multipart upload
-        chunk_size = 5 * 1024 * 1024  # 5MB chunks (AWS minimum)
-        parts = []
-        part_number = 1
+        # Objects already on our endpoint are copied inside the provider instead of streamed
+        copied = False
+        source = parse_same_endpoint_url(file_url, endpoint_url)
+        if source and not caller_can_read(file_url, download_headers):
+            # Never use our credentials for an object the caller's URL doesn't grant access to
+            logger.info(f"{file_url} is not readable as given; streaming it instead of copying")
+            source = None
+        if source == (bucket_name, filename):
+            # Nothing to transfer, but the requested visibility still applies
+            logger.info(f"Source is already {bucket_name}/{filename}; only setting its ACL")
+            s3_client.put_object_acl(Bucket=bucket_name, Key=filename, ACL=acl)
+            copied = True
+        elif source:
+            try:
+                server_side_copy(s3_client, source[0], source[1], bucket_name, filename, acl)
+                copied = True
+            except ClientError as e:
+                logger.warning(f"Server-side copy from {source[0]}/{source[1]} failed, streaming instead: {e}")
         
-        buffer = bytearray()
-        
-        for chunk in response.iter_content(chunk_size=1024 * 1024):  # 1MB read chunks
-            buffer.extend(chunk)
+        if not copied:
+            logger.info(f"Starting multipart upload for {filename} to bucket {bucket_name}")
             
-            # When we have enough data for a part, upload it
-            if len(buffer) >= chunk_size:
-                logger.info(f"Uploading part {part_number}")
-                part = s3_client.upload_part(
-                    Bucket=bucket_name,
-                    Key=filename,
-                    PartNumber=part_number,
-                    UploadId=upload_id,
-                    Body=buffer
-                )
-                
-                parts.append({
-                    'PartNumber': part_number,
-                    'ETag': part['ETag']
-                })
-                
-                part_number += 1
-                buffer = bytearray()
-        
-        # Upload any remaining data as the final part
-        if buffer:
-            logger.info(f"Uploading final part {part_number}")
-            part = s3_client.upload_part(
-                Bucket=bucket_name,
-                Key=filename,
-                PartNumber=part_number,
-                UploadId=upload_id,
-                Body=buffer
-            )
+            # Stream the file from URL
+            response = requests.get(file_url, stream=True, headers=download_headers)
+            response.raise_for_status()
+            # Let urllib3 undo any transfer compression while we read the raw stream
+            response.raw.decode_content = True
             
-            parts.append({
-                'PartNumber': part_number,
-                'ETag': part['ETag']
-            })
-        
-        # Complete the multipart upload
-        logger.info("Completing multipart upload")
-        s3_client.complete_multipart_upload(
-            Bucket=bucket_name,
-            Key=filename,
-            UploadId=upload_id,
-            MultipartUpload={'Parts': parts}
-        )
+            # Size parts from Content-Length so large files stay under the part limit
+            content_length = int(response.headers.get('Content-Length') or 0)
+            part_size = choose_part_size(content_length)
+            
+            # Download and upload overlap: parts are read into reusable buffers while
+            # parallel workers upload the previous ones
+            with response:
+                multipart_upload_stream(s3_client, response.raw, bucket_name, filename, part_size=part_size, ACL=acl)
         
         # Generate the URL to the uploaded file
         if make_public:
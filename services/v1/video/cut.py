@@ -24,6 +24,7 @@ import uuid
 import tempfile
 from services.file_management import download_file
 from services.cloud_storage import upload_file
+from services.cpu_budget import ffmpeg_args
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
@@ -180,7 +181,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                         segment_file
                     ]
                     logger.info(f"Extracting segment {i}: {' '.join(cmd)}")
-                    process = subprocess.run(cmd, capture_output=True, text=True)
+                    process = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
                     
                     if process.returncode != 0:
                         logger.error(f"Error during segment {i} extraction: {process.stderr}")
@@ -210,7 +211,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                     segment_file
                 ]
                 logger.info(f"Extracting final segment: {' '.join(cmd)}")
-                process = subprocess.run(cmd, capture_output=True, text=True)
+                process = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
                 
                 if process.returncode != 0:
                     logger.error(f"Error during final segment extraction: {process.stderr}")
@@ -244,7 +245,7 @@ def cut_media(video_url, cuts, job_id=None, video_codec='libx264', video_preset=
                     output_filename
                 ]
                 logger.info(f"Concatenating segments: {' '.join(cmd)}")
-                process = subprocess.run(cmd, capture_output=True, text=True)
+                process = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
                 
                 if process.returncode != 0:
                     logger.error(f"Error during concatenation: {process.stderr}")
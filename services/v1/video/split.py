@@ -23,6 +23,7 @@ import logging
 import uuid
 from services.file_management import download_file
 from services.cloud_storage import upload_file
+from services.cpu_budget import ffmpeg_args
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
@@ -53,7 +54,7 @@ def time_to_seconds(time_str):
         raise ValueError(f"Invalid time format: {time_str}. Expected HH:MM:SS[.mmm]")
 
 def split_video(video_url, splits, job_id=None, video_codec='libx264', video_preset='medium', 
-               video_crf=23, audio_codec='aac', audio_bitrate='128k'):
+               video_crf=23, audio_codec='aac', audio_bitrate='128k', upload_pool=None):
     """
     Splits a video file into multiple segments with customizable encoding settings.
     
@@ -66,6 +67,8 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
         video_crf (int, optional): Constant Rate Factor for quality (0-51, default: 23)
         audio_codec (str, optional): Audio codec to use for encoding (default: 'aac')
         audio_bitrate (str, optional): Audio bitrate (default: '128k')
+        upload_pool (UploadPool, optional): If provided, each split is submitted for upload
+            as soon as it is encoded so uploads overlap with the remaining encodes
         
     Returns:
         tuple: (list of output file paths, input file path)
@@ -154,7 +157,7 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
             logger.info(f"Running FFmpeg command for split {index+1}: {' '.join(cmd)}")
             
             # Run the FFmpeg command
-            process = subprocess.run(cmd, capture_output=True, text=True)
+            process = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
             
             if process.returncode != 0:
                 logger.error(f"Error processing split {index+1}: {process.stderr}")
@@ -163,6 +166,10 @@ def split_video(video_url, splits, job_id=None, video_codec='libx264', video_pre
             # Add the output file to the list
             output_files.append(output_filename)
             logger.info(f"Successfully created split {index+1}: {output_filename}")
+
+            # Start uploading this split while the next one encodes
+            if upload_pool is not None:
+                upload_pool.submit(output_filename)
         
         # Return the list of output files and the input filename
         return output_files, input_filename
@@ -23,6 +23,7 @@ import logging
 import uuid
 from services.file_management import download_file
 from services.cloud_storage import upload_file
+from services.cpu_budget import ffmpeg_args
 from config import LOCAL_STORAGE_PATH
 
 # Set up logging
@@ -156,7 +157,7 @@ def trim_video(video_url, start=None, end=None, job_id=None, video_codec='libx26
         logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
         
         # Run the FFmpeg command
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        process = subprocess.run(ffmpeg_args(cmd), capture_output=True, text=True)
         
         if process.returncode != 0:
             logger.error(f"Error during trim: {process.stderr}")
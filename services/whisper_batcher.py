@@ -0,0 +1,290 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE
+from whisper.decoding import DecodingOptions, decode
+from whisper.timing import add_word_timestamps
+from whisper.tokenizer import get_tokenizer
+from services import metrics
+from services.whisper_models import use_model
+from config import WHISPER_BATCH_SIZE, WHISPER_BATCH_MAX_WAIT_MS, WHISPER_BATCH_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Same fallback and silence thresholds as whisper's transcribe() defaults
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Seconds of audio per timestamp token
+TIME_PRECISION = HOP_LENGTH * 2 / SAMPLE_RATE
+
+# Clips longer than one window are cut at the quietest 20ms frame in the last few seconds of each window
+CUT_SEARCH_SECONDS = 5
+CUT_FRAME_SAMPLES = SAMPLE_RATE // 50
+
+# Options the batched path implements; anything else goes through whisper's transcribe()
+SUPPORTED_OPTIONS = {"task", "language", "word_timestamps", "verbose"}
+
+def split_segments(result, tokenizer, seek, segment_size):
+    """Split one window's DecodingResult into segments on timestamp tokens, as whisper's transcribe() does."""
+    time_offset = seek * HOP_LENGTH / SAMPLE_RATE
+    tokens = torch.tensor(result.tokens)
+    timestamp_tokens = tokens.ge(tokenizer.timestamp_begin)
+    single_timestamp_ending = timestamp_tokens[-2:].tolist() == [False, True]
+    consecutive = (torch.where(timestamp_tokens[:-1] & timestamp_tokens[1:])[0] + 1).tolist()
+
+    if consecutive:
+        slices = consecutive + ([len(tokens)] if single_timestamp_ending else [])
+        spans = []
+        last_slice = 0
+        for current_slice in slices:
+            sliced_tokens = tokens[last_slice:current_slice]
+            spans.append((
+                time_offset + (sliced_tokens[0].item() - tokenizer.timestamp_begin) * TIME_PRECISION,
+                time_offset + (sliced_tokens[-1].item() - tokenizer.timestamp_begin) * TIME_PRECISION,
+                sliced_tokens.tolist()
+            ))
+            last_slice = current_slice
+    else:
+        duration = segment_size * HOP_LENGTH / SAMPLE_RATE
+        timestamps = tokens[timestamp_tokens.nonzero().flatten()]
+        if len(timestamps) > 0 and timestamps[-1].item() != tokenizer.timestamp_begin:
+            duration = (timestamps[-1].item() - tokenizer.timestamp_begin) * TIME_PRECISION
+        spans = [(time_offset, time_offset + duration, tokens.tolist())]
+
+    return [
+        {
+            "seek": seek,
+            "start": start,
+            "end": end,
+            "text": tokenizer.decode([token for token in span_tokens if token < tokenizer.eot]),
+            "tokens": span_tokens,
+            "temperature": result.temperature,
+            "avg_logprob": result.avg_logprob,
+            "compression_ratio": result.compression_ratio,
+            "no_speech_prob": result.no_speech_prob
+        }
+        for start, end, span_tokens in spans
+    ]
+
+def split_windows(audio):
+    """Return (start, end) sample ranges of at most 30 seconds covering audio."""
+    windows = []
+    start = 0
+    while len(audio) - start > N_SAMPLES:
+        search_start = start + N_SAMPLES - CUT_SEARCH_SECONDS * SAMPLE_RATE
+        frames = audio[search_start:start + N_SAMPLES].reshape(-1, CUT_FRAME_SAMPLES)
+        quietest = int(np.argmin(np.mean(frames ** 2, axis=1)))
+        cut = search_start + quietest * CUT_FRAME_SAMPLES + CUT_FRAME_SAMPLES // 2
+        windows.append((start, cut))
+        start = cut
+    windows.append((start, len(audio)))
+    return windows
+
+def append_window_segments(segments, window_segments, start):
+    """Shift segments decoded from the window starting at sample start onto the full timeline and append them."""
+    offset = start / SAMPLE_RATE
+    for segment in window_segments:
+        segment["seek"] += start // HOP_LENGTH
+        segment["start"] += offset
+        segment["end"] += offset
+        for word in segment.get("words", []):
+            word["start"] += offset
+            word["end"] += offset
+        segment["id"] = len(segments)
+        segments.append(segment)
+
+class _Window:
+    """One 30 second window waiting in the batch queue; future resolves to (segments, language)."""
+
+    def __init__(self, audio, task, language, word_timestamps):
+        self.audio = audio
+        self.task = task
+        self.language = language
+        self.word_timestamps = word_timestamps
+        self.future = Future()
+
+class WhisperBatcher:
+    """Collects windows submitted by concurrent jobs and decodes them together on one model."""
+
+    def __init__(self, model_size, batch_size=WHISPER_BATCH_SIZE, max_wait_ms=WHISPER_BATCH_MAX_WAIT_MS):
+        self.model_size = model_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    def submit(self, window):
+        with self._lock:
+            # The collector thread doesn't survive a fork, so start one per process
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+            self._queue.put(window)
+        return window.future
+
+    def _run(self, window_queue):
+        while True:
+            batch = [window_queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(window_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Task and language are decoding options, so each batch is split by them
+            groups = {}
+            for window in batch:
+                groups.setdefault((window.task, window.language), []).append(window)
+
+            for (task, language), windows in groups.items():
+                try:
+                    self._decode(windows, task, language)
+                except Exception as e:
+                    logger.error(f"Batched Whisper decode of {len(windows)} windows failed: {e}")
+                    for window in windows:
+                        if not window.future.done():
+                            window.future.set_exception(e)
+
+    def _decode(self, windows, task, language):
+        start_time = time.time()
+        with use_model(self.model_size) as model:
+            fp16 = model.device != torch.device("cpu")
+            dtype = torch.float16 if fp16 else torch.float32
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(window.audio), model.dims.n_mels)
+                for window in windows
+            ]).to(model.device).to(dtype)
+
+            # Decode the whole batch greedily, then retry only the windows that look like
+            # a repetition loop or gibberish at the next temperature
+            results = [None] * len(windows)
+            pending = list(range(len(windows)))
+            for temperature in TEMPERATURES:
+                options = DecodingOptions(task=task, language=language, fp16=fp16, temperature=temperature)
+                retry = []
+                for index, result in zip(pending, decode(model, mel[pending], options)):
+                    results[index] = result
+                    needs_fallback = result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+                    if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+                        needs_fallback = False
+                    if needs_fallback:
+                        retry.append(index)
+                if not retry:
+                    break
+                pending = retry
+
+            for window, mel_segment, result in zip(windows, mel, results):
+                window.future.set_result((self._segments(model, window, mel_segment, result, task), result.language))
+
+        metrics.increment('whisper_batches')
+        metrics.increment('whisper_batched_windows', len(windows))
+        logger.info(f"Decoded a batch of {len(windows)} Whisper windows in {time.time() - start_time:.2f}s")
+
+    def _segments(self, model, window, mel_segment, result, task):
+        # Silent window, as whisper's transcribe() would skip it
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            return []
+
+        tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=result.language,
+            task=task
+        )
+        segment_size = min(N_FRAMES, len(window.audio) // HOP_LENGTH)
+        segments = split_segments(result, tokenizer, 0, segment_size)
+        if window.word_timestamps and segments:
+            add_word_timestamps(
+                segments=segments,
+                model=model,
+                tokenizer=tokenizer,
+                mel=mel_segment,
+                num_frames=segment_size,
+                last_speech_timestamp=0.0
+            )
+        return segments
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_batcher(model_size="base"):
+    with _batchers_lock:
+        if model_size not in _batchers:
+            _batchers[model_size] = WhisperBatcher(model_size)
+        return _batchers[model_size]
+
+def accepts(audio, options):
+    """Whether a transcription can go through the batcher instead of whisper's transcribe()."""
+    return (
+        WHISPER_BATCH_SIZE > 1
+        and isinstance(audio, np.ndarray)
+        and len(audio) <= WHISPER_BATCH_MAX_SECONDS * SAMPLE_RATE
+        and set(options) <= SUPPORTED_OPTIONS
+    )
+
+def transcribe(audio, model_size="base", on_segments=None, **options):
+    """
+    Transcribe a short 16kHz mono float32 clip through the shared batch queue.
+
+    Returns a result shaped like whisper's transcribe(). Windows are decoded independently,
+    so unlike transcribe() the text of one window is not used as a prompt for the next.
+    on_segments, when given, is called with each window's segments in order.
+    """
+    batcher = get_batcher(model_size)
+    task = options.get("task", "transcribe")
+    language = options.get("language")
+    word_timestamps = options.get("word_timestamps", False)
+    windows = split_windows(audio)
+
+    futures = []
+    for start, end in windows:
+        futures.append(batcher.submit(_Window(audio[start:end], task, language, word_timestamps)))
+        if language is None:
+            # Pin the language detected on the first window so later windows can't disagree
+            language = futures[0].result()[1]
+
+    segments = []
+    for (start, _), future in zip(windows, futures):
+        window_segments, _ = future.result()
+        append_window_segments(segments, window_segments, start)
+        if on_segments is not None and window_segments:
+            on_segments(window_segments)
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language
+    }
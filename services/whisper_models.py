@@ -0,0 +1,115 @@
+# Copyright (c) 2025 Stephen G. Pope
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import whisper
+from services import metrics
+from config import WHISPER_PRELOAD_MODELS, WHISPER_MODEL_MEMORY_MB
+
+logger = logging.getLogger(__name__)
+
+# Loaded models by size, least recently used first
+_models = OrderedDict()
+_registry_lock = threading.Lock()
+# One lock per size serialises loading, so concurrent jobs wait for a single load
+_load_locks = {}
+# Whisper installs its KV-cache hooks on the shared model during decoding, so two
+# transcriptions must not run on the same model instance at the same time
+_inference_locks = {}
+
+class _LoadedModel:
+    def __init__(self, model, size_bytes, load_seconds):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+
+def _load_whisper(model_name):
+    model = whisper.load_model(model_name)
+    return model, sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+
+def _lock_for(locks, model_name):
+    with _registry_lock:
+        if model_name not in locks:
+            locks[model_name] = threading.Lock()
+        return locks[model_name]
+
+def _evict_over_budget(keep):
+    """Drop least recently used models until the registry fits WHISPER_MODEL_MEMORY_MB."""
+    if WHISPER_MODEL_MEMORY_MB <= 0:
+        return
+    budget = WHISPER_MODEL_MEMORY_MB * 1024 * 1024
+    while sum(entry.size_bytes for entry in _models.values()) > budget:
+        victim = next((name for name in _models if name != keep), None)
+        if victim is None:
+            break
+        _models.pop(victim)
+        logger.info(f"Evicted Whisper {victim} model to stay within {WHISPER_MODEL_MEMORY_MB}MB")
+
+def get_model(model_name="base", loader=None):
+    """
+    Return the Whisper model for model_name, loading it on first use in this process.
+    Other backends pass their own loader, returning (model, size in bytes), and a
+    model_name that can't clash with openai-whisper sizes so they share the budget.
+    """
+    with _registry_lock:
+        entry = _models.get(model_name)
+        if entry is not None:
+            _models.move_to_end(model_name)
+
+    if entry is None:
+        with _lock_for(_load_locks, model_name):
+            with _registry_lock:
+                entry = _models.get(model_name)
+            if entry is None:
+                start_time = time.time()
+                model, size_bytes = (loader or _load_whisper)(model_name)
+                entry = _LoadedModel(model, size_bytes, time.time() - start_time)
+                logger.info(f"Loaded Whisper {model_name} model in {entry.load_seconds:.2f}s")
+                metrics.increment('whisper_model_loads')
+                with _registry_lock:
+                    _models[model_name] = entry
+                    _evict_over_budget(keep=model_name)
+                return entry.model
+
+    metrics.increment('whisper_model_reuses')
+    metrics.increment('whisper_model_load_seconds_saved', round(entry.load_seconds, 3))
+    return entry.model
+
+@contextmanager
+def use_model(model_name="base"):
+    """Hold the Whisper model for model_name for the duration of one transcription."""
+    model = get_model(model_name)
+    with _lock_for(_inference_locks, model_name):
+        yield model
+
+def preload_models(model_names=None):
+    """Load the configured models ahead of the first request."""
+    for model_name in model_names if model_names is not None else WHISPER_PRELOAD_MODELS:
+        try:
+            get_model(model_name)
+        except Exception as e:
+            logger.error(f"Failed to preload Whisper {model_name} model: {e}")
+
+def loaded_models():
+    """Return the names of the models currently held, least recently used first."""
+    with _registry_lock:
+        return list(_models)